@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""SQLite store of per-log search aggregates for incremental analysis."""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+STATE_NAME = ".analysis_state.sqlite"
+STATE_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS logs (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    week_start TEXT,
+    week_end TEXT,
+    model TEXT,
+    source_count INTEGER NOT NULL,
+    unique_publishers INTEGER NOT NULL,
+    query_count INTEGER NOT NULL,
+    excluded_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS publishers (
+    path TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    publisher TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (path, pos)
+);
+CREATE TABLE IF NOT EXISTS citations (
+    path TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    week_start TEXT,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    model TEXT,
+    PRIMARY KEY (path, pos)
+);
+CREATE INDEX IF NOT EXISTS citations_week_url ON citations (week_start, url);
+CREATE TABLE IF NOT EXISTS duplicates (
+    week_start TEXT,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    models_count INTEGER NOT NULL,
+    models TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS duplicates_week_url ON duplicates (week_start, url);
+"""
+
+# Citation order key across logs: input order first, then order within the log.
+MAX_SOURCES_PER_LOG = 1_000_000
+
+
+class AnalysisState:
+    """``{out_dir}/.analysis_state.sqlite``: one row per analyzed log.
+
+    Each log is keyed by path and fingerprinted by size, mtime and content
+    hash. Its summary counts, publisher counts and cited URLs are kept so
+    the CSVs can be regenerated without re-reading unchanged logs. ``seq``
+    is the log's position in the latest listing and fixes the output order.
+    Cross-model duplicates are cached per week and recomputed only for
+    weeks touched since the last ``refresh_duplicates``.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.dirty_weeks: Set[Optional[str]] = set()
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        version = self._version()
+        if version is not None and version != STATE_VERSION:
+            self.conn.executescript(
+                "DROP TABLE IF EXISTS logs; DROP TABLE IF EXISTS publishers; "
+                "DROP TABLE IF EXISTS citations; DROP TABLE IF EXISTS duplicates;"
+            )
+        self.conn.executescript(SCHEMA)
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(STATE_VERSION),))
+        self.conn.commit()
+
+    def _version(self) -> Optional[int]:
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return int(row[0]) if row else None
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def fingerprints(self) -> Dict[str, Tuple[int, int, str, int, Optional[str]]]:
+        """{path: (size, mtime_ns, sha256, seq, week_start)} for every stored log."""
+        rows = self.conn.execute("SELECT path, size, mtime_ns, sha256, seq, week_start FROM logs")
+        return {row[0]: tuple(row[1:]) for row in rows}  # type: ignore[misc]
+
+    def touch(self, path: str, size: int, mtime_ns: int, seq: int) -> None:
+        """Record a new stat or position for a log whose content is unchanged."""
+        self.conn.execute(
+            "UPDATE logs SET size = ?, mtime_ns = ?, seq = ? WHERE path = ?",
+            (size, mtime_ns, seq, path),
+        )
+
+    def mark_all_dirty(self) -> None:
+        """The listing order changed, so any week's first-seen titles may have too."""
+        self.dirty_weeks.update(row[0] for row in self.conn.execute("SELECT DISTINCT week_start FROM logs"))
+
+    def put(
+        self,
+        path: str,
+        size: int,
+        mtime_ns: int,
+        sha256: str,
+        seq: int,
+        summary: Dict[str, str],
+        publisher_rows: List[Dict[str, str]],
+        citations: Sequence[Tuple[str, str]],
+    ) -> None:
+        previous = self.conn.execute("SELECT week_start FROM logs WHERE path = ?", (path,)).fetchone()
+        if previous:
+            self.dirty_weeks.add(previous[0])
+        self.dirty_weeks.add(summary["week_start"])
+        self.conn.execute("DELETE FROM publishers WHERE path = ?", (path,))
+        self.conn.execute("DELETE FROM citations WHERE path = ?", (path,))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO logs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                path,
+                size,
+                mtime_ns,
+                sha256,
+                seq,
+                summary["week_start"],
+                summary["week_end"],
+                summary["model"],
+                int(summary["source_count"]),
+                int(summary["unique_publishers"]),
+                int(summary["query_count"]),
+                int(summary["excluded_count"]),
+            ),
+        )
+        self.conn.executemany(
+            "INSERT INTO publishers VALUES (?, ?, ?, ?)",
+            [(path, pos, row["publisher"], int(row["count"])) for pos, row in enumerate(publisher_rows)],
+        )
+        self.conn.executemany(
+            "INSERT INTO citations VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (path, pos, summary["week_start"], url, title, summary["model"])
+                for pos, (url, title) in enumerate(citations)
+            ],
+        )
+
+    def prune(self, keep: Sequence[str]) -> int:
+        """Drop logs that are no longer in the listing; return how many."""
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS listed (path TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM listed")
+        self.conn.executemany("INSERT OR IGNORE INTO listed VALUES (?)", [(path,) for path in keep])
+        gone = self.conn.execute(
+            "SELECT path, week_start FROM logs WHERE path NOT IN (SELECT path FROM listed)"
+        ).fetchall()
+        self.dirty_weeks.update(week_start for _, week_start in gone)
+        for table in ("logs", "publishers", "citations"):
+            self.conn.execute(f"DELETE FROM {table} WHERE path NOT IN (SELECT path FROM listed)")
+        return len(gone)
+
+    def commit(self) -> None:
+        self.conn.commit()
+
+    def totals(self) -> Tuple[int, int]:
+        logs, sources = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(source_count), 0) FROM logs").fetchone()
+        return int(logs), int(sources)
+
+    def refresh_duplicates(self) -> int:
+        """Recompute cached duplicates for the dirty weeks; return how many weeks."""
+        weeks = list(self.dirty_weeks)
+        for week_start in weeks:
+            self.conn.execute("DELETE FROM duplicates WHERE week_start IS ?", (week_start,))
+            # SQLite returns the bare ``title`` column from the row holding the
+            # MIN, i.e. the first citation of the URL in input order.
+            rows = self.conn.execute(
+                f"SELECT c.url, c.title, MIN(l.seq * {MAX_SOURCES_PER_LOG} + c.pos), "
+                "json_group_array(DISTINCT c.model) "
+                "FROM citations c JOIN logs l ON l.path = c.path "
+                "WHERE c.week_start IS ? "
+                "GROUP BY c.url "
+                "HAVING COUNT(DISTINCT NULLIF(c.model, '')) >= 2",
+                (week_start,),
+            ).fetchall()
+            inserts = []
+            for url, title, _, models_json in rows:
+                models = sorted(model for model in json.loads(models_json) if model)
+                inserts.append((week_start, url, title, len(models), ",".join(models)))
+            self.conn.executemany("INSERT INTO duplicates VALUES (?, ?, ?, ?, ?)", inserts)
+        self.dirty_weeks.clear()
+        return len(weeks)
+
+    # Row iterators below yield tuples in CSV column order.
+
+    def summary_rows(self) -> Iterator[Tuple[object, ...]]:
+        return self.conn.execute(
+            "SELECT week_start, week_end, model, source_count, unique_publishers, query_count, excluded_count "
+            "FROM logs ORDER BY seq"
+        )
+
+    def publisher_rows(self) -> Iterator[Tuple[object, ...]]:
+        return self.conn.execute(
+            "SELECT l.week_start, l.week_end, l.model, p.publisher, p.count "
+            "FROM publishers p JOIN logs l ON l.path = p.path ORDER BY l.seq, p.pos"
+        )
+
+    def duplicate_rows(self) -> Iterator[Tuple[object, ...]]:
+        """URLs cited by two or more models in a week, sorted by week then URL."""
+        return self.conn.execute(
+            "SELECT week_start, url, title, models_count, models FROM duplicates ORDER BY week_start, url"
+        )
@@ -3,10 +3,47 @@
 
 import argparse
 import csv
+import hashlib
 import json
-from collections import Counter, defaultdict
+import os
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from analysis_state import STATE_NAME, AnalysisState
+
+SUMMARY_FIELDS = [
+    "week_start",
+    "week_end",
+    "model",
+    "source_count",
+    "unique_publishers",
+    "query_count",
+    "excluded_count"
+]
+PUBLISHER_FIELDS = [
+    "week_start",
+    "week_end",
+    "model",
+    "publisher",
+    "count"
+]
+DUPLICATE_FIELDS = [
+    "week_start",
+    "url",
+    "title",
+    "models_count",
+    "models"
+]
+
+# Logs per worker task; parsing one log is too little work to ship alone.
+CHUNK_SIZE = 32
+
+# (url, title) for every source of a log that has a URL.
+Citation = Tuple[str, str]
+LogResult = Tuple[Dict[str, str], List[Dict[str, str]], List[Citation], int]
 
 
 def load_json(path: Path) -> Dict:
@@ -28,116 +65,245 @@ def normalize_publisher(publisher: str) -> str:
     return " ".join(publisher.split()).strip()
 
 
-def main() -> int:
+def analyze_log(path: Path) -> LogResult:
+    """Aggregate one log: its summary row, publisher rows, citations and source count."""
+    data = load_json(path)
+
+    week_start = data.get("week_start", "")
+    week_end = data.get("week_end", "")
+    model = data.get("model", "")
+    queries = data.get("queries", [])
+    sources = data.get("sources", [])
+    excluded = data.get("excluded_sources", [])
+
+    publisher_counts: Counter = Counter()
+    citations: List[Citation] = []
+    for src in sources:
+        publisher = normalize_publisher(str(src.get("publisher", "Unknown")))
+        publisher_counts[publisher] += 1
+
+        url = str(src.get("url", ""))
+        if url:
+            citations.append((url, str(src.get("title", ""))))
+
+    summary_row = {
+        "week_start": week_start,
+        "week_end": week_end,
+        "model": model,
+        "source_count": str(len(sources)),
+        "unique_publishers": str(len(publisher_counts)),
+        "query_count": str(len(queries)),
+        "excluded_count": str(len(excluded))
+    }
+    publisher_rows = [
+        {
+            "week_start": week_start,
+            "week_end": week_end,
+            "model": model,
+            "publisher": publisher,
+            "count": str(count)
+        }
+        for publisher, count in publisher_counts.items()
+    ]
+    return summary_row, publisher_rows, citations, len(sources)
+
+
+def analyze_logs(paths: List[Path], jobs: int) -> Iterator[LogResult]:
+    """Results in input order, parsed across ``jobs`` processes (``jobs=1``: in this process)."""
+    if jobs <= 1 or len(paths) <= CHUNK_SIZE:
+        yield from map(analyze_log, paths)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(analyze_log, paths, chunksize=CHUNK_SIZE)
+
+
+class WeekPartitions:
+    """Citations spilled to one JSONL file per week (a line per log), so the
+    URL index for duplicate detection only ever holds a single week in memory."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._files: Dict[str, Tuple[Path, TextIO]] = {}
+
+    def add(self, week_start: str, model: str, citations: List[Citation]) -> None:
+        if not citations:
+            return
+        if week_start not in self._files:
+            path = self.directory / f"week_{len(self._files):05d}.jsonl"
+            self._files[week_start] = (path, path.open("w", encoding="utf-8"))
+        self._files[week_start][1].write(json.dumps([model, citations], ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        for _, handle in self._files.values():
+            handle.close()
+
+    def duplicates(self) -> Iterator[Dict[str, str]]:
+        """URLs cited by two or more models, sorted by week then URL.
+
+        The title is the first one seen for the URL in input order.
+        """
+        self.close()
+        for week_start in sorted(self._files):
+            index: Dict[str, Tuple[str, set]] = {}
+            with self._files[week_start][0].open("r", encoding="utf-8") as handle:
+                for line in handle:
+                    model, citations = json.loads(line)
+                    for url, title in citations:
+                        index.setdefault(url, (title, set()))[1].add(model)
+            for url, (title, model_set) in sorted(index.items()):
+                models = sorted(m for m in model_set if m)
+                if len(models) < 2:
+                    continue
+                yield {
+                    "week_start": week_start,
+                    "url": url,
+                    "title": title,
+                    "models_count": str(len(models)),
+                    "models": ",".join(models)
+                }
+
+
+def write_rows(path: Path, fieldnames: List[str], rows: Iterable[Dict[str, str]]) -> None:
+    with path.open("w", newline="") as handle:
+        writer = csv.DictWriter(handle, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_tuples(path: Path, fieldnames: List[str], rows: Iterable[Tuple[object, ...]]) -> None:
+    with path.open("w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(fieldnames)
+        writer.writerows(rows)
+
+
+def analyze_full(
+    paths: List[Path],
+    jobs: int,
+    summary_path: Path,
+    publisher_path: Path,
+    duplicates_path: Path,
+) -> Tuple[int, int]:
+    """Parse every log and stream the CSVs; return (logs, sources)."""
+    total_logs = 0
+    total_sources = 0
+    with tempfile.TemporaryDirectory(prefix=".citations_", dir=summary_path.parent) as spill_dir, \
+            summary_path.open("w", newline="") as summary_handle, \
+            publisher_path.open("w", newline="") as publisher_handle:
+        summary_writer = csv.DictWriter(summary_handle, fieldnames=SUMMARY_FIELDS)
+        summary_writer.writeheader()
+        publisher_writer = csv.DictWriter(publisher_handle, fieldnames=PUBLISHER_FIELDS)
+        publisher_writer.writeheader()
+        partitions = WeekPartitions(Path(spill_dir))
+        try:
+            for summary_row, publisher_rows, citations, source_count in analyze_logs(paths, jobs):
+                total_logs += 1
+                total_sources += source_count
+                summary_writer.writerow(summary_row)
+                publisher_writer.writerows(publisher_rows)
+                partitions.add(summary_row["week_start"], summary_row["model"], citations)
+
+            write_rows(duplicates_path, DUPLICATE_FIELDS, partitions.duplicates())
+        finally:
+            partitions.close()
+    return total_logs, total_sources
+
+
+
+def update_state(state: AnalysisState, paths: List[Path], jobs: int) -> Tuple[int, int, int]:
+    """Re-aggregate only logs that are new or whose content changed.
+
+    A log whose size and mtime match the state is not opened; one whose
+    stat changed is hashed and only re-parsed if the hash differs too.
+    Logs no longer listed are dropped, and cached duplicates are
+    recomputed for the weeks this touched. Returns (re-parsed, dropped,
+    weeks touched); no weeks touched means the CSVs would not change.
+    """
+    known = state.fingerprints()
+    keys: List[str] = []
+    changed: List[Tuple[str, int, int, str, int]] = []
+    last_seq = -1
+    reordered = False
+    for seq, path in enumerate(paths):
+        key = os.path.abspath(path)
+        keys.append(key)
+        stat = path.stat()
+        previous = known.get(key)
+        if previous:
+            # Inserted or removed logs shift positions; only a change in the
+            # relative order of known logs can change which title is first.
+            reordered = reordered or previous[3] < last_seq
+            last_seq = previous[3]
+        if previous and previous[:2] == (stat.st_size, stat.st_mtime_ns):
+            if previous[3] != seq:
+                state.touch(key, stat.st_size, stat.st_mtime_ns, seq)
+            continue
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        if previous and previous[2] == digest:
+            state.touch(key, stat.st_size, stat.st_mtime_ns, seq)
+            continue
+        changed.append((key, stat.st_size, stat.st_mtime_ns, digest, seq))
+    if reordered:
+        state.mark_all_dirty()
+
+    results = analyze_logs([Path(key) for key, *_ in changed], jobs)
+    for (key, size, mtime_ns, digest, seq), (summary_row, publisher_rows, citations, _) in zip(changed, results):
+        state.put(key, size, mtime_ns, digest, seq, summary_row, publisher_rows, citations)
+    dropped = state.prune(keys)
+    weeks = state.refresh_duplicates()
+    state.commit()
+    return len(changed), dropped, weeks
+
+
+def main(argv: Optional[List[str]] = None) -> int:
     parser = argparse.ArgumentParser(description="Analyze search log JSON files.")
     parser.add_argument("paths", nargs="+", help="Search log JSON files or directories.")
     parser.add_argument("--out-dir", default="data/analysis", help="Output directory for CSVs.")
-    args = parser.parse_args()
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Log parsing processes. Default: CPU count.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=f"Keep per-log aggregates in {{out_dir}}/{STATE_NAME} and only re-parse new or changed logs.",
+    )
+    parser.add_argument("--state", default=None, help=f"State store path. Default: {{out_dir}}/{STATE_NAME}.")
+    args = parser.parse_args(argv)
 
     out_dir = Path(args.out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    summary_rows: List[Dict[str, str]] = []
-    publisher_rows: List[Dict[str, str]] = []
-    duplicate_index: Dict[Tuple[str, str], Dict[str, object]] = {}
-
-    total_logs = 0
-    total_sources = 0
-
+    paths: List[Path] = []
     for path in iter_log_files(args.paths):
         if not path.exists():
             print(f"Missing file: {path}")
             continue
-        data = load_json(path)
-        total_logs += 1
-
-        week_start = data.get("week_start", "")
-        week_end = data.get("week_end", "")
-        model = data.get("model", "")
-        queries = data.get("queries", [])
-        sources = data.get("sources", [])
-        excluded = data.get("excluded_sources", [])
-
-        total_sources += len(sources)
-
-        publisher_counts: Counter = Counter()
-        for src in sources:
-            publisher = normalize_publisher(str(src.get("publisher", "Unknown")))
-            publisher_counts[publisher] += 1
-
-            url = str(src.get("url", ""))
-            title = str(src.get("title", ""))
-            dup_key = (week_start, url)
-            if url:
-                entry = duplicate_index.setdefault(dup_key, {"title": title, "models": set()})
-                entry["models"].add(model)
-
-        summary_rows.append({
-            "week_start": week_start,
-            "week_end": week_end,
-            "model": model,
-            "source_count": str(len(sources)),
-            "unique_publishers": str(len(publisher_counts)),
-            "query_count": str(len(queries)),
-            "excluded_count": str(len(excluded))
-        })
-
-        for publisher, count in publisher_counts.items():
-            publisher_rows.append({
-                "week_start": week_start,
-                "week_end": week_end,
-                "model": model,
-                "publisher": publisher,
-                "count": str(count)
-            })
+        paths.append(path)
 
     summary_path = out_dir / "search_summary.csv"
-    with summary_path.open("w", newline="") as handle:
-        writer = csv.DictWriter(handle, fieldnames=[
-            "week_start",
-            "week_end",
-            "model",
-            "source_count",
-            "unique_publishers",
-            "query_count",
-            "excluded_count"
-        ])
-        writer.writeheader()
-        writer.writerows(summary_rows)
-
     publisher_path = out_dir / "publisher_counts.csv"
-    with publisher_path.open("w", newline="") as handle:
-        writer = csv.DictWriter(handle, fieldnames=[
-            "week_start",
-            "week_end",
-            "model",
-            "publisher",
-            "count"
-        ])
-        writer.writeheader()
-        writer.writerows(publisher_rows)
-
     duplicates_path = out_dir / "duplicate_urls.csv"
-    with duplicates_path.open("w", newline="") as handle:
-        writer = csv.DictWriter(handle, fieldnames=[
-            "week_start",
-            "url",
-            "title",
-            "models_count",
-            "models"
-        ])
-        writer.writeheader()
-        for (week_start, url), entry in sorted(duplicate_index.items()):
-            models = sorted(m for m in entry["models"] if m)
-            if len(models) < 2:
-                continue
-            writer.writerow({
-                "week_start": week_start,
-                "url": url,
-                "title": entry.get("title", ""),
-                "models_count": str(len(models)),
-                "models": ",".join(models)
-            })
+    if args.incremental:
+        state = AnalysisState(Path(args.state) if args.state else out_dir / STATE_NAME)
+        try:
+            parsed, dropped, weeks = update_state(state, paths, args.jobs)
+            outputs = {
+                summary_path: (SUMMARY_FIELDS, state.summary_rows),
+                publisher_path: (PUBLISHER_FIELDS, state.publisher_rows),
+                duplicates_path: (DUPLICATE_FIELDS, state.duplicate_rows),
+            }
+            for path, (fields, rows) in outputs.items():
+                if weeks or not path.exists():
+                    write_tuples(path, fields, rows())
+            total_logs, total_sources = state.totals()
+        finally:
+            state.close()
+        print(f"Logs re-parsed: {parsed} (unchanged: {total_logs - parsed}, dropped: {dropped}, weeks updated: {weeks})")
+    else:
+        total_logs, total_sources = analyze_full(paths, args.jobs, summary_path, publisher_path, duplicates_path)
 
     print(f"Logs processed: {total_logs}")
     print(f"Total sources: {total_sources}")
@@ -0,0 +1,589 @@
+#!/usr/bin/env python3
+"""Run a study backfill through provider batch APIs instead of interactive calls."""
+
+from __future__ import annotations
+
+import argparse
+import contextvars
+import json
+import os
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import run_forecast_llm
+import run_search_llm
+from fake_responses import fake_response
+from forecast_store import add_store_arguments, compact_run, require_engine
+from llm_utils import (
+    anthropic_content,
+    cacheable_response,
+    call_provider,
+    close_clients,
+    get_client,
+    load_dotenv,
+    strip_cache_breakpoint,
+)
+from rate_limit import estimate_tokens
+from response_cache import add_cache_arguments, cache_argv, cache_from_args, cache_key
+from run_catalog import catalog_listener
+from run_manifest import RunManifest
+from run_pipeline import (
+    DEFAULT_MODELS,
+    MODEL_PROVIDERS,
+    Node,
+    build_graph,
+    compaction_argv,
+    node_argv,
+    node_input_hashes,
+    read_weeks,
+    run_analysis,
+    validate_output,
+)
+from telemetry import LEDGER_NAME, bind, open_ledger, record_call
+
+SCRIPT_MODULES = {
+    "run_search_llm": run_search_llm,
+    "run_forecast_llm": run_forecast_llm,
+}
+
+# (text, error, usage) per custom_id. usage is None when the request already
+# went through call_provider, which records it in the telemetry ledger itself.
+BatchResults = Dict[str, Tuple[Optional[str], Optional[str], Optional[Dict[str, int]]]]
+
+TERMINAL_OPENAI = {"completed", "failed", "expired", "cancelled"}
+
+
+def request_cache_key(request: Dict[str, object]) -> str:
+    return cache_key(
+        request["provider"],
+        request["model"],
+        request["prompt"],
+        request["system"],
+        request["temperature"],
+        request["response_json"],
+        request["enable_search_tool"],
+        request["max_tokens"],
+    )
+
+
+def _openai_request_line(custom_id: str, request: Dict[str, object]) -> Tuple[str, Dict[str, object]]:
+    if request.get("enable_search_tool"):
+        body: Dict[str, object] = {
+            "model": request["model"],
+            "input": strip_cache_breakpoint(request["prompt"]),
+            "temperature": request["temperature"],
+            "tools": [{"type": "web_search"}],
+        }
+        if request.get("system"):
+            body["instructions"] = request["system"]
+        url = "/v1/responses"
+    else:
+        messages = []
+        if request.get("system"):
+            messages.append({"role": "system", "content": request["system"]})
+        messages.append({"role": "user", "content": strip_cache_breakpoint(request["prompt"])})
+        body = {"model": request["model"], "messages": messages, "temperature": request["temperature"]}
+        if request.get("response_json"):
+            body["response_format"] = {"type": "json_object"}
+        url = "/v1/chat/completions"
+    return url, {"custom_id": custom_id, "method": "POST", "url": url, "body": body}
+
+
+def _openai_output_text(body: Dict[str, object]) -> str:
+    choices = body.get("choices")
+    if isinstance(choices, list) and choices:
+        return choices[0].get("message", {}).get("content") or ""
+    parts: List[str] = []
+    for item in body.get("output") or []:
+        if item.get("type") != "message":
+            continue
+        for content in item.get("content") or []:
+            if content.get("type") == "output_text":
+                parts.append(content.get("text", ""))
+    return "".join(parts)
+
+
+def _openai_usage(body: Dict[str, object]) -> Dict[str, int]:
+    """Token counts of a chat-completions or responses body, in call_provider's keys."""
+    usage = body.get("usage") or {}
+    details = usage.get("prompt_tokens_details") or usage.get("input_tokens_details") or {}
+    counts = {
+        "input_tokens": usage.get("prompt_tokens", usage.get("input_tokens")),
+        "output_tokens": usage.get("completion_tokens", usage.get("output_tokens")),
+        "cached_input_tokens": details.get("cached_tokens"),
+    }
+    return {key: value for key, value in counts.items() if isinstance(value, int)}
+
+
+class OpenAIBatchBackend:
+    """OpenAI Batch API: one JSONL input file and batch per endpoint."""
+
+    name = "openai"
+
+    def __init__(self) -> None:
+        api_key = os.environ.get("OPENAI_API_KEY")
+        if not api_key:
+            raise RuntimeError("OPENAI_API_KEY is not set.")
+        self.client = get_client("openai", api_key, os.environ.get("OPENAI_BASE_URL", ""))
+        self.jobs: Dict[str, List[str]] = {}
+
+    def submit(self, requests: Dict[str, Dict[str, object]]) -> str:
+        by_endpoint: Dict[str, List[str]] = defaultdict(list)
+        for custom_id, request in requests.items():
+            url, line = _openai_request_line(custom_id, request)
+            by_endpoint[url].append(json.dumps(line, ensure_ascii=False))
+        batch_ids = []
+        for url, lines in by_endpoint.items():
+            upload = self.client.files.create(
+                file=("batch.jsonl", ("\n".join(lines) + "\n").encode("utf-8")),
+                purpose="batch",
+            )
+            batch = self.client.batches.create(
+                input_file_id=upload.id,
+                endpoint=url,
+                completion_window="24h",
+            )
+            batch_ids.append(batch.id)
+        handle = ",".join(batch_ids)
+        self.jobs[handle] = batch_ids
+        return handle
+
+    def poll(self, handle: str) -> bool:
+        return all(
+            self.client.batches.retrieve(batch_id).status in TERMINAL_OPENAI
+            for batch_id in self.jobs[handle]
+        )
+
+    def results(self, handle: str) -> BatchResults:
+        results: BatchResults = {}
+        for batch_id in self.jobs[handle]:
+            batch = self.client.batches.retrieve(batch_id)
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if not file_id:
+                    continue
+                for raw in self.client.files.content(file_id).text.splitlines():
+                    if not raw.strip():
+                        continue
+                    line = json.loads(raw)
+                    response = line.get("response") or {}
+                    body = response.get("body") or {}
+                    if line.get("error") or response.get("status_code") != 200:
+                        error = line.get("error") or body.get("error")
+                        results[line["custom_id"]] = (None, json.dumps(error, ensure_ascii=False), _openai_usage(body))
+                    else:
+                        results[line["custom_id"]] = (_openai_output_text(body), None, _openai_usage(body))
+        return results
+
+
+class AnthropicBatchBackend:
+    """Anthropic Message Batches API."""
+
+    name = "anthropic"
+
+    def __init__(self) -> None:
+        api_key = os.environ.get("ANTHROPIC_API_KEY")
+        if not api_key:
+            raise RuntimeError("ANTHROPIC_API_KEY is not set.")
+        base_url = os.environ.get("ANTHROPIC_BASE_URL", "https://api.anthropic.com")
+        self.client = get_client("anthropic", api_key, base_url)
+
+    def submit(self, requests: Dict[str, Dict[str, object]]) -> str:
+        entries = []
+        for custom_id, request in requests.items():
+            if request.get("enable_search_tool"):
+                raise RuntimeError("Anthropic batches do not support --enable-search-tool.")
+            params: Dict[str, object] = {
+                "model": request["model"],
+                "max_tokens": request["max_tokens"],
+                "temperature": request["temperature"],
+                "messages": [{"role": "user", "content": anthropic_content(request["prompt"])}],
+            }
+            if request.get("system"):
+                params["system"] = request["system"]
+            entries.append({"custom_id": custom_id, "params": params})
+        return self.client.messages.batches.create(requests=entries).id
+
+    def poll(self, handle: str) -> bool:
+        return self.client.messages.batches.retrieve(handle).processing_status == "ended"
+
+    def results(self, handle: str) -> BatchResults:
+        results: BatchResults = {}
+        for entry in self.client.messages.batches.results(handle):
+            result = entry.result
+            if result.type == "succeeded":
+                text = "".join(part.text for part in result.message.content if part.type == "text")
+                usage = result.message.usage
+                cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+                cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+                counts = {
+                    "input_tokens": usage.input_tokens + cache_read + cache_write,
+                    "output_tokens": usage.output_tokens,
+                    "cached_input_tokens": cache_read,
+                    "cache_creation_input_tokens": cache_write,
+                }
+                results[entry.custom_id] = (text, None, counts)
+            else:
+                results[entry.custom_id] = (None, f"Batch entry {result.type}.", {})
+        return results
+
+
+class LocalBatchBackend:
+    """File-based stand-in for a batch endpoint, for offline runs and tests.
+
+    ``submit`` writes ``{root}/{batch_id}/requests.jsonl``; ``process``
+    answers every request with ``responder(prompt, model)`` and writes
+    ``results.jsonl``. With ``auto_complete`` batches are processed on the
+    first poll; otherwise something else has to call ``process``. Token
+    usage is estimated from the text, like the fake provider server does.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        root: Path,
+        responder: Callable[[str, str], str] = fake_response,
+        auto_complete: bool = True,
+    ) -> None:
+        self.root = Path(root)
+        self.responder = responder
+        self.auto_complete = auto_complete
+
+    def _status(self, batch_dir: Path) -> str:
+        try:
+            return json.loads((batch_dir / "status.json").read_text(encoding="utf-8"))["status"]
+        except (OSError, ValueError, KeyError):
+            return "missing"
+
+    def _set_status(self, batch_dir: Path, status: str) -> None:
+        (batch_dir / "status.json").write_text(json.dumps({"status": status}) + "\n", encoding="utf-8")
+
+    def submit(self, requests: Dict[str, Dict[str, object]]) -> str:
+        batch_id = f"local_{uuid.uuid4().hex[:12]}"
+        batch_dir = self.root / batch_id
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        with (batch_dir / "requests.jsonl").open("w", encoding="utf-8") as handle:
+            for custom_id, request in requests.items():
+                line = {"custom_id": custom_id, **{k: v for k, v in request.items() if k != "timeout"}}
+                handle.write(json.dumps(line, ensure_ascii=False) + "\n")
+        self._set_status(batch_dir, "in_progress")
+        return batch_id
+
+    def process(self, batch_id: str) -> None:
+        batch_dir = self.root / batch_id
+        with (batch_dir / "requests.jsonl").open("r", encoding="utf-8") as source, \
+                (batch_dir / "results.jsonl").open("w", encoding="utf-8") as sink:
+            for raw in source:
+                request = json.loads(raw)
+                line = {"custom_id": request["custom_id"]}
+                usage = {"input_tokens": estimate_tokens(request["prompt"]) + estimate_tokens(request.get("system") or "")}
+                try:
+                    line["response"] = self.responder(request["prompt"], request["model"])
+                    usage["output_tokens"] = estimate_tokens(line["response"])
+                except Exception as exc:  # noqa: BLE001 - recorded per request
+                    line["error"] = f"{type(exc).__name__}: {exc}"
+                line["usage"] = usage
+                sink.write(json.dumps(line, ensure_ascii=False) + "\n")
+        self._set_status(batch_dir, "completed")
+
+    def poll(self, handle: str) -> bool:
+        batch_dir = self.root / handle
+        if self.auto_complete and self._status(batch_dir) == "in_progress":
+            self.process(handle)
+        return self._status(batch_dir) == "completed"
+
+    def results(self, handle: str) -> BatchResults:
+        results: BatchResults = {}
+        with (self.root / handle / "results.jsonl").open("r", encoding="utf-8") as handle_file:
+            for raw in handle_file:
+                line = json.loads(raw)
+                results[line["custom_id"]] = (line.get("response"), line.get("error"), line.get("usage") or {})
+        return results
+
+
+class InteractiveBackend:
+    """Fallback for providers without a batch API: concurrent regular calls."""
+
+    name = "interactive"
+
+    def __init__(self, max_workers: int = 4) -> None:
+        self.max_workers = max_workers
+        self.done: Dict[str, BatchResults] = {}
+
+    def submit(self, requests: Dict[str, Dict[str, object]]) -> str:
+        def run(item: Tuple[str, Dict[str, object]]) -> Tuple[str, Tuple[Optional[str], Optional[str], None]]:
+            custom_id, request = item
+            try:
+                return custom_id, (call_provider(**request), None, None)
+            except Exception as exc:  # noqa: BLE001 - recorded per request
+                return custom_id, (None, f"{type(exc).__name__}: {exc}", None)
+
+        handle = f"interactive_{uuid.uuid4().hex[:12]}"
+        # Worker threads do not inherit context; carry the telemetry binding over.
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            self.done[handle] = dict(pool.map(lambda item: context.copy().run(run, item), requests.items()))
+        return handle
+
+    def poll(self, handle: str) -> bool:
+        return True
+
+    def results(self, handle: str) -> BatchResults:
+        return self.done.pop(handle)
+
+
+def make_backends(kind: str, run_dir: Path) -> Dict[str, object]:
+    if kind == "local":
+        local = LocalBatchBackend(run_dir / "batches" / "local")
+        return {"openai": local, "anthropic": local, "gemini": local}
+    if kind == "interactive":
+        interactive = InteractiveBackend()
+        return {"openai": interactive, "anthropic": interactive, "gemini": interactive}
+    return {}
+
+
+def backend_for(provider: str, kind: str, backends: Dict[str, object]) -> object:
+    if provider not in backends:
+        if provider == "openai":
+            backends[provider] = OpenAIBatchBackend()
+        elif provider == "anthropic":
+            backends[provider] = AnthropicBatchBackend()
+        else:
+            # Gemini batch jobs are not wired up; run those nodes interactively.
+            backends[provider] = InteractiveBackend()
+    return backends[provider]
+
+
+def record_batch_call(
+    node: Node,
+    request: Dict[str, object],
+    wall_seconds: float,
+    usage: Optional[Dict[str, int]] = None,
+    error: Optional[str] = None,
+    cache_hit: bool = False,
+) -> None:
+    """Ledger line for one batch request, under the node's id and stage like run_pipeline's calls."""
+    with bind(node_id=node.node_id, stage=node.stage, week_start=node.week_start):
+        record_call(
+            str(request["provider"]),
+            str(request["model"]),
+            wall_seconds,
+            usage=usage,
+            cache_hit=cache_hit,
+            error=error,
+            batch=not cache_hit,
+        )
+
+
+def run_batches(
+    nodes: Dict[str, Node],
+    manifest: RunManifest,
+    kind: str,
+    backends: Dict[str, object],
+    resume: bool = False,
+    poll_interval: float = 30.0,
+) -> Dict[str, str]:
+    """Submit the graph wave by wave: every node whose dependencies are done
+    goes into one batch per backend, and the results are written to the
+    usual output paths before the next wave is built.
+    """
+    status: Dict[str, str] = {key: "pending" for key in nodes}
+    wave = 0
+
+    while True:
+        for key, node in nodes.items():
+            if status[key] == "pending" and any(status[dep] in ("failed", "skipped") for dep in node.deps):
+                status[key] = "skipped"
+        ready = [
+            key for key, node in nodes.items()
+            if status[key] == "pending" and all(status[dep] == "done" for dep in node.deps)
+        ]
+        if not ready:
+            break
+        wave += 1
+
+        jobs: Dict[str, Tuple[Node, argparse.Namespace, Dict[str, object], Dict[str, Optional[str]]]] = {}
+        grouped: Dict[int, Tuple[object, Dict[str, Dict[str, object]]]] = {}
+        for index, key in enumerate(sorted(ready, key=lambda item: nodes[item].priority())):
+            node = nodes[key]
+            inputs = node_input_hashes(node)
+            if resume and manifest.is_fresh(key, node.out, inputs):
+                status[key] = "done"
+                continue
+            argv = node_argv(node)
+            if argv is None:
+                print(f"  Skipped {node.label()}: no prior file.")
+                status[key] = "failed"
+                continue
+            module = SCRIPT_MODULES[node.script]
+            args = module.parse_args(argv)
+            request = module.build_request(args)
+
+            cache = cache_from_args(args)
+            if cache is not None and not args.refresh_cache:
+                cache_entry = request_cache_key(request)
+                cached = cache.get(cache_entry)
+                if cached is not None:
+                    record_batch_call(node, request, 0.0, cache_hit=True)
+                    status[key] = finish_node(node, module, args, cached, None, manifest, inputs)
+                    if status[key] != "done":
+                        # A replayed answer that no longer validates would fail every run; resubmit next time.
+                        cache.discard(cache_entry)
+                    continue
+
+            custom_id = f"n{wave}_{index}"
+            jobs[custom_id] = (node, args, request, inputs)
+            backend = backend_for(node.provider, kind, backends)
+            grouped.setdefault(id(backend), (backend, {}))[1][custom_id] = request
+
+        if not jobs:
+            continue
+        print(f"Wave {wave}: {len(jobs)} request(s) in {len(grouped)} batch(es)")
+
+        submitted = time.monotonic()
+        handles = [(backend, backend.submit(requests)) for backend, requests in grouped.values()]
+        for backend, handle in handles:
+            print(f"  Submitted {backend.name} batch {handle}")
+        pending = list(handles)
+        while pending:
+            pending = [(backend, handle) for backend, handle in pending if not backend.poll(handle)]
+            if pending:
+                time.sleep(poll_interval)
+
+        results: BatchResults = {}
+        for backend, handle in handles:
+            results.update(backend.results(handle))
+        waited = time.monotonic() - submitted
+        for custom_id, (node, args, request, inputs) in jobs.items():
+            text, error, usage = results.get(custom_id, (None, "No result returned.", {}))
+            if usage is not None:
+                record_batch_call(node, request, waited, usage, error)
+            module = SCRIPT_MODULES[node.script]
+            status[node.node_id] = finish_node(node, module, args, text, error, manifest, inputs)
+            cache = cache_from_args(args)
+            # Like call_provider, only cache answers that parse, and only once they produced valid output.
+            done = status[node.node_id] == "done"
+            if cache is not None and done and cacheable_response(str(text), bool(request["response_json"])):
+                cache.put(
+                    request_cache_key(request),
+                    text,
+                    {"provider": request["provider"], "model": request["model"], "batch": True},
+                )
+
+    return status
+
+
+def finish_node(
+    node: Node,
+    module: object,
+    args: argparse.Namespace,
+    text: Optional[str],
+    error: Optional[str],
+    manifest: RunManifest,
+    inputs: Dict[str, Optional[str]],
+) -> str:
+    """Write one node's answer and record it; an output that does not validate fails the node, as in run_pipeline."""
+    if text is None:
+        print(f"  Failed {node.label()}: {error}")
+        return "failed"
+    try:
+        code = module.write_response(args, text)
+    except SystemExit as exc:
+        print(f"  Failed {node.label()}: {exc.code}")
+        return "failed"
+    if code != 0:
+        return "failed"
+    errors = validate_output(node)
+    manifest.record(node.node_id, node.stage, node.out, inputs, valid=not errors, errors=errors)
+    if errors:
+        print(f"  Failed {node.label()}: invalid output {node.out}: {'; '.join(errors)}")
+        return "failed"
+    print(f"  Done {node.label()} -> {node.out}")
+    return "done"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run a backfill through provider batch APIs.")
+    parser.add_argument("--weeks-csv", default="data/weeks.csv")
+    parser.add_argument("--run-id", default=None, help="Run id. Default: timestamp + pid.")
+    parser.add_argument("--run-dir", default=None, help="Run directory. Default: data/runs/{run_id}.")
+    parser.add_argument("--model", action="append", choices=sorted(MODEL_PROVIDERS))
+    parser.add_argument("--social", action="store_true", help="Also run the social search track.")
+    parser.add_argument(
+        "--backend",
+        default="auto",
+        choices=["auto", "local", "interactive"],
+        help="auto: OpenAI Batch / Anthropic Message Batches (Gemini runs interactively); "
+        "local: file-based stand-in under {run_dir}/batches/local.",
+    )
+    parser.add_argument("--poll-interval", type=float, default=30.0, help="Seconds between batch polls.")
+    parser.add_argument("--resume", action="store_true", help="Skip nodes already complete in manifest.json.")
+    add_cache_arguments(parser)
+    parser.add_argument("--evidence-token-budget", type=int, default=None)
+    add_store_arguments(parser)
+    parser.add_argument("--skip-analysis", action="store_true")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+
+    if args.forecast_store:
+        try:
+            require_engine()
+        except RuntimeError as exc:
+            raise SystemExit(str(exc))
+
+    run_id = args.run_id or f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+    run_dir = Path(args.run_dir or f"data/runs/{run_id}")
+    run_dir.mkdir(parents=True, exist_ok=True)
+    print(f"Run dir: {run_dir}")
+
+    models = args.model or DEFAULT_MODELS
+    weeks = read_weeks(Path(args.weeks_csv))
+    nodes = build_graph(
+        run_dir,
+        weeks,
+        models,
+        enable_social_search=args.social,
+        extra_argv=cache_argv(args),
+        forecast_argv=compaction_argv(args.evidence_token_budget),
+    )
+
+    manifest = RunManifest(run_dir, on_change=catalog_listener(run_dir))
+    manifest.start(models, [week_start for _, week_start, _ in weeks], args.social, len(nodes))
+    started = time.monotonic()
+    counts: Counter = Counter()
+    try:
+        with bind(ledger=open_ledger(run_dir / LEDGER_NAME)):
+            status = run_batches(
+                nodes,
+                manifest,
+                args.backend,
+                make_backends(args.backend, run_dir),
+                resume=args.resume,
+                poll_interval=args.poll_interval,
+            )
+        counts = Counter(status.values())
+    finally:
+        close_clients()
+        manifest.finish("completed" if counts["done"] == len(nodes) else "failed")
+    print(
+        f"Finished in {time.monotonic() - started:.1f}s: {counts['done']} done, "
+        f"{counts['failed']} failed, {counts['skipped']} skipped."
+    )
+    if args.forecast_store:
+        # Results land a wave at a time, so one rebuild at the end replaces per-file upserts.
+        path, rows = compact_run(run_dir)
+        print(f"Forecast store: {rows} rows in {path}")
+
+    if not args.skip_analysis:
+        run_analysis(run_dir, args.social)
+    return 0 if counts["failed"] == 0 and counts["skipped"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""Time and memory-profile the analysis scripts against synthetic run trees."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from generate_synthetic_runs import add_scale_arguments, generate, scale_params
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+# Each benchmark builds its command line from (runs_dir, scratch_dir).
+BENCHMARKS: Dict[str, Callable[[Path, Path], List[str]]] = {
+    "analyze_search_logs": lambda runs, scratch: [
+        str(SCRIPTS_DIR / "analyze_search_logs.py"),
+        *sorted(str(path) for path in runs.glob("*/search_logs")),
+        "--out-dir", str(scratch / "analysis"),
+    ],
+    "validate_forecast": lambda runs, scratch: [
+        str(SCRIPTS_DIR / "validate_forecast.py"),
+        *sorted(str(path) for path in runs.glob("*/forecasts")),
+    ],
+    "schema_validator": lambda runs, scratch: [
+        str(SCRIPTS_DIR / "schema_validator.py"),
+        *sorted(str(path) for path in runs.glob("*/forecasts")),
+        *sorted(str(path) for path in runs.glob("*/search_logs*")),
+    ],
+    "visualize_runs": lambda runs, scratch: [
+        str(SCRIPTS_DIR / "visualize_runs.py"),
+        "--runs-dir", str(runs),
+        "--force",
+    ],
+    # Runs after visualize_runs, so it measures the all-charts-unchanged path.
+    "visualize_runs_incremental": lambda runs, scratch: [
+        str(SCRIPTS_DIR / "visualize_runs.py"),
+        "--runs-dir", str(runs),
+    ],
+}
+
+
+def max_rss_mb(rusage: object) -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    rss = float(getattr(rusage, "ru_maxrss", 0))
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_once(command: List[str]) -> Dict[str, float]:
+    """Run one child process and return its wall time, CPU time, peak RSS and exit code."""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, *command],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    _, status, rusage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - started
+    process.returncode = os.waitstatus_to_exitcode(status)
+    stderr = process.stderr.read().decode("utf-8", "replace") if process.stderr else ""
+    if process.stderr:
+        process.stderr.close()
+    if process.returncode not in (0, 1):
+        raise RuntimeError(f"{' '.join(command)} exited {process.returncode}:\n{stderr[-2000:]}")
+    return {
+        "wall_s": wall,
+        "user_s": rusage.ru_utime,
+        "sys_s": rusage.ru_stime,
+        "max_rss_mb": max_rss_mb(rusage),
+        "exit_code": process.returncode,
+    }
+
+
+def bench(name: str, command: List[str], repeat: int) -> Dict[str, object]:
+    samples = [run_once(command) for _ in range(repeat)]
+    wall = [sample["wall_s"] for sample in samples]
+    return {
+        "script": name,
+        "repeat": repeat,
+        "wall_s_median": round(statistics.median(wall), 4),
+        "wall_s_min": round(min(wall), 4),
+        "cpu_s_median": round(statistics.median(sample["user_s"] + sample["sys_s"] for sample in samples), 4),
+        "max_rss_mb": round(max(sample["max_rss_mb"] for sample in samples), 1),
+        "exit_code": int(samples[-1]["exit_code"]),
+    }
+
+
+def count_files(runs_dir: Path) -> Dict[str, int]:
+    return {
+        "runs": sum(1 for path in runs_dir.iterdir() if path.is_dir()),
+        "search_logs": sum(1 for _ in runs_dir.glob("*/search_logs*/*/*.json")),
+        "forecasts": sum(1 for _ in runs_dir.glob("*/forecasts/*/*.json")),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def previous_results(path: Path, params: Dict[str, object]) -> Dict[str, Dict[str, object]]:
+    """Latest earlier result per script recorded at the same scale."""
+    latest: Dict[str, Dict[str, object]] = {}
+    if not path.exists():
+        return latest
+    with path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get("params") == params:
+                latest[str(record.get("script"))] = record
+    return latest
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the analysis scripts on synthetic runs.")
+    parser.add_argument(
+        "--data-dir",
+        default=None,
+        help="Where to generate the synthetic runs. Default: a temp dir, removed afterwards.",
+    )
+    parser.add_argument("--reuse", action="store_true", help="Reuse runs already in --data-dir.")
+    parser.add_argument("--script", action="append", choices=sorted(BENCHMARKS), help="Default: all.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--results",
+        default="benchmarks/analysis_results.jsonl",
+        help="Append one JSON line per script here ('' to skip).",
+    )
+    parser.add_argument(
+        "--fail-threshold",
+        type=float,
+        default=None,
+        help="Exit non-zero if a median wall time regresses by more than this fraction vs the last result.",
+    )
+    add_scale_arguments(parser)
+    args = parser.parse_args(argv)
+
+    params = scale_params(args)
+    results_path = Path(args.results) if args.results else None
+    baseline = previous_results(results_path, params) if results_path else {}
+    commit = git_commit()
+    regressed = False
+
+    with tempfile.TemporaryDirectory(prefix="bench_analysis_") as scratch:
+        runs_dir = Path(args.data_dir) if args.data_dir else Path(scratch) / "runs"
+        if not (args.reuse and runs_dir.exists()):
+            started = time.perf_counter()
+            written = generate(runs_dir, params)
+            print(f"Generated {written} files in {time.perf_counter() - started:.1f}s under {runs_dir}")
+        files = count_files(runs_dir)
+        print(f"Data: {json.dumps(files)}")
+
+        for name in args.script or list(BENCHMARKS):
+            result = bench(name, BENCHMARKS[name](runs_dir, Path(scratch)), args.repeat)
+            record = {
+                "ts": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "commit": commit,
+                "params": params,
+                "files": files,
+                **result,
+            }
+            line = (
+                f"{name:<26} wall {result['wall_s_median']:>8.3f}s  cpu {result['cpu_s_median']:>8.3f}s  "
+                f"rss {result['max_rss_mb']:>7.1f} MB"
+            )
+            previous = baseline.get(name)
+            if previous and previous.get("wall_s_median"):
+                change = result["wall_s_median"] / float(previous["wall_s_median"]) - 1.0
+                line += f"  ({change:+.1%} vs {previous.get('commit') or 'previous'})"
+                if args.fail_threshold is not None and change > args.fail_threshold:
+                    regressed = True
+            print(line)
+            if results_path:
+                results_path.parent.mkdir(parents=True, exist_ok=True)
+                with results_path.open("a", encoding="utf-8") as handle:
+                    handle.write(json.dumps(record) + "\n")
+
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""End-to-end throughput benchmark: a full run_pipeline graph against the fake provider server."""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import run_pipeline
+from fake_provider_server import add_server_arguments, config_from_args, provider_env, serve_in_thread
+from llm_utils import close_clients
+from telemetry import LEDGER_NAME, read_ledger
+from summarize_telemetry import percentile
+
+
+def write_weeks(path: Path, weeks: int, start: str = "2025-12-12") -> None:
+    first = date.fromisoformat(start)
+    with path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(handle, fieldnames=["week_index", "week_start", "week_end"])
+        writer.writeheader()
+        for index in range(weeks):
+            week_start = first + timedelta(days=7 * index)
+            writer.writerow({
+                "week_index": index,
+                "week_start": week_start.isoformat(),
+                "week_end": (week_start + timedelta(days=6)).isoformat(),
+            })
+
+
+def server_stats(base_url: str) -> Dict[str, int]:
+    with urllib.request.urlopen(f"{base_url}/stats", timeout=10) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark run_pipeline against the local fake provider server.")
+    parser.add_argument("--weeks", type=int, default=8)
+    parser.add_argument("--model", action="append", choices=sorted(run_pipeline.MODEL_PROVIDERS))
+    parser.add_argument("--social", action="store_true")
+    parser.add_argument("--max-concurrency", type=int, default=4)
+    parser.add_argument("--stream", action="store_true", help="Pass --stream to the pipeline.")
+    parser.add_argument(
+        "--client-rpm",
+        default="0",
+        help="LLM_RPM for the client-side limiter during the run (0: unlimited).",
+    )
+    parser.add_argument(
+        "--pipeline-arg",
+        action="append",
+        default=[],
+        help="Extra run_pipeline argument (repeatable), e.g. --pipeline-arg=--pool-size=32.",
+    )
+    parser.add_argument("--run-dir", default=None, help="Keep outputs here. Default: a temp dir, removed afterwards.")
+    parser.add_argument("--results", default=None, help="Append the result as one JSON line to this file.")
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = serve_in_thread(config_from_args(args))
+    env = provider_env(server.base_url)
+    env["LLM_RPM"] = str(args.client_rpm)
+    saved = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+
+    models = args.model or run_pipeline.DEFAULT_MODELS
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as scratch:
+        run_dir = Path(args.run_dir or Path(scratch) / "run")
+        weeks_csv = Path(scratch) / "weeks.csv"
+        write_weeks(weeks_csv, args.weeks)
+        pipeline_argv = [
+            "--weeks-csv", str(weeks_csv),
+            "--run-dir", str(run_dir),
+            "--max-concurrency", str(args.max_concurrency),
+            "--no-cache",
+            "--skip-analysis",
+        ]
+        for model in models:
+            pipeline_argv += ["--model", model]
+        if args.social:
+            pipeline_argv.append("--social")
+        if args.stream:
+            pipeline_argv.append("--stream")
+        pipeline_argv += args.pipeline_arg
+
+        started = time.monotonic()
+        try:
+            code = run_pipeline.main(pipeline_argv)
+        finally:
+            wall = time.monotonic() - started
+            close_clients()
+            stats = server_stats(server.base_url)
+            server.shutdown()
+            server.server_close()
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+        records = read_ledger(run_dir / LEDGER_NAME)
+        latencies = [float(record.get("wall_s") or 0.0) for record in records if not record.get("cache_hit")]
+        completed = sum(1 for record in records if not record.get("error"))
+
+    requests = stats.get("requests", 0)
+    result = {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "weeks": args.weeks,
+        "models": models,
+        "social": args.social,
+        "stream": args.stream,
+        "max_concurrency": args.max_concurrency,
+        "latency": f"{args.latency[0]}:{','.join(f'{value:g}' for value in args.latency[1])}",
+        "error_rate": args.error_rate,
+        "throttle_rate": args.throttle_rate,
+        "pipeline_exit": code,
+        "wall_s": round(wall, 3),
+        "requests": requests,
+        "throttled": stats.get("throttled", 0),
+        "errors": stats.get("errors", 0),
+        "completed_calls": completed,
+        "calls_per_s": round(completed / wall, 3) if wall > 0 else None,
+        "requests_per_s": round(requests / wall, 3) if wall > 0 else None,
+        "call_p50_s": percentile(latencies, 50),
+        "call_p95_s": percentile(latencies, 95),
+    }
+    print(json.dumps(result, indent=2), file=sys.stderr)
+    print(
+        f"Benchmark: {completed} calls in {wall:.1f}s = {result['calls_per_s']} calls/s "
+        f"({requests} HTTP requests, {result['throttled']} throttled, {result['errors']} errors)"
+    )
+    if args.results:
+        results_path = Path(args.results)
+        results_path.parent.mkdir(parents=True, exist_ok=True)
+        with results_path.open("a", encoding="utf-8") as handle:
+            handle.write(json.dumps(result) + "\n")
+    return code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
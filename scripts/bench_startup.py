@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Measure interpreter startup and import cost of every script with ``python -X importtime``."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from bench_analysis import git_commit
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+# "import time: <self us> | <cumulative us> | <one space, two more per level><module>"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)\s*$")
+
+
+def script_modules() -> List[str]:
+    return sorted(path.stem for path in SCRIPTS_DIR.glob("*.py"))
+
+
+def parse_importtime(stderr: str, module: str) -> Tuple[int, int, List[Tuple[str, int]]]:
+    """(all imports, the module's own import, its direct imports) in microseconds.
+
+    ``-X importtime`` prints each module after its children, so the lines
+    one level deep that precede the module's top-level line are its direct
+    imports.
+    """
+    total = 0
+    own = 0
+    children: List[Tuple[str, int]] = []
+    pending: List[Tuple[str, int]] = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, depth, name = int(match.group(2)), (len(match.group(3)) - 1) // 2, match.group(4)
+        if depth == 0:
+            total += cumulative
+            if name == module:
+                own, children = cumulative, pending
+            pending = []
+        elif depth == 1:
+            pending.append((name, cumulative))
+    return total, own, sorted(children, key=lambda item: -item[1])
+
+
+def run_once(module: str) -> Dict[str, object]:
+    """Import ``module`` in a fresh interpreter; return wall time and the import-time breakdown."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SCRIPTS_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"import {module} failed:\n" + "\n".join(errors[-20:]))
+    total, own, children = parse_importtime(result.stderr, module)
+    return {"wall_s": wall, "imports_us": total, "module_us": own, "children": children}
+
+
+def bench(module: str, repeat: int, top: int) -> Dict[str, object]:
+    samples = [run_once(module) for _ in range(repeat)]
+    fastest = min(samples, key=lambda sample: sample["module_us"])  # type: ignore[arg-type,return-value]
+    return {
+        "script": module,
+        "repeat": repeat,
+        "wall_s_median": round(statistics.median(sample["wall_s"] for sample in samples), 4),  # type: ignore[misc]
+        "import_ms_median": round(statistics.median(sample["module_us"] for sample in samples) / 1000, 2),  # type: ignore[misc]
+        "all_imports_ms_median": round(statistics.median(sample["imports_us"] for sample in samples) / 1000, 2),  # type: ignore[misc]
+        "heaviest": [
+            {"module": name, "ms": round(cumulative / 1000, 2)}
+            for name, cumulative in fastest["children"][:top]  # type: ignore[index]
+        ],
+    }
+
+
+def previous_results(path: Path) -> Dict[str, Dict[str, object]]:
+    """Latest earlier result per script."""
+    latest: Dict[str, Dict[str, object]] = {}
+    if not path.exists():
+        return latest
+    with path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if line:
+                record = json.loads(line)
+                latest[str(record.get("script"))] = record
+    return latest
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the import time of each script in scripts/.")
+    parser.add_argument("--script", action="append", choices=script_modules(), help="Default: all.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=3, help="Heaviest direct imports to list per script.")
+    parser.add_argument(
+        "--results",
+        default="benchmarks/startup_results.jsonl",
+        help="Append one JSON line per script here ('' to skip).",
+    )
+    parser.add_argument(
+        "--fail-threshold",
+        type=float,
+        default=None,
+        help="Exit non-zero if a median import time regresses by more than this fraction vs the last result.",
+    )
+    args = parser.parse_args(argv)
+
+    results_path = Path(args.results) if args.results else None
+    baseline = previous_results(results_path) if results_path else {}
+    commit = git_commit()
+    regressed = False
+
+    for name in args.script or script_modules():
+        result = bench(name, args.repeat, args.top)
+        record = {"ts": datetime.now(timezone.utc).isoformat(timespec="seconds"), "commit": commit, **result}
+        heaviest = ", ".join(f"{item['module']} {item['ms']:.0f}ms" for item in result["heaviest"])  # type: ignore[attr-defined]
+        line = (
+            f"{name:<26} import {result['import_ms_median']:>8.1f}ms  "
+            f"wall {result['wall_s_median'] * 1000:>7.0f}ms  [{heaviest}]"
+        )
+        previous = baseline.get(name)
+        if previous and previous.get("import_ms_median"):
+            change = result["import_ms_median"] / float(previous["import_ms_median"]) - 1.0  # type: ignore[operator]
+            line += f"  ({change:+.1%} vs {previous.get('commit') or 'previous'})"
+            if args.fail_threshold is not None and change > args.fail_threshold:
+                regressed = True
+        print(line)
+        if results_path:
+            results_path.parent.mkdir(parents=True, exist_ok=True)
+            with results_path.open("a", encoding="utf-8") as handle:
+                handle.write(json.dumps(record) + "\n")
+
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Compact search logs and priors before they are inlined into forecast prompts."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from rate_limit import estimate_tokens
+
+SOURCE_FIELDS = ("title", "url", "date", "publisher", "why_relevant")
+PRIOR_FIELDS = (
+    "week_start",
+    "week_end",
+    "condition",
+    "forecast_party_list",
+    "forecast_district",
+    "forecast_total",
+)
+DEFAULT_TOKEN_BUDGET = 4000
+
+
+def json_tokens(value: object) -> int:
+    return estimate_tokens(json.dumps(value, ensure_ascii=False))
+
+
+def dedupe_key(url: str) -> str:
+    """URL identity for dedupe: case-folded host without www, no fragment or trailing slash."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return urlunsplit((parts.scheme.lower(), host, parts.path.rstrip("/"), parts.query, ""))
+
+
+def rank_sources(sources: List[Dict[str, object]], week_start: str, week_end: str) -> List[Dict[str, object]]:
+    """In-window sources first, then round-robin across publishers so the
+    trimmed list keeps as many distinct publishers as possible."""
+
+    def in_window(src: Dict[str, object]) -> bool:
+        value = str(src.get("date", ""))
+        return bool(week_start and week_end) and week_start <= value <= week_end
+
+    ranked: List[Dict[str, object]] = []
+    for group in (
+        [src for src in sources if in_window(src)],
+        [src for src in sources if not in_window(src)],
+    ):
+        by_publisher: "OrderedDict[str, List[Dict[str, object]]]" = OrderedDict()
+        for src in group:
+            by_publisher.setdefault(str(src.get("publisher", "")).strip().lower(), []).append(src)
+        while by_publisher:
+            for publisher in list(by_publisher):
+                ranked.append(by_publisher[publisher].pop(0))
+                if not by_publisher[publisher]:
+                    del by_publisher[publisher]
+    return ranked
+
+
+def compact_search_log(
+    log: Dict[str, object],
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+) -> Tuple[Dict[str, object], Dict[str, int]]:
+    """Keep only what the forecast prompt uses, deduped and trimmed to ``token_budget``.
+
+    Queries, excluded sources and notes are dropped; sources are deduped
+    by URL, ranked, and added until the estimate reaches the budget. The
+    evidence summary is always kept.
+    """
+    week_start = str(log.get("week_start", ""))
+    week_end = str(log.get("week_end", ""))
+    seen = set()
+    sources: List[Dict[str, object]] = []
+    raw_sources = log.get("sources") or []
+    for src in raw_sources if isinstance(raw_sources, list) else []:
+        if not isinstance(src, dict):
+            continue
+        url = str(src.get("url", ""))
+        key = dedupe_key(url) if url else None
+        if key and key in seen:
+            continue
+        if key:
+            seen.add(key)
+        sources.append({field: src[field] for field in SOURCE_FIELDS if field in src})
+
+    compacted: Dict[str, object] = {
+        "week_start": week_start,
+        "week_end": week_end,
+        "summary": log.get("summary", []),
+        "sources": [],
+    }
+    used = json_tokens(compacted)
+    kept: List[Dict[str, object]] = []
+    for src in rank_sources(sources, week_start, week_end):
+        cost = json_tokens(src) + 1
+        if kept and used + cost > token_budget:
+            break
+        kept.append(src)
+        used += cost
+    compacted["sources"] = kept
+
+    stats = {
+        "input_tokens": json_tokens(log),
+        "output_tokens": json_tokens(compacted),
+        "sources_in": len(raw_sources) if isinstance(raw_sources, list) else 0,
+        "sources_deduped": len(sources),
+        "sources_out": len(kept),
+    }
+    return compacted, stats
+
+
+def compact_prior(prior: Dict[str, object]) -> Dict[str, object]:
+    """Reduce a prior forecast to its week, condition and seat maps."""
+    return {field: prior[field] for field in PRIOR_FIELDS if field in prior}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compact a search log for forecast prompts.")
+    parser.add_argument("search_log", help="Search log JSON file.")
+    parser.add_argument("--token-budget", type=int, default=DEFAULT_TOKEN_BUDGET)
+    parser.add_argument("--out", help="Output path. Default: stdout.")
+    args = parser.parse_args(argv)
+
+    log = json.loads(Path(args.search_log).read_text(encoding="utf-8"))
+    compacted, stats = compact_search_log(log, args.token_budget)
+    text = json.dumps(compacted, indent=2, ensure_ascii=False) + "\n"
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+    else:
+        print(text, end="")
+    print(
+        f"Tokens: {stats['input_tokens']} -> {stats['output_tokens']}; "
+        f"sources: {stats['sources_in']} -> {stats['sources_deduped']} deduped -> {stats['sources_out']} kept",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
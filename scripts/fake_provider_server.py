@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""Local stand-in for the OpenAI, Anthropic and Gemini HTTP APIs.
+
+Answers with schema-valid synthetic search logs and forecasts (see
+fake_responses.py) after a configurable latency, and can inject server
+errors and 429s. Point the SDKs at it with:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765
+    GEMINI_BASE_URL=http://127.0.0.1:8765
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from fake_responses import fake_response
+from rate_limit import estimate_tokens
+
+GEMINI_PATH = re.compile(r"^/v1(?:beta|alpha)?\d*/models/([^/:]+):(generateContent|streamGenerateContent)$")
+STREAM_CHUNK_CHARS = 64
+
+
+def parse_latency(spec: str) -> Tuple[str, List[float]]:
+    """``fixed:S``, ``uniform:LO,HI`` or ``lognormal:MEDIAN,SIGMA`` (seconds)."""
+    kind, _, raw = spec.partition(":")
+    try:
+        values = [float(value) for value in raw.split(",") if value]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid latency '{spec}'.")
+    expected = {"fixed": 1, "uniform": 2, "lognormal": 2}
+    if kind not in expected or len(values) != expected[kind]:
+        raise argparse.ArgumentTypeError(
+            f"Invalid latency '{spec}'; use fixed:S, uniform:LO,HI or lognormal:MEDIAN,SIGMA."
+        )
+    return kind, values
+
+
+@dataclass
+class ServerConfig:
+    latency: Tuple[str, List[float]] = ("fixed", [0.0])
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    rpm: float = 0.0
+    retry_after: float = 1.0
+    seed: Optional[int] = None
+    stats: Counter = field(default_factory=Counter)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    recent: Deque[float] = field(default_factory=deque)
+
+    def __post_init__(self) -> None:
+        self.rng = random.Random(self.seed)
+
+    def sample_latency(self) -> float:
+        kind, values = self.latency
+        with self.lock:
+            if kind == "uniform":
+                return self.rng.uniform(values[0], values[1])
+            if kind == "lognormal":
+                return self.rng.lognormvariate(0.0, values[1]) * values[0]
+            return values[0]
+
+    def sample_seed(self) -> int:
+        with self.lock:
+            return self.rng.getrandbits(32)
+
+    def outcome(self) -> str:
+        """Decide whether this request succeeds, is throttled or fails."""
+        now = time.monotonic()
+        with self.lock:
+            if self.rpm > 0:
+                while self.recent and now - self.recent[0] > 60.0:
+                    self.recent.popleft()
+                if len(self.recent) >= self.rpm:
+                    return "throttle"
+                self.recent.append(now)
+            roll = self.rng.random()
+        if roll < self.throttle_rate:
+            return "throttle"
+        if roll < self.throttle_rate + self.error_rate:
+            return "error"
+        return "ok"
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.stats[key] += 1
+
+
+def chunks(text: str, size: int = STREAM_CHUNK_CHARS) -> Iterator[str]:
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+def openai_prompt(body: Dict[str, object]) -> str:
+    parts: List[str] = []
+    for message in body.get("messages") or []:
+        content = message.get("content")
+        if isinstance(content, list):
+            parts.extend(str(item.get("text", "")) for item in content if isinstance(item, dict))
+        elif content:
+            parts.append(str(content))
+    source = body.get("input")
+    if isinstance(source, str):
+        parts.append(source)
+    elif isinstance(source, list):
+        for item in source:
+            content = item.get("content") if isinstance(item, dict) else None
+            if isinstance(content, str):
+                parts.append(content)
+            elif isinstance(content, list):
+                parts.extend(str(part.get("text", "")) for part in content if isinstance(part, dict))
+    return "\n".join(parts)
+
+
+def anthropic_prompt(body: Dict[str, object]) -> str:
+    parts: List[str] = []
+    for message in body.get("messages") or []:
+        content = message.get("content")
+        if isinstance(content, list):
+            parts.extend(str(block.get("text", "")) for block in content if isinstance(block, dict))
+        elif content:
+            parts.append(str(content))
+    return "\n".join(parts)
+
+
+def gemini_prompt(body: Dict[str, object]) -> str:
+    parts: List[str] = []
+    for content in body.get("contents") or []:
+        for part in content.get("parts") or []:
+            if isinstance(part, dict) and part.get("text"):
+                parts.append(str(part["text"]))
+    return "\n".join(parts)
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    server_version = "FakeProvider/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def config(self) -> ServerConfig:
+        return self.server.config  # type: ignore[attr-defined]
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002 - stdlib signature
+        if getattr(self.server, "verbose", False):
+            super().log_message(format, *args)
+
+    def send_json(self, status: int, payload: Dict[str, object], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def start_sse(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+    def send_event(self, payload: object, event: Optional[str] = None) -> None:
+        lines = f"event: {event}\n" if event else ""
+        data = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+        self.wfile.write(f"{lines}data: {data}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def do_GET(self) -> None:  # noqa: N802 - stdlib naming
+        if self.path.rstrip("/") == "/stats":
+            with self.config.lock:
+                stats = dict(self.config.stats)
+            self.send_json(200, stats)
+            return
+        self.send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self) -> None:  # noqa: N802 - stdlib naming
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self.send_json(400, {"error": {"message": "Request body is not JSON."}})
+            return
+
+        path = self.path.split("?", 1)[0]
+        gemini = GEMINI_PATH.match(path)
+        if path.endswith("/chat/completions"):
+            provider, prompt, model = "openai", openai_prompt(body), str(body.get("model", ""))
+        elif path.endswith("/responses"):
+            provider, prompt, model = "openai", openai_prompt(body), str(body.get("model", ""))
+        elif path.endswith("/messages"):
+            provider, prompt, model = "anthropic", anthropic_prompt(body), str(body.get("model", ""))
+        elif gemini:
+            provider, prompt, model = "gemini", gemini_prompt(body), gemini.group(1)
+        else:
+            self.send_json(404, {"error": {"message": f"Unknown path {path}"}})
+            return
+
+        self.config.count("requests")
+        self.config.count(f"requests_{provider}")
+        outcome = self.config.outcome()
+        if outcome == "throttle":
+            self.config.count("throttled")
+            self.send_json(
+                429,
+                {"error": {"type": "rate_limit_error", "message": "Rate limit exceeded (injected)."}},
+                {"Retry-After": f"{self.config.retry_after:g}"},
+            )
+            return
+
+        latency = self.config.sample_latency()
+        if outcome == "error":
+            time.sleep(latency / 2)
+            self.config.count("errors")
+            self.send_json(500, {"error": {"type": "api_error", "message": "Internal error (injected)."}})
+            return
+
+        # OpenAI ``n`` / Gemini ``candidateCount`` ask for several samples;
+        # above temperature 0 each request samples afresh.
+        config = body.get("generationConfig") if isinstance(body.get("generationConfig"), dict) else body
+        count = max(1, int(config.get("n") or config.get("candidateCount") or 1))  # type: ignore[union-attr]
+        first = self.config.sample_seed() if config.get("temperature") else 0  # type: ignore[union-attr]
+        texts = [fake_response(prompt, model, first + index) for index in range(count)]
+        text = texts[0]
+        usage = {"input": estimate_tokens(prompt), "output": sum(estimate_tokens(item) for item in texts)}
+        stream = bool(body.get("stream")) or path.endswith(":streamGenerateContent")
+        if stream:
+            self.config.count("streamed")
+        if path.endswith("/chat/completions"):
+            self.openai_chat(body, model, texts, usage, latency, stream)
+        elif path.endswith("/responses"):
+            self.openai_responses(model, text, usage, latency, stream)
+        elif path.endswith("/messages"):
+            self.anthropic_messages(model, text, usage, latency, stream)
+        else:
+            self.gemini_generate(model, texts, usage, latency, stream)
+        self.config.count("ok")
+
+    def pace(self, latency: float, pieces: List[str]) -> Iterator[str]:
+        """Yield stream pieces spread over ``latency``: a third before the first."""
+        time.sleep(latency / 3)
+        gap = (latency * 2 / 3) / max(1, len(pieces))
+        for piece in pieces:
+            yield piece
+            time.sleep(gap)
+
+    def openai_chat(
+        self,
+        body: Dict[str, object],
+        model: str,
+        texts: List[str],
+        usage: Dict[str, int],
+        latency: float,
+        stream: bool,
+    ) -> None:
+        response_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        usage_block = {
+            "prompt_tokens": usage["input"],
+            "completion_tokens": usage["output"],
+            "total_tokens": usage["input"] + usage["output"],
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+        if not stream:
+            time.sleep(latency)
+            self.send_json(200, {
+                "id": response_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {"index": index, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+                    for index, text in enumerate(texts)
+                ],
+                "usage": usage_block,
+            })
+            return
+        self.start_sse()
+        base = {"id": response_id, "object": "chat.completion.chunk", "created": created, "model": model}
+        for piece in self.pace(latency, list(chunks(texts[0]))):
+            self.send_event({**base, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+        self.send_event({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        stream_options = body.get("stream_options") or {}
+        if isinstance(stream_options, dict) and stream_options.get("include_usage"):
+            self.send_event({**base, "choices": [], "usage": usage_block})
+        self.send_event("[DONE]")
+
+    def openai_responses(self, model: str, text: str, usage: Dict[str, int], latency: float, stream: bool) -> None:
+        response_id = f"resp_{uuid.uuid4().hex[:24]}"
+        item_id = f"msg_{uuid.uuid4().hex[:24]}"
+        response = {
+            "id": response_id,
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": model,
+            "status": "completed",
+            "output": [{
+                "id": item_id,
+                "type": "message",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }],
+            "usage": {
+                "input_tokens": usage["input"],
+                "output_tokens": usage["output"],
+                "total_tokens": usage["input"] + usage["output"],
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens_details": {"reasoning_tokens": 0},
+            },
+        }
+        if not stream:
+            time.sleep(latency)
+            self.send_json(200, response)
+            return
+        self.start_sse()
+        sequence = 0
+        self.send_event(
+            {"type": "response.created", "sequence_number": sequence,
+             "response": {**response, "status": "in_progress", "output": []}},
+            "response.created",
+        )
+        for piece in self.pace(latency, list(chunks(text))):
+            sequence += 1
+            self.send_event(
+                {"type": "response.output_text.delta", "sequence_number": sequence, "item_id": item_id,
+                 "output_index": 0, "content_index": 0, "delta": piece},
+                "response.output_text.delta",
+            )
+        self.send_event(
+            {"type": "response.completed", "sequence_number": sequence + 1, "response": response},
+            "response.completed",
+        )
+
+    def anthropic_messages(self, model: str, text: str, usage: Dict[str, int], latency: float, stream: bool) -> None:
+        message = {
+            "id": f"msg_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": model,
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": usage["input"],
+                "output_tokens": usage["output"],
+                "cache_read_input_tokens": 0,
+                "cache_creation_input_tokens": 0,
+            },
+        }
+        if not stream:
+            time.sleep(latency)
+            self.send_json(200, message)
+            return
+        self.start_sse()
+        self.send_event(
+            {"type": "message_start",
+             "message": {**message, "content": [], "stop_reason": None,
+                         "usage": {**message["usage"], "output_tokens": 1}}},
+            "message_start",
+        )
+        self.send_event(
+            {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+            "content_block_start",
+        )
+        for piece in self.pace(latency, list(chunks(text))):
+            self.send_event(
+                {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": piece}},
+                "content_block_delta",
+            )
+        self.send_event({"type": "content_block_stop", "index": 0}, "content_block_stop")
+        self.send_event(
+            {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+             "usage": {"output_tokens": usage["output"]}},
+            "message_delta",
+        )
+        self.send_event({"type": "message_stop"}, "message_stop")
+
+    def gemini_generate(self, model: str, texts: List[str], usage: Dict[str, int], latency: float, stream: bool) -> None:
+        def payload(pieces: List[str], final: bool) -> Dict[str, object]:
+            candidates: List[Dict[str, object]] = []
+            for index, piece in enumerate(pieces):
+                candidate: Dict[str, object] = {"content": {"role": "model", "parts": [{"text": piece}]}, "index": index}
+                if final:
+                    candidate["finishReason"] = "STOP"
+                candidates.append(candidate)
+            return {
+                "candidates": candidates,
+                "modelVersion": model,
+                "usageMetadata": {
+                    "promptTokenCount": usage["input"],
+                    "candidatesTokenCount": usage["output"],
+                    "totalTokenCount": usage["input"] + usage["output"],
+                },
+            }
+
+        if not stream:
+            time.sleep(latency)
+            self.send_json(200, payload(texts, True))
+            return
+        self.start_sse()
+        pieces = list(chunks(texts[0]))
+        for index, piece in enumerate(self.pace(latency, pieces)):
+            self.send_event(payload([piece], index == len(pieces) - 1))
+
+
+class FakeProviderServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], config: ServerConfig, verbose: bool = False) -> None:
+        super().__init__(address, FakeProviderHandler)
+        self.config = config
+        self.verbose = verbose
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def serve_in_thread(config: ServerConfig, host: str = "127.0.0.1", port: int = 0) -> FakeProviderServer:
+    """Start a server on a background thread (port 0 picks a free port)."""
+    server = FakeProviderServer((host, port), config)
+    threading.Thread(target=server.serve_forever, name="fake-provider", daemon=True).start()
+    return server
+
+
+def provider_env(base_url: str) -> Dict[str, str]:
+    """Environment that points every provider SDK at ``base_url``."""
+    return {
+        "OPENAI_BASE_URL": f"{base_url}/v1",
+        "ANTHROPIC_BASE_URL": base_url,
+        "GEMINI_BASE_URL": base_url,
+        "OPENAI_API_KEY": "fake-openai-key",
+        "ANTHROPIC_API_KEY": "fake-anthropic-key",
+        "GEMINI_API_KEY": "fake-gemini-key",
+    }
+
+
+def add_server_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--latency",
+        type=parse_latency,
+        default=("lognormal", [0.5, 0.4]),
+        help="Response latency: fixed:S, uniform:LO,HI or lognormal:MEDIAN,SIGMA. Default: lognormal:0.5,0.4.",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429.")
+    parser.add_argument("--rpm", type=float, default=0.0, help="Answer 429 above this many requests/minute (0: off).")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s.")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args: argparse.Namespace) -> ServerConfig:
+    return ServerConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        rpm=args.rpm,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve fake OpenAI/Anthropic/Gemini endpoints locally.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--verbose", action="store_true", help="Log every request.")
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = FakeProviderServer((args.host, args.port), config_from_args(args), verbose=args.verbose)
+    print(f"Fake provider server on {server.base_url}")
+    for key, value in provider_env(server.base_url).items():
+        print(f"  export {key}={value}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
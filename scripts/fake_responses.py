@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""Schema-valid synthetic search logs and forecasts for offline runs."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import re
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from seats import DISTRICT_SEATS, PARTIES, PARTY_LIST_SEATS, largest_remainder
+
+BASELINE_PATH = Path(__file__).resolve().parent.parent / "data" / "priors" / "seed_2023_reference.json"
+
+PUBLISHERS = [
+    ("Thai PBS", "thaipbs.or.th"),
+    ("Thairath", "thairath.co.th"),
+    ("THE STANDARD", "thestandard.co"),
+    ("Bangkok Post", "bangkokpost.com"),
+    ("Matichon", "matichon.co.th"),
+    ("Khaosod", "khaosod.co.th"),
+    ("Prachachat", "prachachat.net"),
+    ("InfoQuest", "infoquest.co.th"),
+    ("Bangkok Biz News", "bangkokbiznews.com"),
+    ("The Nation", "nationthailand.com"),
+    ("Post Today", "posttoday.com"),
+    ("Workpoint Today", "workpointtoday.com"),
+]
+
+_DATE = r"(\d{4}-\d{2}-\d{2})"
+
+
+def rng_for(*parts: object) -> random.Random:
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+def synthetic_publishers(count: int) -> List[Tuple[str, str]]:
+    """The real publisher list, padded with generated outlets up to ``count``."""
+    extra = [
+        (f"Local Outlet {idx:03d}", f"outlet{idx:03d}.example.co.th")
+        for idx in range(max(0, count - len(PUBLISHERS)))
+    ]
+    return (PUBLISHERS + extra)[: max(1, count)]
+
+
+def week_dates(week_start: str, week_end: str) -> List[str]:
+    try:
+        start = date.fromisoformat(week_start)
+        end = date.fromisoformat(week_end)
+    except ValueError:
+        return [week_start]
+    days = max(0, (end - start).days)
+    return [(start + timedelta(days=offset)).isoformat() for offset in range(days + 1)]
+
+
+def fake_search_log(
+    week_start: str,
+    week_end: str,
+    model: str,
+    n_sources: int = 20,
+    n_publishers: Optional[int] = None,
+    rng: Optional[random.Random] = None,
+    publishers: Optional[List[Tuple[str, str]]] = None,
+) -> Dict[str, object]:
+    rng = rng or rng_for("search", week_start, model)
+    publishers = publishers or PUBLISHERS[: max(3, min(len(PUBLISHERS), n_publishers or len(PUBLISHERS)))]
+    dates = week_dates(week_start, week_end)
+    sources = []
+    for idx in range(n_sources):
+        name, domain = rng.choice(publishers)
+        sources.append({
+            "title": f"{name} election coverage {week_start} #{idx}",
+            "url": f"https://www.{domain}/politics/{week_start}/{rng.randrange(10**6)}",
+            "date": rng.choice(dates),
+            "publisher": name,
+            "why_relevant": "Party standing, polling or coalition signals for the week.",
+        })
+    name, domain = rng.choice(publishers)
+    return {
+        "week_start": week_start,
+        "week_end": week_end,
+        "model": model,
+        "queries": ["การเลือกตั้ง 2569 ข่าวการเมืองไทย", "โพลเลือกตั้ง คะแนนนิยม", "พรรคประชาชน พรรคเพื่อไทย"],
+        "sources": sources,
+        "excluded_sources": [{
+            "title": f"{name} archive piece",
+            "url": f"https://www.{domain}/archive/{rng.randrange(10**6)}",
+            "date": "unknown",
+            "publisher": name,
+            "reason": "outside window or date unclear",
+        }],
+        "summary": ["Synthetic evidence summary for offline runs."],
+        "notes": "synthetic",
+    }
+
+
+def _baseline_shares() -> Dict[str, float]:
+    try:
+        baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+        total = baseline["total"]
+        return {party: float(total.get(party, 0)) + 5.0 for party in PARTIES}
+    except (OSError, ValueError, KeyError):
+        return {party: 1.0 for party in PARTIES}
+
+
+def fake_forecast(
+    week_start: str,
+    week_end: str,
+    model: str,
+    condition: str,
+    rng: Optional[random.Random] = None,
+) -> Dict[str, object]:
+    rng = rng or rng_for("forecast", week_start, model, condition)
+    shares = _baseline_shares()
+    weights = {party: rng.gammavariate(share, 1.0) for party, share in shares.items()}
+    party_list = largest_remainder(weights, PARTY_LIST_SEATS)
+    jitter = {party: weight * rng.uniform(0.8, 1.2) for party, weight in weights.items()}
+    district = largest_remainder(jitter, DISTRICT_SEATS)
+    total = {party: party_list[party] + district[party] for party in PARTIES}
+    data: Dict[str, object] = {
+        "week_start": week_start,
+        "week_end": week_end,
+        "model": model,
+        "condition": condition,
+        "forecast_party_list": party_list,
+        "forecast_district": district,
+        "forecast_total": total,
+        "rationale": ["Synthetic forecast for offline runs."],
+        "checks": {"party_list_sum": PARTY_LIST_SEATS, "district_sum": DISTRICT_SEATS, "total_sum": 500},
+    }
+    if condition == "with_prior":
+        data["delta_from_prior_total"] = {party: 0 for party in PARTIES}
+    else:
+        data["baseline"] = "2023_reference"
+    return data
+
+
+def fake_response(prompt: str, model: str, sample: int = 0) -> str:
+    """Answer a rendered search or forecast prompt with matching synthetic JSON.
+
+    The answer is fixed per prompt and model; other ``sample`` numbers give
+    different answers, as sampling at a non-zero temperature would.
+    """
+    match = re.search(r"Week window:\s*" + _DATE + r"\s+to\s+" + _DATE, prompt)
+    if match:
+        week_start, week_end = match.group(1), match.group(2)
+    else:
+        match = re.search(r'"week_start":\s*"' + _DATE, prompt)
+        week_start = match.group(1) if match else None
+        match = re.search(r'"week_end":\s*"' + _DATE, prompt)
+        week_end = match.group(1) if match else None
+    if week_start is None or week_end is None:
+        dates = re.findall(_DATE, prompt)
+        week_start = week_start or (dates[0] if dates else "2025-12-12")
+        week_end = week_end or (dates[1] if len(dates) > 1 else week_start)
+    rng = rng_for(model, hashlib.sha256(prompt.encode("utf-8")).hexdigest(), *([sample] if sample else []))
+    if "forecast_party_list" in prompt:
+        condition = "with_prior" if '"condition": "with_prior"' in prompt else "no_prior"
+        data = fake_forecast(week_start, week_end, model, condition, rng=rng)
+    else:
+        data = fake_search_log(week_start, week_end, model, rng=rng)
+    return json.dumps(data, ensure_ascii=False)
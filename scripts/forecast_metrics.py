@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""Vectorized forecast metrics over a run x model x condition x week x party array."""
+
+from __future__ import annotations
+
+import argparse
+import json
+from dataclasses import dataclass
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from forecast_store import SECTIONS, load_tables
+from seats import PARTIES
+
+BASELINE_PATH = Path(__file__).resolve().parent.parent / "data" / "priors" / "seed_2023_reference.json"
+BASELINE_SECTIONS = {"party_list": "party_list", "district": "district", "total": "total"}
+
+# Condition pairs compared for divergence, as in the study protocol.
+CONDITION_PAIRS = [
+    ("with_prior", "no_prior"),
+    ("with_prior_social", "with_prior"),
+]
+
+AXES = ("run", "model", "condition", "week", "party")
+
+
+@dataclass
+class ForecastCube:
+    """Seats of one section as ``values[run, model, condition, week, party]``.
+
+    Combinations without a forecast are NaN on every party; a forecast that
+    omits a party has 0 there, like the plots always assumed.
+    """
+
+    values: np.ndarray
+    runs: List[str]
+    models: List[str]
+    conditions: List[str]
+    weeks: List[str]
+    parties: List[str]
+    section: str = "total"
+
+    @classmethod
+    def from_table(cls, table: pd.DataFrame, section: str = "total") -> "ForecastCube":
+        """Build the cube from a ``forecast_store`` table (one row per forecast and party)."""
+        if section not in SECTIONS:
+            raise ValueError(f"Unknown section {section!r}; expected one of {', '.join(SECTIONS)}")
+        table = table[table["party"].isin(PARTIES)]
+        labels = {
+            "run": sorted(table["run"].astype(str).unique()),
+            "model": sorted(table["model"].astype(str).unique()),
+            "condition": sorted(table["condition"].astype(str).unique()),
+            "week": sorted(table["week"].astype(str).unique()),
+            "party": list(PARTIES),
+        }
+        codes = tuple(
+            pd.Categorical(table[axis].astype(str), categories=labels[axis]).codes for axis in AXES
+        )
+        values = np.full(tuple(len(labels[axis]) for axis in AXES), np.nan)
+        seats = table[section].astype("Float64").to_numpy(dtype=float, na_value=np.nan)
+        values[codes] = seats
+        present = np.isfinite(values).any(axis=-1, keepdims=True)
+        values = np.where(present & np.isnan(values), 0.0, values)
+        return cls(
+            values,
+            labels["run"],
+            labels["model"],
+            labels["condition"],
+            labels["week"],
+            labels["party"],
+            section,
+        )
+
+    @property
+    def present(self) -> np.ndarray:
+        """``[run, model, condition, week]``: whether that forecast exists."""
+        return np.isfinite(self.values).all(axis=-1)
+
+    def index(self, axis: str) -> pd.Index:
+        return pd.Index(getattr(self, f"{axis}s" if axis != "party" else "parties"), name=axis)
+
+
+def load_cube(run_dirs: Iterable[Path], section: str = "total") -> ForecastCube:
+    """Every forecast of ``run_dirs`` (through each run's forecast store) as one cube."""
+    return ForecastCube.from_table(load_tables(run_dirs), section)
+
+
+def load_baseline(section: str = "total", path: Path = BASELINE_PATH) -> np.ndarray:
+    """The 2023 reference seats of ``section`` in party order."""
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    seats = data.get(BASELINE_SECTIONS[section]) or {}
+    return np.array([float(seats.get(party, 0)) for party in PARTIES])
+
+
+def previous_available(values: np.ndarray, axis: int) -> np.ndarray:
+    """Each position's last earlier non-NaN value along ``axis`` (NaN if none)."""
+    moved = np.moveaxis(values, axis, -1)
+    steps = np.arange(moved.shape[-1])
+    seen = np.where(np.isfinite(moved), steps, -1)
+    last = np.maximum.accumulate(seen, axis=-1)
+    earlier = np.concatenate([np.full(last.shape[:-1] + (1,), -1), last[..., :-1]], axis=-1)
+    taken = np.take_along_axis(moved, np.clip(earlier, 0, None), axis=-1)
+    return np.moveaxis(np.where(earlier >= 0, taken, np.nan), -1, axis)
+
+
+def week_changes(cube: ForecastCube) -> np.ndarray:
+    """``[run, model, condition, week, party]`` change since the previous forecast week.
+
+    Weeks a series skipped are stepped over, so each change is against the
+    last earlier week that has a forecast; the first week is NaN.
+    """
+    return cube.values - previous_available(cube.values, axis=3)
+
+
+def nan_std(values: np.ndarray, axis: int, ddof: int = 1) -> np.ndarray:
+    """NaN-ignoring standard deviation; NaN where fewer than ``ddof + 1`` values."""
+    count = np.isfinite(values).sum(axis=axis)
+    mean = np.nansum(values, axis=axis) / np.where(count > 0, count, 1)
+    squares = np.nansum((values - np.expand_dims(mean, axis)) ** 2, axis=axis)
+    return np.where(count > ddof, np.sqrt(squares / np.where(count > ddof, count - ddof, 1)), np.nan)
+
+
+def volatility(cube: ForecastCube) -> pd.DataFrame:
+    """Per run, model, condition and party: weeks, sum and mean of |weekly change|, and std dev.
+
+    ``std_dev`` is the sample standard deviation of the party's seats over
+    the weeks (the protocol's volatility measure); ``total_abs_change`` is
+    what the volatility chart plots.
+    """
+    changes = np.abs(week_changes(cube))
+    weeks = np.isfinite(cube.values).sum(axis=3)
+    steps = np.isfinite(changes).sum(axis=3)
+    total = np.nansum(changes, axis=3)
+    frame = tidy(
+        cube,
+        ("run", "model", "condition", "party"),
+        weeks=weeks,
+        total_abs_change=total,
+        mean_abs_change=np.where(steps > 0, total / np.where(steps > 0, steps, 1), np.nan),
+        std_dev=nan_std(cube.values, axis=3),
+    )
+    return frame[frame["weeks"] > 0].reset_index(drop=True)
+
+
+def condition_divergence(
+    cube: ForecastCube,
+    pairs: Sequence[Tuple[str, str]] = CONDITION_PAIRS,
+) -> pd.DataFrame:
+    """L1 and L-infinity distance between two conditions' forecasts, per run, model and week."""
+    frames = []
+    for left, right in pairs:
+        if left not in cube.conditions or right not in cube.conditions:
+            continue
+        a = cube.values[:, :, cube.conditions.index(left)]
+        b = cube.values[:, :, cube.conditions.index(right)]
+        gap = np.abs(a - b)
+        frame = tidy(
+            cube,
+            ("run", "model", "week"),
+            l1=gap.sum(axis=-1),
+            linf=gap.max(axis=-1),
+        )
+        frame.insert(2, "left", left)
+        frame.insert(3, "right", right)
+        frames.append(frame.dropna(subset=["l1"]))
+    columns = ["run", "model", "left", "right", "week", "l1", "linf"]
+    return pd.concat(frames, ignore_index=True)[columns] if frames else pd.DataFrame(columns=columns)
+
+
+def model_agreement(cube: ForecastCube) -> pd.DataFrame:
+    """Cross-model agreement per run, condition and week with two or more models.
+
+    ``mean_l1``/``max_l1`` summarize the L1 distance between every pair of
+    models with a forecast that week; ``party_std`` is the mean over
+    parties of the seat standard deviation across those models.
+    """
+    columns = ["run", "condition", "week", "models", "mean_l1", "max_l1", "party_std"]
+    pairs = list(combinations(range(len(cube.models)), 2))
+    if not pairs:
+        return pd.DataFrame(columns=columns)
+    left, right = (list(side) for side in zip(*pairs))
+    distances = np.abs(cube.values[:, left] - cube.values[:, right]).sum(axis=-1)  # [run, pair, condition, week]
+    compared = np.isfinite(distances).sum(axis=1)
+    frame = tidy(
+        cube,
+        ("run", "condition", "week"),
+        models=cube.present.sum(axis=1),
+        mean_l1=np.nansum(distances, axis=1) / np.where(compared > 0, compared, 1),
+        max_l1=np.where(np.isfinite(distances), distances, -np.inf).max(axis=1),
+        party_std=nan_std(cube.values, axis=1, ddof=0).mean(axis=-1),
+    )
+    return frame[frame["models"] >= 2].reset_index(drop=True)[columns]
+
+
+def baseline_distance(cube: ForecastCube, baseline: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """L1 and L-infinity distance from the 2023 reference, per run, model, condition and week."""
+    reference = load_baseline(cube.section) if baseline is None else np.asarray(baseline, dtype=float)
+    gap = np.abs(cube.values - reference)
+    frame = tidy(
+        cube,
+        ("run", "model", "condition", "week"),
+        l1=gap.sum(axis=-1),
+        linf=gap.max(axis=-1),
+    )
+    return frame.dropna(subset=["l1"]).reset_index(drop=True)
+
+
+def tidy(cube: ForecastCube, axes: Sequence[str], **columns: np.ndarray) -> pd.DataFrame:
+    """One row per combination of ``axes`` (in cube order), one column per array."""
+    index = pd.MultiIndex.from_product([cube.index(axis) for axis in axes])
+    frame = pd.DataFrame({name: np.asarray(values).reshape(-1) for name, values in columns.items()}, index=index)
+    return frame.reset_index()
+
+
+METRICS = {
+    "volatility": volatility,
+    "condition_divergence": condition_divergence,
+    "model_agreement": model_agreement,
+    "baseline_distance": baseline_distance,
+}
+
+
+def compute_all(cube: ForecastCube) -> Dict[str, pd.DataFrame]:
+    return {name: metric(cube) for name, metric in METRICS.items()}
+
+
+def write_tables(tables: Mapping[str, pd.DataFrame], out_dir: Path) -> List[Path]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name, frame in tables.items():
+        path = out_dir / f"{name}.csv"
+        frame.to_csv(path, index=False, float_format="%.4g")
+        paths.append(path)
+    return paths
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from run_catalog import add_filter_arguments, filters_from_args, select_runs
+
+    parser = argparse.ArgumentParser(description="Compute forecast volatility, divergence and agreement tables.")
+    parser.add_argument("--runs-dir", default="data/runs", help="Root directory of runs.")
+    parser.add_argument("--run-id", action="append", help="Run id (repeatable). Default: every run matching the filters.")
+    parser.add_argument("--section", default="total", choices=sorted(SECTIONS), help="Seat section to measure.")
+    parser.add_argument("--out-dir", default="data/analysis/metrics", help="Output directory for CSVs.")
+    add_filter_arguments(parser)
+    args = parser.parse_args(argv)
+
+    runs_dir = Path(args.runs_dir)
+    if args.run_id:
+        run_dirs = [runs_dir / run_id for run_id in args.run_id]
+    else:
+        run_dirs = select_runs(runs_dir, **filters_from_args(args))
+    if not run_dirs:
+        print("No runs found.")
+        return 0
+    cube = load_cube(run_dirs, args.section)
+    print(
+        f"Forecasts: {int(cube.present.sum())} across {len(cube.runs)} run(s), {len(cube.models)} model(s), "
+        f"{len(cube.conditions)} condition(s), {len(cube.weeks)} week(s)"
+    )
+    for path in write_tables(compute_all(cube), Path(args.out_dir)):
+        print(f"Wrote: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
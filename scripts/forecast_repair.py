@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Local repair of near-valid forecast responses, so they need no LLM re-run."""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from seats import DISTRICT_SEATS, PARTIES, PARTY_LIST_SEATS, largest_remainder
+
+# The seat maps the model chooses; everything else in the seat block is derived.
+INPUT_SECTIONS = {
+    "forecast_party_list": PARTY_LIST_SEATS,
+    "forecast_district": DISTRICT_SEATS,
+}
+# The forecast window; the prompt skeleton shows placeholders, so the caller's
+# dates are authoritative and overwrite whatever the model copied over.
+WEEK_KEYS = ("week_start", "week_end")
+CHECK_KEYS = {
+    "party_list_sum": "forecast_party_list",
+    "district_sum": "forecast_district",
+    "total_sum": "forecast_total",
+}
+# A section may be rescaled when its sum is off by at most this share of its
+# seats (5 party-list or 20 district seats); beyond that the answer is re-run.
+MAX_DRIFT_SHARE = 0.05
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*\n(.*?)\n?```", re.DOTALL)
+
+
+class RepairError(ValueError):
+    """The response cannot be turned into a valid forecast without the LLM."""
+
+
+def max_drift(seats: int, share: float = MAX_DRIFT_SHARE) -> int:
+    return int(seats * share)
+
+
+def extract_json(text: str) -> Tuple[object, Optional[str]]:
+    """The JSON value in ``text`` and a note on what was stripped, if anything.
+
+    Accepts bare JSON, a fenced code block, or an object with prose before
+    or after it. Raises ``RepairError`` when no JSON object is found.
+    """
+    try:
+        return json.loads(text), None
+    except json.JSONDecodeError:
+        pass
+    match = _FENCE.search(text)
+    if match:
+        try:
+            return json.loads(match.group(1)), "extracted JSON from a fenced code block"
+        except json.JSONDecodeError:
+            pass
+    decoder = json.JSONDecoder()
+    start = text.find("{")
+    while start != -1:
+        try:
+            value, _ = decoder.raw_decode(text, start)
+        except json.JSONDecodeError:
+            start = text.find("{", start + 1)
+            continue
+        return value, "extracted JSON object from surrounding text"
+    raise RepairError("response contains no JSON object")
+
+
+def seat_map(data: Mapping[str, object], key: str, repairs: List[str]) -> Dict[str, int]:
+    """A section as {party: int} in party order; integral floats are accepted."""
+    section = data.get(key)
+    if not isinstance(section, dict):
+        raise RepairError(f"{key} is missing or not an object")
+    unknown = [party for party in section if party not in PARTIES]
+    if unknown:
+        raise RepairError(f"{key} has unknown parties: {', '.join(map(str, unknown))}")
+    missing = [party for party in PARTIES if party not in section]
+    if missing:
+        raise RepairError(f"{key} is missing {', '.join(missing)}")
+    seats: Dict[str, int] = {}
+    for party in PARTIES:
+        value = section[party]
+        if isinstance(value, float) and value.is_integer():
+            repairs.append(f"{key}.{party}: {value} -> {int(value)}")
+            value = int(value)
+        if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+            raise RepairError(f"{key}.{party} is not a non-negative integer")
+        seats[party] = value
+    return seats
+
+
+def rescale(key: str, seats: Dict[str, int], expected: int, repairs: List[str]) -> Dict[str, int]:
+    """Largest-remainder rescale of a section whose sum is off by a few seats."""
+    seat_sum = sum(seats.values())
+    if seat_sum == expected:
+        return seats
+    if abs(seat_sum - expected) > max_drift(expected):
+        raise RepairError(f"{key} sums to {seat_sum}, expected {expected} (more than {max_drift(expected)} off)")
+    fixed = largest_remainder(seats, expected)
+    changes = ", ".join(
+        f"{party} {seats[party]} -> {fixed[party]}" for party in PARTIES if fixed[party] != seats[party]
+    )
+    repairs.append(f"{key}: rescaled sum {seat_sum} -> {expected} ({changes})")
+    return fixed
+
+
+def set_derived(data: Dict[str, object], key: str, value: Dict[str, int], repairs: List[str]) -> None:
+    # Compare serialized, so float seats (28.0 == 28) are replaced by ints too.
+    if key not in data or json.dumps(data[key]) != json.dumps(value):
+        repairs.append(f"{key}: recomputed" if key in data else f"{key}: added")
+        data[key] = value
+
+
+def set_week(data: Dict[str, object], week: Tuple[str, str], repairs: List[str]) -> None:
+    for key, value in zip(WEEK_KEYS, week):
+        if data.get(key) != value:
+            repairs.append(f"{key}: {data[key]!r} -> {value}" if key in data else f"{key}: added")
+            data[key] = value
+
+
+def repair_forecast(
+    data: Dict[str, object],
+    prior_total: Optional[Mapping[str, int]] = None,
+    week: Optional[Tuple[str, str]] = None,
+) -> List[str]:
+    """Fix seat sums and derived fields in place; return what was changed.
+
+    Given ``week`` (start, end), ``week_start`` and ``week_end`` are set
+    to it. Party-list and district maps that miss their seat count by a few seats
+    are rescaled with ``largest_remainder``. ``forecast_total``, ``checks``
+    and, given the prior's ``forecast_total``, ``delta_from_prior_total``
+    are then recomputed from them. Raises ``RepairError`` when the answer
+    is too far off to fix locally.
+    """
+    if not isinstance(data, dict):
+        raise RepairError("forecast is not an object")
+    repairs: List[str] = []
+    if week is not None:
+        set_week(data, week, repairs)
+    sections = {
+        key: rescale(key, seat_map(data, key, repairs), expected, repairs) for key, expected in INPUT_SECTIONS.items()
+    }
+    # Always replace: the maps may hold integral floats that compare equal to the ints.
+    data.update(sections)
+    party_list, district = sections["forecast_party_list"], sections["forecast_district"]
+    total = {party: party_list[party] + district[party] for party in PARTIES}
+    set_derived(data, "forecast_total", total, repairs)
+    if prior_total is not None:
+        delta = {party: total[party] - int(prior_total.get(party, 0)) for party in PARTIES}
+        set_derived(data, "delta_from_prior_total", delta, repairs)
+    checks = {check: sum(data[key].values()) for check, key in CHECK_KEYS.items()}  # type: ignore[attr-defined]
+    set_derived(data, "checks", checks, repairs)
+    return repairs
+
+
+def repair_response(
+    text: str,
+    prior_total: Optional[Mapping[str, int]] = None,
+    week: Optional[Tuple[str, str]] = None,
+) -> Tuple[Dict[str, object], List[str]]:
+    """Parse and repair a forecast response; record the changes under ``repairs``."""
+    data, note = extract_json(text)
+    if not isinstance(data, dict):
+        raise RepairError("response JSON is not an object")
+    repairs = ([note] if note else []) + repair_forecast(data, prior_total, week)
+    if repairs:
+        data["repairs"] = repairs
+    return data, repairs
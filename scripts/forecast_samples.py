@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Aggregate several sampled forecasts into a median forecast with per-party intervals."""
+
+from __future__ import annotations
+
+import copy
+import math
+import statistics
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from forecast_repair import INPUT_SECTIONS, RepairError, repair_forecast, repair_response
+from seats import PARTIES, largest_remainder
+
+DEFAULT_INTERVAL = 0.8
+INTERVAL_SECTIONS = ("forecast_party_list", "forecast_district", "forecast_total")
+
+
+def quantile(values: Sequence[float], q: float) -> float:
+    """Linearly interpolated quantile of ``values`` (0 <= q <= 1)."""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    low = math.floor(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def parse_samples(
+    texts: Sequence[str],
+    prior_total: Optional[Mapping[str, int]] = None,
+    week: Optional[Tuple[str, str]] = None,
+) -> Tuple[List[Dict[str, object]], List[str]]:
+    """Repaired forecasts from the sample texts, and why the others were rejected."""
+    samples: List[Dict[str, object]] = []
+    rejected: List[str] = []
+    for index, text in enumerate(texts):
+        try:
+            data, _ = repair_response(text, prior_total, week)
+        except RepairError as exc:
+            rejected.append(f"sample {index}: {exc}")
+            continue
+        samples.append(data)
+    return samples, rejected
+
+
+def intervals(samples: Sequence[Mapping[str, object]], level: float) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """{section: {party: {low, median, high}}} over the samples, ``level`` wide."""
+    tail = (1.0 - level) / 2
+    result: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for section in INTERVAL_SECTIONS:
+        result[section] = {}
+        for party in PARTIES:
+            values = [sample[section][party] for sample in samples]  # type: ignore[index]
+            result[section][party] = {
+                "low": round(quantile(values, tail), 2),
+                "median": round(statistics.median(values), 2),
+                "high": round(quantile(values, 1.0 - tail), 2),
+            }
+    return result
+
+
+def aggregate_samples(
+    samples: Sequence[Dict[str, object]],
+    prior_total: Optional[Mapping[str, int]] = None,
+    level: float = DEFAULT_INTERVAL,
+) -> Dict[str, object]:
+    """The median forecast of repaired ``samples``, which must not be empty.
+
+    Per-party medians of the party-list and district maps are turned back
+    into whole seats with ``largest_remainder``, so the aggregate meets the
+    seat totals; the totals, deltas and checks are then recomputed. The
+    other fields (rationale included) come from the sample whose total is
+    closest to the aggregate. ``intervals`` holds each party's spread.
+    """
+    if not samples:
+        raise RepairError("no usable samples")
+    medians = {
+        section: largest_remainder(
+            {party: statistics.median(sample[section][party] for sample in samples) for party in PARTIES},  # type: ignore[index]
+            seats,
+        )
+        for section, seats in INPUT_SECTIONS.items()
+    }
+    total = {
+        party: medians["forecast_party_list"][party] + medians["forecast_district"][party] for party in PARTIES
+    }
+    distances = [
+        sum(abs(sample["forecast_total"][party] - total[party]) for party in PARTIES)  # type: ignore[index]
+        for sample in samples
+    ]
+    representative = distances.index(min(distances))
+    aggregate = copy.deepcopy(samples[representative])
+    aggregate.pop("repairs", None)
+    aggregate.update(medians)
+    repair_forecast(aggregate, prior_total)
+    aggregate["intervals"] = intervals(samples, level)
+    aggregate["sampling"] = {
+        "aggregate": "median",
+        "interval": level,
+        "samples_used": len(samples),
+        "representative_sample": representative,
+    }
+    return aggregate
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""Per-run columnar table of every forecast, so loaders read one file per run."""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:  # pandas is imported on first use, so importing this module stays cheap.
+    import pandas as pd
+
+STORE_NAME = "forecasts.parquet"
+INSTALL_HINT = "pip install pyarrow"
+
+# One row per (model, condition, week, party). ``rationale_ref`` points at the
+# rationale inside the source JSON, which stays the record of truth.
+COLUMNS = [
+    "run",
+    "model",
+    "condition",
+    "week",
+    "week_end",
+    "party",
+    "party_list",
+    "district",
+    "total",
+    "rationale_ref",
+]
+SEAT_COLUMNS = ["party_list", "district", "total"]
+SECTIONS = {
+    "party_list": "forecast_party_list",
+    "district": "forecast_district",
+    "total": "forecast_total",
+}
+
+
+def condition_from_filename(name: str) -> Tuple[Optional[str], Optional[str]]:
+    if name.endswith(".no_prior.json"):
+        return "no_prior", name[: -len(".no_prior.json")]
+    if name.endswith(".with_prior_social.json"):
+        return "with_prior_social", name[: -len(".with_prior_social.json")]
+    if name.endswith(".json"):
+        return "with_prior", name[: -len(".json")]
+    return None, None
+
+
+def store_path(run_dir: Path) -> Path:
+    return Path(run_dir) / STORE_NAME
+
+
+def parquet_engine() -> Optional[str]:
+    for engine in ("pyarrow", "fastparquet"):
+        if importlib.util.find_spec(engine) is not None:
+            return engine
+    return None
+
+
+def require_engine() -> None:
+    if parquet_engine() is None:
+        raise RuntimeError(f"Parquet support is not installed. Install with: {INSTALL_HINT}")
+
+
+def scan_forecasts(run_dir: Path) -> Dict[str, float]:
+    """Forecast files of a run as {path relative to the run: mtime}, sorted by path."""
+    found: Dict[str, float] = {}
+    root = os.path.join(run_dir, "forecasts")
+    if not os.path.isdir(root):
+        return found
+    with os.scandir(root) as models:
+        model_dirs = sorted(entry.name for entry in models if entry.is_dir())
+    for model in model_dirs:
+        with os.scandir(os.path.join(root, model)) as entries:
+            for entry in sorted(entries, key=lambda item: item.name):
+                if entry.is_file() and condition_from_filename(entry.name)[0]:
+                    found[f"forecasts/{model}/{entry.name}"] = entry.stat().st_mtime
+    return found
+
+
+def forecast_files(run_dir: Path) -> List[Path]:
+    return [Path(run_dir) / relative for relative in scan_forecasts(run_dir)]
+
+
+def seat_value(value: object) -> Optional[int]:
+    if isinstance(value, bool) or not isinstance(value, int):
+        return None
+    return value
+
+
+def forecast_rows(run_dir: Path, path: Path) -> List[Dict[str, object]]:
+    """Table rows for one forecast file; none if it is not a forecast object."""
+    condition, week = condition_from_filename(path.name)
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return []
+    if not condition or not isinstance(data, dict):
+        return []
+    sections = {column: data.get(key) for column, key in SECTIONS.items()}
+    sections = {column: value if isinstance(value, dict) else {} for column, value in sections.items()}
+    parties = list(dict.fromkeys(party for section in sections.values() for party in section))
+    base = {
+        "run": Path(run_dir).name,
+        "model": path.parent.name,
+        "condition": condition,
+        "week": week,
+        "week_end": data.get("week_end") if isinstance(data.get("week_end"), str) else None,
+    }
+    ref = f"{path.relative_to(run_dir).as_posix()}#/rationale"
+    return [
+        {
+            **base,
+            "party": party,
+            **{column: seat_value(section.get(party)) for column, section in sections.items()},
+            "rationale_ref": ref,
+        }
+        for party in parties
+    ]
+
+
+def to_frame(rows: Iterable[Dict[str, object]]) -> pd.DataFrame:
+    import pandas as pd
+
+    frame = pd.DataFrame(list(rows), columns=COLUMNS)
+    for column in SEAT_COLUMNS:
+        frame[column] = frame[column].astype("Int64")
+    return frame
+
+
+def build_table(run_dir: Path, files: Optional[List[Path]] = None) -> pd.DataFrame:
+    """Parse the JSON files of a run into the table layout."""
+    run_dir = Path(run_dir)
+    rows: List[Dict[str, object]] = []
+    for path in forecast_files(run_dir) if files is None else files:
+        rows.extend(forecast_rows(run_dir, path))
+    return to_frame(rows)
+
+
+def is_current(
+    run_dir: Path,
+    table: pd.DataFrame,
+    scanned: Dict[str, float],
+    ignore: Optional[str] = None,
+) -> bool:
+    """True when no forecast file is newer than the store and none it lists was removed.
+
+    ``scanned`` comes from ``scan_forecasts``, so this costs one ``stat`` per file.
+    """
+    try:
+        written = store_path(run_dir).stat().st_mtime
+    except FileNotFoundError:
+        return False
+    listed = {ref.split("#", 1)[0] for ref in table["rationale_ref"].unique()}
+    if not listed.issubset(scanned):
+        return False
+    return all(mtime <= written for relative, mtime in scanned.items() if relative != ignore)
+
+
+def write_table(run_dir: Path, table: pd.DataFrame) -> Path:
+    """Write the store via a temp file + rename so readers never see a partial file."""
+    require_engine()
+    path = store_path(run_dir)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        table.sort_values(["model", "condition", "week", "party"]).to_parquet(tmp_name, index=False)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return path
+
+
+def load_table(run_dir: Path) -> pd.DataFrame:
+    """The run's forecasts as a table: from the store when current, else from the JSON files."""
+    import pandas as pd
+
+    run_dir = Path(run_dir)
+    scanned = scan_forecasts(run_dir)
+    if store_path(run_dir).exists() and parquet_engine() is not None:
+        table = pd.read_parquet(store_path(run_dir))
+        if is_current(run_dir, table, scanned):
+            return table
+    return build_table(run_dir, [run_dir / relative for relative in scanned])
+
+
+def load_tables(run_dirs: Iterable[Path]) -> pd.DataFrame:
+    """Forecasts of several runs as one table, e.g. for cross-run analysis."""
+    import pandas as pd
+
+    tables = [load_table(run_dir) for run_dir in run_dirs]
+    return pd.concat(tables, ignore_index=True) if tables else to_frame([])
+
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_lock = threading.Lock()
+
+
+def lock_for(run_dir: Path) -> threading.Lock:
+    """Process-wide lock per run, so concurrent write-through updates serialize."""
+    key = str(Path(run_dir).resolve())
+    with _locks_lock:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def compact_run(run_dir: Path) -> Tuple[Path, int]:
+    """Rebuild a run's store from its JSON files; return the path and row count."""
+    run_dir = Path(run_dir)
+    with lock_for(run_dir):
+        table = build_table(run_dir)
+        return write_table(run_dir, table), len(table)
+
+
+def upsert_forecast(run_dir: Path, path: Path) -> None:
+    """Write-through: replace one forecast file's rows in the store.
+
+    Falls back to a full rebuild when the store is missing or was already
+    behind the JSON files, so it never marks a stale table as current.
+    """
+    import pandas as pd
+
+    run_dir = Path(run_dir).resolve()
+    path = Path(path).resolve()
+    with lock_for(run_dir):
+        scanned = scan_forecasts(run_dir)
+        ref = f"{path.relative_to(run_dir).as_posix()}#/rationale"
+        table = pd.read_parquet(store_path(run_dir)) if store_path(run_dir).exists() else None
+        if table is None or not is_current(run_dir, table, scanned, ignore=ref.split("#", 1)[0]):
+            write_table(run_dir, build_table(run_dir, [run_dir / relative for relative in scanned]))
+            return
+        kept = table[table["rationale_ref"] != ref]
+        rows = to_frame(forecast_rows(run_dir, path))
+        write_table(run_dir, pd.concat([kept, rows], ignore_index=True) if len(kept) else rows)
+
+
+def add_store_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--forecast-store",
+        action="store_true",
+        help=f"Keep {{run_dir}}/{STORE_NAME}, the run's columnar forecast table, up to date.",
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from run_catalog import add_filter_arguments, filters_from_args, select_runs  # run_catalog imports this module
+
+    parser = argparse.ArgumentParser(description=f"Compact each run's forecast JSON files into {STORE_NAME}.")
+    parser.add_argument("--runs-dir", default="data/runs")
+    parser.add_argument("--run-id", action="append", help="Run id to compact (repeatable). Default: all runs.")
+    add_filter_arguments(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        require_engine()
+    except RuntimeError as exc:
+        raise SystemExit(str(exc))
+
+    runs_dir = Path(args.runs_dir)
+    if args.run_id:
+        run_dirs = [runs_dir / run_id for run_id in args.run_id]
+    else:
+        run_dirs = select_runs(runs_dir, **filters_from_args(args))
+    for run_dir in run_dirs:
+        if not (run_dir / "forecasts").exists():
+            print(f"Skipping {run_dir}: no forecasts/")
+            continue
+        path, rows = compact_run(run_dir)
+        print(f"Wrote {rows} rows to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Write synthetic data/runs/{run_id} trees at a configurable scale for benchmarking."""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import random
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import analyze_search_logs
+from fake_responses import fake_forecast, fake_search_log, rng_for, synthetic_publishers
+
+KNOWN_MODELS = ["gpt-5.2", "gemini-3-pro-preview", "claude-opus-4.5", "gpt-5-mini"]
+CONDITION_SUFFIXES = {
+    "with_prior": ".json",
+    "no_prior": ".no_prior.json",
+    "with_prior_social": ".with_prior_social.json",
+}
+
+SCALES: Dict[str, Dict[str, int]] = {
+    "small": {"runs": 2, "models": 3, "weeks": 8, "sources": 20, "publishers": 12},
+    "medium": {"runs": 20, "models": 4, "weeks": 12, "sources": 40, "publishers": 60},
+    "large": {"runs": 100, "models": 6, "weeks": 26, "sources": 80, "publishers": 300},
+}
+
+
+def model_names(count: int) -> List[str]:
+    extra = [f"synthetic-model-{idx}" for idx in range(max(0, count - len(KNOWN_MODELS)))]
+    return (KNOWN_MODELS + extra)[: max(1, count)]
+
+
+def week_windows(count: int, start: str = "2025-12-12") -> List[tuple]:
+    first = date.fromisoformat(start)
+    return [
+        ((first + timedelta(days=7 * idx)).isoformat(), (first + timedelta(days=7 * idx + 6)).isoformat())
+        for idx in range(count)
+    ]
+
+
+def write_json(path: Path, data: Dict[str, object]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def sample_log(pool: Dict[str, object], model: str, n_sources: int, rng: random.Random) -> Dict[str, object]:
+    """One model's log for a week: a sample of the week's shared article pool,
+    so different models cite overlapping URLs like real runs do."""
+    log = dict(pool)
+    sources = list(pool["sources"])  # type: ignore[arg-type]
+    log["model"] = model
+    log["sources"] = rng.sample(sources, min(n_sources, len(sources)))
+    return log
+
+
+def generate_run(
+    run_dir: Path,
+    models: List[str],
+    weeks: List[tuple],
+    conditions: List[str],
+    n_sources: int,
+    n_publishers: int,
+    social: bool,
+    seed: int,
+) -> int:
+    """Write one run; return the number of files written."""
+    publishers = synthetic_publishers(n_publishers)
+    written = 0
+    for week_start, week_end in weeks:
+        rng = rng_for(seed, run_dir.name, week_start)
+        tracks = [("search_logs", "news")] + ([("search_logs_social", "social")] if social else [])
+        for folder, track in tracks:
+            pool = fake_search_log(
+                week_start,
+                week_end,
+                "pool",
+                n_sources=n_sources * 2,
+                rng=rng_for(seed, run_dir.name, week_start, track),
+                publishers=publishers,
+            )
+            for model in models:
+                write_json(run_dir / folder / model / f"{week_start}.json", sample_log(pool, model, n_sources, rng))
+                written += 1
+        for model in models:
+            for condition in conditions:
+                if condition == "with_prior_social" and not social:
+                    continue
+                data = fake_forecast(
+                    week_start,
+                    week_end,
+                    model,
+                    "no_prior" if condition == "no_prior" else "with_prior",
+                    rng=rng_for(seed, run_dir.name, week_start, model, condition),
+                )
+                write_json(run_dir / "forecasts" / model / f"{week_start}{CONDITION_SUFFIXES[condition]}", data)
+                written += 1
+    return written
+
+
+def analyze_run(run_dir: Path, social: bool) -> None:
+    """Write the per-run analysis CSVs that visualize_runs.py reads."""
+    jobs = [[str(run_dir / "search_logs"), "--out-dir", str(run_dir / "analysis" / "news")]]
+    if social:
+        jobs.append([str(run_dir / "search_logs_social"), "--out-dir", str(run_dir / "analysis" / "social")])
+    with contextlib.redirect_stdout(io.StringIO()):
+        for argv in jobs:
+            analyze_search_logs.main(argv)
+
+
+def add_scale_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="Preset; the flags below override it.")
+    parser.add_argument("--runs", type=int, default=None)
+    parser.add_argument("--models", type=int, default=None, help="Models per run.")
+    parser.add_argument("--weeks", type=int, default=None)
+    parser.add_argument("--sources", type=int, default=None, help="Sources per search log.")
+    parser.add_argument("--publishers", type=int, default=None, help="Distinct publishers to draw from.")
+    parser.add_argument(
+        "--conditions",
+        default="with_prior,no_prior",
+        help="Comma-separated forecast conditions (with_prior, no_prior, with_prior_social).",
+    )
+    parser.add_argument("--social", action="store_true", help="Also write social search logs.")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def scale_params(args: argparse.Namespace) -> Dict[str, object]:
+    params: Dict[str, object] = dict(SCALES[args.scale])
+    for key in ("runs", "models", "weeks", "sources", "publishers"):
+        value = getattr(args, key)
+        if value is not None:
+            params[key] = value
+    conditions = [item.strip() for item in args.conditions.split(",") if item.strip()]
+    unknown = [item for item in conditions if item not in CONDITION_SUFFIXES]
+    if unknown:
+        raise SystemExit(f"Unknown condition(s): {', '.join(unknown)}")
+    params["conditions"] = conditions
+    params["social"] = bool(args.social)
+    params["seed"] = args.seed
+    return params
+
+
+def generate(out_dir: Path, params: Dict[str, object], with_analysis: bool = True) -> int:
+    models = model_names(int(params["models"]))
+    weeks = week_windows(int(params["weeks"]))
+    written = 0
+    for idx in range(int(params["runs"])):
+        run_dir = out_dir / f"synthetic_{idx:04d}"
+        written += generate_run(
+            run_dir,
+            models,
+            weeks,
+            list(params["conditions"]),  # type: ignore[arg-type]
+            int(params["sources"]),
+            int(params["publishers"]),
+            bool(params["social"]),
+            int(params["seed"]),
+        )
+        if with_analysis:
+            analyze_run(run_dir, bool(params["social"]))
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate synthetic run trees for benchmarks.")
+    parser.add_argument("--out-dir", default="benchmarks/synthetic/runs", help="Directory to write runs into.")
+    parser.add_argument("--no-analysis", action="store_true", help="Skip writing per-run analysis CSVs.")
+    add_scale_arguments(parser)
+    args = parser.parse_args(argv)
+
+    params = scale_params(args)
+    out_dir = Path(args.out_dir)
+    written = generate(out_dir, params, with_analysis=not args.no_analysis)
+    print(f"Wrote {written} files under {out_dir}: {json.dumps(params)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
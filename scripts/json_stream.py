@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""Incremental JSON parsing and early validation for streamed LLM output."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Callable, List, Optional, Tuple, Union
+
+from forecast_repair import INPUT_SECTIONS, max_drift
+from seats import PARTIES
+
+JSONPath = Tuple[Union[str, int], ...]
+
+DEFAULT_MAX_CHARS = {"forecast": 16_000, "search": 64_000}
+
+_WHITESPACE = " \t\r\n"
+_SCALAR_CHARS = set("0123456789+-.eEtruefalsn")
+
+
+class StreamAborted(RuntimeError):
+    """Raised when streamed output is already known to be unusable."""
+
+    def __init__(self, reason: str, text: str = "") -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.text = text
+
+
+class IncrementalJSONParser:
+    """Character-at-a-time JSON parser that reports values as they close.
+
+    ``on_key(path, key)`` fires when an object key is read and
+    ``on_value(path, value)`` when any value (scalar or container) is
+    complete, where ``path`` is the tuple of keys/indexes leading to it.
+    Text before the first ``{`` or ``[`` (e.g. a code fence) and after the
+    top-level value is ignored. Syntax errors raise ``StreamAborted``.
+    """
+
+    def __init__(
+        self,
+        on_key: Optional[Callable[[JSONPath, str], None]] = None,
+        on_value: Optional[Callable[[JSONPath, object], None]] = None,
+    ) -> None:
+        self.on_key = on_key
+        self.on_value = on_value
+        # Frames: [container, path, state, pending_key]
+        self.stack: List[List[object]] = []
+        self.started = False
+        self.done = False
+        self.value: object = None
+        self.in_string = False
+        self.escape = False
+        self.token: List[str] = []
+        self.scalar: List[str] = []
+
+    def feed(self, text: str) -> None:
+        for char in text:
+            if self.done:
+                return
+            if not self.started:
+                if char in "{[":
+                    self.started = True
+                    self._open(char)
+                continue
+            if self.in_string:
+                self._string_char(char)
+                continue
+            if self.scalar:
+                if char in _SCALAR_CHARS:
+                    self.scalar.append(char)
+                    continue
+                self._close_scalar()
+                if self.done:
+                    return
+            self._structural(char)
+
+    def _fail(self, message: str) -> None:
+        raise StreamAborted(f"invalid JSON: {message}")
+
+    def _frame(self) -> List[object]:
+        return self.stack[-1]
+
+    def _child_path(self) -> JSONPath:
+        container, path, _, pending_key = self._frame()
+        if isinstance(container, dict):
+            return path + (pending_key,)
+        return path + (len(container),)
+
+    def _open(self, char: str) -> None:
+        path: JSONPath = self._child_path() if self.stack else ()
+        if char == "{":
+            self.stack.append([{}, path, "key_or_end", None])
+        else:
+            self.stack.append([[], path, "value_or_end", None])
+
+    def _string_char(self, char: str) -> None:
+        if self.escape:
+            self.escape = False
+            self.token.append(char)
+            return
+        if char == "\\":
+            self.escape = True
+            self.token.append(char)
+            return
+        if char == '"':
+            self.in_string = False
+            raw = "".join(self.token)
+            self.token = []
+            try:
+                value = json.loads('"' + raw + '"')
+            except json.JSONDecodeError:
+                self._fail("bad string escape")
+            frame = self._frame()
+            if frame[2] in ("key_or_end", "key"):
+                frame[3] = value
+                frame[2] = "colon"
+                if self.on_key:
+                    self.on_key(frame[1], value)
+            else:
+                self._emit(value)
+            return
+        if char in "\n\r":
+            self._fail("newline in string")
+        self.token.append(char)
+
+    def _close_scalar(self) -> None:
+        raw = "".join(self.scalar)
+        self.scalar = []
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            self._fail(f"bad literal {raw[:20]!r}")
+        self._emit(value)
+
+    def _structural(self, char: str) -> None:
+        if char in _WHITESPACE:
+            return
+        frame = self._frame()
+        container, path, state, _ = frame
+        if state == "colon":
+            if char != ":":
+                self._fail(f"expected ':' got {char!r}")
+            frame[2] = "value"
+            return
+        if state == "comma_or_end":
+            if char == ",":
+                frame[2] = "key" if isinstance(container, dict) else "value"
+                return
+            if char == ("}" if isinstance(container, dict) else "]"):
+                self._close_container()
+                return
+            self._fail(f"expected ',' got {char!r}")
+        if state in ("key_or_end", "key"):
+            if char == '"':
+                self.in_string = True
+                return
+            if char == "}" and state == "key_or_end":
+                self._close_container()
+                return
+            self._fail(f"expected object key got {char!r}")
+        # state is value / value_or_end
+        if char == "]" and state == "value_or_end":
+            self._close_container()
+            return
+        if char == '"':
+            self.in_string = True
+        elif char in "{[":
+            self._open(char)
+        elif char in _SCALAR_CHARS:
+            self.scalar.append(char)
+        else:
+            self._fail(f"unexpected {char!r}")
+
+    def _close_container(self) -> None:
+        container, path, _, _ = self.stack.pop()
+        if not self.stack:
+            self._report(path, container)
+            self.value = container
+            self.done = True
+            return
+        self._emit(container)
+
+    def _emit(self, value: object) -> None:
+        frame = self._frame()
+        container, path, _, pending_key = frame
+        if isinstance(container, dict):
+            container[pending_key] = value
+            self._report(path + (pending_key,), value)
+            frame[3] = None
+        else:
+            self._report(path + (len(container),), value)
+            container.append(value)
+        frame[2] = "comma_or_end"
+
+    def _report(self, path: JSONPath, value: object) -> None:
+        if self.on_value:
+            self.on_value(path, value)
+
+
+def _forecast_checks() -> Tuple[Callable, Callable]:
+    # Only abort on what forecast_repair cannot fix: totals, deltas and checks
+    # are recomputed, and party-list/district sums a few seats off rescaled.
+    def on_key(path: JSONPath, key: str) -> None:
+        if len(path) == 1 and path[0] in INPUT_SECTIONS and key not in PARTIES:
+            raise StreamAborted(f"unexpected party key {key!r} in {path[0]}")
+
+    def on_value(path: JSONPath, value: object) -> None:
+        if len(path) == 2 and path[0] in INPUT_SECTIONS:
+            integral = isinstance(value, int) or (isinstance(value, float) and value.is_integer())
+            if isinstance(value, bool) or not integral or value < 0:  # type: ignore[operator]
+                raise StreamAborted(f"{path[0]}.{path[1]} is not a non-negative integer")
+        elif len(path) == 1 and path[0] in INPUT_SECTIONS:
+            section = str(path[0])
+            if not isinstance(value, dict):
+                raise StreamAborted(f"{section} is not an object")
+            missing = [party for party in PARTIES if party not in value]
+            if missing:
+                raise StreamAborted(f"{section} is missing {', '.join(missing)}")
+            seat_sum = sum(value.values())
+            expected = INPUT_SECTIONS[section]
+            if abs(seat_sum - expected) > max_drift(expected):
+                raise StreamAborted(f"{section} sums to {seat_sum}, expected {expected}")
+        elif path == ():
+            if not isinstance(value, dict):
+                raise StreamAborted("forecast is not an object")
+            missing = [section for section in INPUT_SECTIONS if section not in value]
+            if missing:
+                raise StreamAborted(f"forecast is missing {', '.join(missing)}")
+
+    return on_key, on_value
+
+
+def _search_checks() -> Tuple[Callable, Callable]:
+    def on_key(path: JSONPath, key: str) -> None:
+        return None
+
+    def on_value(path: JSONPath, value: object) -> None:
+        if path == ("sources",) and not isinstance(value, list):
+            raise StreamAborted("sources is not a list")
+        elif len(path) == 2 and path[0] == "sources":
+            if not isinstance(value, dict):
+                raise StreamAborted(f"sources[{path[1]}] is not an object")
+            if not value.get("url"):
+                raise StreamAborted(f"sources[{path[1]}] has no url")
+        elif path == ():
+            if not isinstance(value, dict):
+                raise StreamAborted("search log is not an object")
+            if not isinstance(value.get("sources"), list):
+                raise StreamAborted("search log has no sources list")
+
+    return on_key, on_value
+
+
+CHECKS = {"forecast": _forecast_checks, "search": _search_checks}
+
+
+class StreamMonitor:
+    """Feeds streamed deltas through the parser and the output-kind checks.
+
+    Records time to first token and raises ``StreamAborted`` as soon as the
+    partial output breaks the expected shape or passes ``max_chars``. Call
+    ``reset()`` before each attempt and ``finish()`` once the stream ends.
+    """
+
+    def __init__(self, kind: Optional[str] = None, max_chars: Optional[int] = None) -> None:
+        if kind is not None and kind not in CHECKS:
+            raise ValueError(f"Unknown stream kind: {kind}")
+        self.kind = kind
+        self.max_chars = DEFAULT_MAX_CHARS.get(kind or "", 0) if max_chars is None else max_chars
+        self.reset()
+
+    def reset(self) -> None:
+        on_key = on_value = None
+        if self.kind is not None:
+            on_key, on_value = CHECKS[self.kind]()
+        self.parser = IncrementalJSONParser(on_key=on_key, on_value=on_value)
+        self.parts: List[str] = []
+        self.chars = 0
+        self.started = time.monotonic()
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    @property
+    def ttft(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started
+
+    def feed(self, delta: str) -> None:
+        if not delta:
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+        self.parts.append(delta)
+        self.chars += len(delta)
+        try:
+            if self.max_chars and self.chars > self.max_chars:
+                raise StreamAborted(f"output passed {self.max_chars} characters")
+            self.parser.feed(delta)
+        except StreamAborted as exc:
+            self.finished_at = time.monotonic()
+            raise StreamAborted(exc.reason, self.text) from None
+
+    def finish(self) -> str:
+        self.finished_at = time.monotonic()
+        if self.kind is not None and not self.parser.done:
+            raise StreamAborted("stream ended before the JSON object was complete", self.text)
+        return self.text
+
+    def summary(self) -> str:
+        ttft = f"{self.ttft:.2f}s" if self.ttft is not None else "n/a"
+        return f"Stream: first token {ttft}, total {self.elapsed:.2f}s, {self.chars} chars"
+
+
+def add_stream_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream the completion, validating JSON as it arrives and aborting early if it is invalid.",
+    )
+    parser.add_argument(
+        "--max-response-chars",
+        type=int,
+        default=None,
+        help="Abort a streamed response past this many characters. Default depends on the output kind.",
+    )
+
+
+def stream_from_args(args: argparse.Namespace, kind: Optional[str] = None) -> Optional[StreamMonitor]:
+    if not getattr(args, "stream", False):
+        return None
+    return StreamMonitor(kind, args.max_response_chars)
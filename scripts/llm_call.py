@@ -5,8 +5,13 @@ import argparse
 import json
 import sys
 from pathlib import Path
+from typing import List, Optional
 
-from llm_utils import call_provider, env_float, env_int, load_dotenv, render_template
+from json_stream import StreamAborted, add_stream_arguments, stream_from_args
+from llm_utils import call_provider, env_float, env_int, format_usage, load_dotenv, render_template
+from llm_worker import forward
+from response_cache import add_cache_arguments, cache_from_args
+from telemetry import add_telemetry_arguments, bind, ledger_from_args
 
 
 def load_text(path: Path) -> str:
@@ -23,7 +28,11 @@ def parse_vars(items) -> dict:
     return values
 
 
-def main() -> int:
+def main(argv: Optional[List[str]] = None) -> int:
+    if argv is None:
+        forwarded = forward("llm_call")
+        if forwarded is not None:
+            return forwarded
     parser = argparse.ArgumentParser(description="Call LLM provider with a prompt template.")
     parser.add_argument("--provider", required=True, choices=["openai", "anthropic", "gemini"])
     parser.add_argument("--model", required=True)
@@ -37,7 +46,10 @@ def main() -> int:
     parser.add_argument("--temperature", type=float, default=0.0)
     parser.add_argument("--max-tokens", type=int, default=2048)
     parser.add_argument("--timeout", type=int, default=60)
-    args = parser.parse_args()
+    add_cache_arguments(parser)
+    add_stream_arguments(parser)
+    add_telemetry_arguments(parser)
+    args = parser.parse_args(argv)
 
     if not args.prompt_file and not args.prompt:
         raise SystemExit("Provide --prompt-file or --prompt.")
@@ -57,17 +69,34 @@ def main() -> int:
     if args.timeout == 60:
         args.timeout = env_int("LLM_TIMEOUT", args.timeout)
 
-    response = call_provider(
-        args.provider,
-        prompt_text,
-        args.model,
-        system=system_text,
-        response_json=args.response_json,
-        enable_search_tool=args.enable_search_tool,
-        temperature=args.temperature,
-        max_tokens=args.max_tokens,
-        timeout=args.timeout,
-    )
+    cache = cache_from_args(args)
+    usage: dict = {}
+    stream = stream_from_args(args)
+    try:
+        with bind(ledger=ledger_from_args(args)):
+            response = call_provider(
+                args.provider,
+                prompt_text,
+                args.model,
+                system=system_text,
+                response_json=args.response_json,
+                enable_search_tool=args.enable_search_tool,
+                temperature=args.temperature,
+                max_tokens=args.max_tokens,
+                timeout=args.timeout,
+                cache=cache,
+                refresh_cache=args.refresh_cache,
+                usage=usage,
+                stream=stream,
+            )
+    except StreamAborted as exc:
+        raise SystemExit(f"Aborted streamed response after {len(exc.text)} chars: {exc.reason}")
+    if stream is not None and stream.first_token_at is not None:
+        print(stream.summary(), file=sys.stderr)
+    if usage:
+        print(format_usage(usage), file=sys.stderr)
+    if cache is not None:
+        print(f"Response cache totals: {cache.hits} hit(s), {cache.misses} miss(es)", file=sys.stderr)
 
     if args.out:
         Path(args.out).write_text(response, encoding="utf-8")
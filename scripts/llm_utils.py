@@ -1,26 +1,32 @@
 #!/usr/bin/env python3
 """Shared utilities for calling LLM APIs."""
 
+import atexit
+import contextvars
+import importlib
+import json
 import os
 import re
-from typing import Dict, Optional
-
-try:  # OpenAI SDK
-    from openai import OpenAI
-except ImportError:  # pragma: no cover - optional dependency
-    OpenAI = None
-
-try:  # Anthropic SDK
-    from anthropic import Anthropic
-except ImportError:  # pragma: no cover - optional dependency
-    Anthropic = None
-
-try:  # Google GenAI SDK
-    from google import genai as google_genai
-    from google.genai import types as google_genai_types
-except ImportError:  # pragma: no cover - optional dependency
-    google_genai = None
-    google_genai_types = None
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from json_stream import StreamMonitor
+from rate_limit import call_with_retries, estimate_tokens, get_limiter
+from response_cache import ResponseCache, cache_key, sha256_text
+from telemetry import record_call
+
+# Provider SDKs are imported on first use, so a script pays only for the
+# provider it calls: {provider: (display name, module, install hint)}.
+SDKS = {
+    "openai": ("OpenAI", "openai", "pip install openai"),
+    "anthropic": ("Anthropic", "anthropic", "pip install anthropic"),
+    "gemini": ("Google GenAI", "google.genai", "pip install google-genai"),
+}
 
 
 def load_dotenv(path: str = ".env") -> None:
@@ -54,9 +60,67 @@ def render_template(text: str, variables: Dict[str, str]) -> str:
     return pattern.sub(replace, text)
 
 
-def _require_sdk(sdk: object, name: str, install_hint: str) -> None:
-    if sdk is None:
-        raise RuntimeError(f"{name} SDK is not installed. Install with: {install_hint}")
+PROMPT_CACHE_BREAKPOINT = "<!-- cache-breakpoint -->"
+
+
+def split_cache_breakpoint(prompt: str) -> Tuple[str, str]:
+    """Split a rendered prompt into its static prefix and variable tail.
+
+    Templates put instructions and the output skeleton before
+    PROMPT_CACHE_BREAKPOINT and the per-week inputs after it, so the prefix
+    is byte-identical across weeks and can be served from provider prompt
+    caches. Prompts without the marker are all tail.
+    """
+    prefix, marker, tail = prompt.partition(PROMPT_CACHE_BREAKPOINT)
+    if not marker:
+        return "", prompt
+    return prefix, tail.lstrip("\n")
+
+
+def strip_cache_breakpoint(prompt: str) -> str:
+    prefix, tail = split_cache_breakpoint(prompt)
+    return prefix + tail
+
+
+def _fill_usage(usage: Optional[Dict[str, int]], **counts: Optional[int]) -> None:
+    if usage is None:
+        return
+    for key, value in counts.items():
+        if isinstance(value, int):
+            usage[key] = value
+
+
+def format_usage(usage: Dict[str, int]) -> str:
+    return (
+        f"Tokens: input={usage.get('input_tokens', 0)} "
+        f"(cached={usage.get('cached_input_tokens', 0)}), "
+        f"output={usage.get('output_tokens', 0)}"
+    )
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """Write text via a temp file + rename so readers never see a partial file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(text)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def load_sdk(provider: str) -> Any:
+    """The provider's SDK module, imported on first use."""
+    name, module, install_hint = SDKS[provider]
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        raise RuntimeError(f"{name} SDK is not installed. Install with: {install_hint}") from None
 
 def env_int(name: str, default: int) -> int:
     value = os.environ.get(name)
@@ -78,6 +142,123 @@ def env_float(name: str, default: float) -> float:
         return default
 
 
+_client_lock = threading.Lock()
+_clients: Dict[Tuple[str, str, str], Tuple[object, Optional[object]]] = {}
+_pool_size: Optional[int] = None
+
+
+def configure_client_pool(pool_size: int) -> None:
+    """Set the max pooled HTTP connections for provider clients created after this call."""
+    global _pool_size
+    _pool_size = max(1, pool_size)
+
+
+def client_pool_size() -> int:
+    if _pool_size is not None:
+        return _pool_size
+    return max(1, env_int("LLM_POOL_SIZE", 16))
+
+
+def _http_client(sdk_class: object, timeout: int) -> Optional[object]:
+    """Pooled HTTP client built with the SDK's own DefaultHttpxClient.
+
+    SDK releases pin different httpx distributions (``httpx`` or
+    ``httpx2``), so the Limits class is taken from the one the SDK's
+    client is built on.
+    """
+    sdk = sys.modules.get(getattr(sdk_class, "__module__", "").split(".")[0])
+    factory = getattr(sdk, "DefaultHttpxClient", None)
+    if factory is None:
+        return None
+    transport = next(
+        (
+            importlib.import_module(base.__module__.split(".")[0])
+            for base in factory.__mro__
+            if base.__module__.split(".")[0].startswith("httpx")
+        ),
+        None,
+    )
+    if transport is None:
+        return None
+    size = client_pool_size()
+    return factory(
+        limits=transport.Limits(
+            max_connections=size,
+            max_keepalive_connections=size,
+            keepalive_expiry=120.0,
+        ),
+        timeout=timeout,
+    )
+
+
+def _build_client(provider: str, api_key: str, base_url: str, timeout: int) -> Tuple[object, Optional[object]]:
+    if provider not in SDKS:
+        raise RuntimeError(f"Unknown provider: {provider}")
+    sdk = load_sdk(provider)
+    if provider == "openai":
+        http_client = _http_client(sdk.OpenAI, timeout)
+        # Retries are handled by rate_limit.call_with_retries.
+        kwargs: Dict[str, object] = {"api_key": api_key, "max_retries": 0}
+        if base_url:
+            kwargs["base_url"] = base_url
+        if http_client is not None:
+            kwargs["http_client"] = http_client
+        return sdk.OpenAI(**kwargs), http_client
+    if provider == "anthropic":
+        http_client = _http_client(sdk.Anthropic, timeout)
+        kwargs = {"api_key": api_key, "base_url": base_url, "timeout": timeout, "max_retries": 0}
+        if http_client is not None:
+            kwargs["http_client"] = http_client
+        return sdk.Anthropic(**kwargs), http_client
+    if provider == "gemini":
+        http_options: Dict[str, object] = {"base_url": base_url}
+        try:  # HTTP transport the Gemini SDK is built on
+            import httpx
+        except ImportError:  # pragma: no cover - optional dependency
+            httpx = None
+        if httpx is not None:
+            size = client_pool_size()
+            http_options["client_args"] = {
+                "limits": httpx.Limits(max_connections=size, max_keepalive_connections=size),
+            }
+        return sdk.Client(api_key=api_key, http_options=http_options), None
+
+
+def get_client(provider: str, api_key: str, base_url: str = "", timeout: int = 60) -> object:
+    """Return the shared client for (provider, base URL, key), creating it once.
+
+    Clients are thread-safe and keep their HTTP connections alive, so every
+    call to the same endpoint reuses an open connection instead of paying a
+    new TLS handshake.
+    """
+    key = (provider, base_url, api_key)
+    with _client_lock:
+        entry = _clients.get(key)
+        if entry is None:
+            entry = _build_client(provider, api_key, base_url, timeout)
+            _clients[key] = entry
+    return entry[0]
+
+
+def close_clients() -> None:
+    """Close every pooled provider client and its HTTP connections."""
+    with _client_lock:
+        entries = list(_clients.values())
+        _clients.clear()
+    for client, http_client in entries:
+        close = getattr(client, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception:  # pragma: no cover - best effort on shutdown
+                pass
+        if http_client is not None:
+            http_client.close()
+
+
+atexit.register(close_clients)
+
+
 def call_openai(
     prompt: str,
     model: str,
@@ -86,13 +267,18 @@ def call_openai(
     enable_search_tool: bool = False,
     temperature: float = 0.0,
     timeout: int = 60,
+    usage: Optional[Dict[str, int]] = None,
+    on_delta: Optional[Callable[[str], None]] = None,
 ) -> str:
-    _require_sdk(OpenAI, "OpenAI", "pip install openai")
+    load_sdk("openai")
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY is not set.")
 
-    client = OpenAI(api_key=api_key)
+    base_url = os.environ.get("OPENAI_BASE_URL", "")
+    client = get_client("openai", api_key, base_url, timeout).with_options(timeout=timeout)
+    # OpenAI caches shared prompt prefixes automatically; the marker is just removed.
+    prompt = strip_cache_breakpoint(prompt)
 
     messages = []
     if system:
@@ -108,7 +294,17 @@ def call_openai(
         }
         if system:
             request["instructions"] = system
+        if on_delta is not None:
+            return _stream_openai_responses(client, request, usage, on_delta)
         response = client.responses.create(**request)
+        if response.usage is not None:
+            details = getattr(response.usage, "input_tokens_details", None)
+            _fill_usage(
+                usage,
+                input_tokens=response.usage.input_tokens,
+                output_tokens=response.usage.output_tokens,
+                cached_input_tokens=getattr(details, "cached_tokens", None),
+            )
         return response.output_text or ""
 
     request = {
@@ -118,11 +314,83 @@ def call_openai(
     }
     if response_json:
         request["response_format"] = {"type": "json_object"}
+    if on_delta is not None:
+        return _stream_openai_chat(client, request, usage, on_delta)
 
     response = client.chat.completions.create(**request)
+    if response.usage is not None:
+        details = getattr(response.usage, "prompt_tokens_details", None)
+        _fill_usage(
+            usage,
+            input_tokens=response.usage.prompt_tokens,
+            output_tokens=response.usage.completion_tokens,
+            cached_input_tokens=getattr(details, "cached_tokens", None),
+        )
     return response.choices[0].message.content or ""
 
 
+def _stream_openai_chat(
+    client: object,
+    request: Dict[str, object],
+    usage: Optional[Dict[str, int]],
+    on_delta: Callable[[str], None],
+) -> str:
+    parts: List[str] = []
+    stream = client.chat.completions.create(**request, stream=True, stream_options={"include_usage": True})
+    # Leaving the block (including via StreamAborted) closes the connection.
+    with stream:
+        for chunk in stream:
+            if chunk.choices:
+                text = chunk.choices[0].delta.content or ""
+                if text:
+                    parts.append(text)
+                    on_delta(text)
+            if getattr(chunk, "usage", None) is not None:
+                details = getattr(chunk.usage, "prompt_tokens_details", None)
+                _fill_usage(
+                    usage,
+                    input_tokens=chunk.usage.prompt_tokens,
+                    output_tokens=chunk.usage.completion_tokens,
+                    cached_input_tokens=getattr(details, "cached_tokens", None),
+                )
+    return "".join(parts)
+
+
+def _stream_openai_responses(
+    client: object,
+    request: Dict[str, object],
+    usage: Optional[Dict[str, int]],
+    on_delta: Callable[[str], None],
+) -> str:
+    parts: List[str] = []
+    stream = client.responses.create(**request, stream=True)
+    with stream:
+        for event in stream:
+            if event.type == "response.output_text.delta":
+                parts.append(event.delta)
+                on_delta(event.delta)
+            elif event.type == "response.completed" and event.response.usage is not None:
+                details = getattr(event.response.usage, "input_tokens_details", None)
+                _fill_usage(
+                    usage,
+                    input_tokens=event.response.usage.input_tokens,
+                    output_tokens=event.response.usage.output_tokens,
+                    cached_input_tokens=getattr(details, "cached_tokens", None),
+                )
+    return "".join(parts)
+
+
+def anthropic_content(prompt: str) -> List[Dict[str, object]]:
+    """User content blocks with a cache_control breakpoint after the static prefix."""
+    prefix, tail = split_cache_breakpoint(prompt)
+    if not prefix:
+        return [{"type": "text", "text": tail}]
+    return [
+        {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": tail},
+    ]
+
+
 def call_anthropic(
     prompt: str,
     model: str,
@@ -132,14 +400,16 @@ def call_anthropic(
     temperature: float = 0.0,
     max_tokens: int = 2048,
     timeout: int = 60,
+    usage: Optional[Dict[str, int]] = None,
+    on_delta: Optional[Callable[[str], None]] = None,
 ) -> str:
-    _require_sdk(Anthropic, "Anthropic", "pip install anthropic")
+    load_sdk("anthropic")
     api_key = os.environ.get("ANTHROPIC_API_KEY")
     if not api_key:
         raise RuntimeError("ANTHROPIC_API_KEY is not set.")
 
     base_url = os.environ.get("ANTHROPIC_BASE_URL", "https://api.anthropic.com")
-    client = Anthropic(api_key=api_key, base_url=base_url, timeout=timeout)
+    client = get_client("anthropic", api_key, base_url, timeout).with_options(timeout=timeout)
 
     if enable_search_tool:
         raise RuntimeError(
@@ -151,14 +421,30 @@ def call_anthropic(
         "model": model,
         "max_tokens": max_tokens,
         "temperature": temperature,
-        "messages": [{"role": "user", "content": prompt}],
+        "messages": [{"role": "user", "content": anthropic_content(prompt)}],
     }
     if system:
         request["system"] = system
     if response_json:
         request["stop_sequences"] = []
 
-    response = client.messages.create(**request)
+    if on_delta is not None:
+        with client.messages.stream(**request) as stream:
+            for text in stream.text_stream:
+                on_delta(text)
+            response = stream.get_final_message()
+    else:
+        response = client.messages.create(**request)
+    if response.usage is not None:
+        cache_read = getattr(response.usage, "cache_read_input_tokens", None) or 0
+        cache_write = getattr(response.usage, "cache_creation_input_tokens", None) or 0
+        _fill_usage(
+            usage,
+            input_tokens=response.usage.input_tokens + cache_read + cache_write,
+            output_tokens=response.usage.output_tokens,
+            cached_input_tokens=cache_read,
+            cache_creation_input_tokens=cache_write,
+        )
     parts = []
     for part in response.content or []:
         if part.type == "text":
@@ -174,15 +460,16 @@ def call_gemini(
     enable_search_tool: bool = False,
     temperature: float = 0.0,
     timeout: int = 60,
+    usage: Optional[Dict[str, int]] = None,
+    on_delta: Optional[Callable[[str], None]] = None,
 ) -> str:
-    _require_sdk(google_genai, "Google GenAI", "pip install google-genai")
-    _require_sdk(google_genai_types, "Google GenAI", "pip install google-genai")
+    genai_types = load_sdk("gemini").types
     api_key = os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
     if not api_key:
         raise RuntimeError("GEMINI_API_KEY or GOOGLE_API_KEY is not set.")
 
     base_url = os.environ.get("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com")
-    client = google_genai.Client(api_key=api_key, http_options={"base_url": base_url})
+    client = get_client("gemini", api_key, base_url, timeout)
 
     config_kwargs: Dict[str, object] = {"temperature": temperature}
     if response_json:
@@ -190,19 +477,50 @@ def call_gemini(
     if system:
         config_kwargs["system_instruction"] = system
     if enable_search_tool:
-        config_kwargs["tools"] = [google_genai_types.Tool(google_search=google_genai_types.GoogleSearch())]
-
-    config = google_genai_types.GenerateContentConfig(**config_kwargs)
+        config_kwargs["tools"] = [genai_types.Tool(google_search=genai_types.GoogleSearch())]
+
+    config = genai_types.GenerateContentConfig(**config_kwargs)
+
+    # Gemini caches shared prompt prefixes implicitly; the marker is just removed.
+    if on_delta is not None:
+        parts: List[str] = []
+        metadata = None
+        for chunk in client.models.generate_content_stream(
+            model=model,
+            contents=strip_cache_breakpoint(prompt),
+            config=config,
+        ):
+            text = chunk.text or ""
+            if text:
+                parts.append(text)
+                on_delta(text)
+            metadata = getattr(chunk, "usage_metadata", None) or metadata
+        if metadata is not None:
+            _fill_usage(
+                usage,
+                input_tokens=metadata.prompt_token_count,
+                output_tokens=metadata.candidates_token_count,
+                cached_input_tokens=getattr(metadata, "cached_content_token_count", None),
+            )
+        return "".join(parts)
 
     response = client.models.generate_content(
         model=model,
-        contents=prompt,
+        contents=strip_cache_breakpoint(prompt),
         config=config,
     )
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata is not None:
+        _fill_usage(
+            usage,
+            input_tokens=metadata.prompt_token_count,
+            output_tokens=metadata.candidates_token_count,
+            cached_input_tokens=getattr(metadata, "cached_content_token_count", None),
+        )
     return response.text or ""
 
 
-def call_provider(
+def _dispatch_provider(
     provider: str,
     prompt: str,
     model: str,
@@ -212,6 +530,8 @@ def call_provider(
     temperature: float = 0,
     max_tokens: int = 2048,
     timeout: int = 60,
+    usage: Optional[Dict[str, int]] = None,
+    on_delta: Optional[Callable[[str], None]] = None,
 ) -> str:
     provider = provider.lower()
     if provider == "openai":
@@ -223,6 +543,8 @@ def call_provider(
             enable_search_tool=enable_search_tool,
             temperature=temperature,
             timeout=timeout,
+            usage=usage,
+            on_delta=on_delta,
         )
     if provider == "anthropic":
         return call_anthropic(
@@ -234,6 +556,8 @@ def call_provider(
             temperature=temperature,
             max_tokens=max_tokens,
             timeout=timeout,
+            usage=usage,
+            on_delta=on_delta,
         )
     if provider == "gemini":
         return call_gemini(
@@ -244,5 +568,316 @@ def call_provider(
             enable_search_tool=enable_search_tool,
             temperature=temperature,
             timeout=timeout,
+            usage=usage,
+            on_delta=on_delta,
         )
     raise RuntimeError(f"Unknown provider: {provider}")
+
+
+def cacheable_response(text: str, response_json: bool) -> bool:
+    """Whether a response may be cached: in JSON mode only text that parses."""
+    if not response_json:
+        return True
+    try:
+        json.loads(text)
+    except json.JSONDecodeError:
+        return False
+    return True
+
+
+def call_provider(
+    provider: str,
+    prompt: str,
+    model: str,
+    system: Optional[str] = None,
+    response_json: bool = False,
+    enable_search_tool: bool = False,
+    temperature: float = 0,
+    max_tokens: int = 2048,
+    timeout: int = 60,
+    cache: Optional[ResponseCache] = None,
+    refresh_cache: bool = False,
+    max_retries: Optional[int] = None,
+    usage: Optional[Dict[str, int]] = None,
+    stream: Optional[StreamMonitor] = None,
+) -> str:
+    """Call a provider, optionally through an on-disk response cache.
+
+    With ``refresh_cache`` the cached entry is ignored and overwritten. In
+    JSON mode only responses that parse are stored, so a bad answer is
+    never replayed. Uncached calls go through the provider/model rate
+    limiter and are retried on throttles and transient errors
+    (``LLM_MAX_RETRIES``, default 5). If ``usage`` is given it is filled
+    with the provider's token counts (input, output, cached input).
+
+    With ``stream`` the completion is streamed through the monitor, which
+    records time to first token and raises ``json_stream.StreamAborted``
+    (closing the connection) as soon as the partial output is invalid.
+    Aborted streams are not retried.
+
+    Every call, cache hits and failures included, is appended to the
+    telemetry ledger bound with ``telemetry.bind`` if there is one.
+    """
+    provider = provider.lower()
+    started = time.monotonic()
+    key = None
+    if cache is not None:
+        key = cache_key(
+            provider,
+            model,
+            prompt,
+            system,
+            temperature,
+            response_json,
+            enable_search_tool,
+            max_tokens,
+        )
+        if not refresh_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                record_call(provider, model, time.monotonic() - started, cache_hit=True)
+                return cached
+
+    call_usage: Dict[str, int] = usage if usage is not None else {}
+    stats: Dict[str, float] = {}
+    error = None
+
+    def attempt() -> str:
+        if stream is None:
+            on_delta = None
+        else:
+            stream.reset()
+            on_delta = stream.feed
+        text = _dispatch_provider(
+            provider,
+            prompt,
+            model,
+            system=system,
+            response_json=response_json,
+            enable_search_tool=enable_search_tool,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout,
+            usage=call_usage,
+            on_delta=on_delta,
+        )
+        if stream is not None:
+            stream.finish()
+        return text
+
+    try:
+        response = call_with_retries(
+            attempt,
+            get_limiter(provider, model),
+            token_estimate=estimate_tokens(prompt) + estimate_tokens(system or "") + max_tokens,
+            max_retries=env_int("LLM_MAX_RETRIES", 5) if max_retries is None else max_retries,
+            label=f"{provider}/{model}",
+            stats=stats,
+        )
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        record_call(
+            provider,
+            model,
+            time.monotonic() - started,
+            limiter_wait_seconds=stats.get("limiter_wait_s", 0.0),
+            usage=call_usage,
+            retries=int(stats.get("retries", 0)),
+            ttft_seconds=stream.ttft if stream is not None else None,
+            error=error,
+        )
+
+    if cache is not None and key is not None and response and cacheable_response(response, response_json):
+        cache.put(key, response, {"provider": provider, "model": model})
+    return response
+
+
+def _sample_openai(
+    prompt: str,
+    model: str,
+    samples: int,
+    system: Optional[str],
+    response_json: bool,
+    temperature: float,
+    timeout: int,
+    usage: Dict[str, int],
+) -> List[str]:
+    load_sdk("openai")
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("OPENAI_API_KEY is not set.")
+    client = get_client("openai", api_key, os.environ.get("OPENAI_BASE_URL", ""), timeout).with_options(timeout=timeout)
+    messages = []
+    if system:
+        messages.append({"role": "system", "content": system})
+    messages.append({"role": "user", "content": strip_cache_breakpoint(prompt)})
+    request: Dict[str, object] = {"model": model, "messages": messages, "temperature": temperature, "n": samples}
+    if response_json:
+        request["response_format"] = {"type": "json_object"}
+    response = client.chat.completions.create(**request)
+    if response.usage is not None:
+        details = getattr(response.usage, "prompt_tokens_details", None)
+        _fill_usage(
+            usage,
+            input_tokens=response.usage.prompt_tokens,
+            output_tokens=response.usage.completion_tokens,
+            cached_input_tokens=getattr(details, "cached_tokens", None),
+        )
+    choices = sorted(response.choices, key=lambda choice: choice.index)
+    return [choice.message.content or "" for choice in choices]
+
+
+def _sample_gemini(
+    prompt: str,
+    model: str,
+    samples: int,
+    system: Optional[str],
+    response_json: bool,
+    temperature: float,
+    timeout: int,
+    usage: Dict[str, int],
+) -> List[str]:
+    genai_types = load_sdk("gemini").types
+    api_key = os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
+    if not api_key:
+        raise RuntimeError("GEMINI_API_KEY or GOOGLE_API_KEY is not set.")
+    base_url = os.environ.get("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com")
+    client = get_client("gemini", api_key, base_url, timeout)
+    config_kwargs: Dict[str, object] = {"temperature": temperature, "candidate_count": samples}
+    if response_json:
+        config_kwargs["response_mime_type"] = "application/json"
+    if system:
+        config_kwargs["system_instruction"] = system
+    response = client.models.generate_content(
+        model=model,
+        contents=strip_cache_breakpoint(prompt),
+        config=genai_types.GenerateContentConfig(**config_kwargs),
+    )
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata is not None:
+        _fill_usage(
+            usage,
+            input_tokens=metadata.prompt_token_count,
+            output_tokens=metadata.candidates_token_count,
+            cached_input_tokens=getattr(metadata, "cached_content_token_count", None),
+        )
+    texts = []
+    for candidate in response.candidates or []:
+        parts = getattr(candidate.content, "parts", None) or []
+        texts.append("".join(part.text for part in parts if getattr(part, "text", None)))
+    return texts
+
+
+# Providers that return several completions of one prompt from a single request.
+NATIVE_SAMPLERS: Dict[str, Callable[..., List[str]]] = {
+    "openai": _sample_openai,
+    "gemini": _sample_gemini,
+}
+
+
+def call_provider_samples(
+    provider: str,
+    prompt: str,
+    model: str,
+    samples: int,
+    system: Optional[str] = None,
+    response_json: bool = False,
+    enable_search_tool: bool = False,
+    temperature: float = 0,
+    max_tokens: int = 2048,
+    timeout: int = 60,
+    cache: Optional[ResponseCache] = None,
+    refresh_cache: bool = False,
+    max_retries: Optional[int] = None,
+    usage: Optional[Dict[str, int]] = None,
+) -> List[str]:
+    """``samples`` independent completions of one prompt.
+
+    OpenAI (``n``) and Gemini (``candidate_count``) return them all from a
+    single rate-limited request, so the prompt is sent and prefilled once.
+    Other providers, and search-tool calls, fall back to ``samples``
+    concurrent ``call_provider`` calls. The list is cached as one entry,
+    keyed by the request and the sample count; ``usage`` gets the summed
+    token counts.
+    """
+    provider = provider.lower()
+    started = time.monotonic()
+    key = None
+    if cache is not None:
+        request_key = cache_key(
+            provider,
+            model,
+            prompt,
+            system,
+            temperature,
+            response_json,
+            enable_search_tool,
+            max_tokens,
+        )
+        key = sha256_text(f"{request_key}|samples={samples}")
+        if not refresh_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                record_call(provider, model, time.monotonic() - started, cache_hit=True)
+                return json.loads(cached)
+
+    call_usage: Dict[str, int] = usage if usage is not None else {}
+    sampler = NATIVE_SAMPLERS.get(provider)
+    if sampler is not None and not enable_search_tool:
+        stats: Dict[str, float] = {}
+        error = None
+        try:
+            texts = call_with_retries(
+                lambda: sampler(prompt, model, samples, system, response_json, temperature, timeout, call_usage),
+                get_limiter(provider, model),
+                token_estimate=estimate_tokens(prompt) + estimate_tokens(system or "") + max_tokens * samples,
+                max_retries=env_int("LLM_MAX_RETRIES", 5) if max_retries is None else max_retries,
+                label=f"{provider}/{model}",
+                stats=stats,
+            )
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            record_call(
+                provider,
+                model,
+                time.monotonic() - started,
+                limiter_wait_seconds=stats.get("limiter_wait_s", 0.0),
+                usage=call_usage,
+                retries=int(stats.get("retries", 0)),
+                error=error,
+            )
+    else:
+        usages: List[Dict[str, int]] = [{} for _ in range(samples)]
+        with ThreadPoolExecutor(max_workers=samples) as pool:
+            # Each worker runs in a copy of this context so telemetry stays bound.
+            futures = [
+                pool.submit(
+                    contextvars.copy_context().run,
+                    call_provider,
+                    provider,
+                    prompt,
+                    model,
+                    system=system,
+                    response_json=response_json,
+                    enable_search_tool=enable_search_tool,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    timeout=timeout,
+                    max_retries=max_retries,
+                    usage=sample_usage,
+                )
+                for sample_usage in usages
+            ]
+            texts = [future.result() for future in futures]
+        for sample_usage in usages:
+            for name, count in sample_usage.items():
+                call_usage[name] = call_usage.get(name, 0) + count
+
+    if cache is not None and key is not None and all(texts):
+        if all(cacheable_response(text, response_json) for text in texts):
+            cache.put(key, json.dumps(texts, ensure_ascii=False), {"provider": provider, "model": model, "samples": samples})
+    return texts
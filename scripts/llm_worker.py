@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""Resident worker that runs the LLM CLI scripts in one warm process.
+
+``llm_worker.py serve`` listens on a Unix socket and runs each submitted
+job (a script name plus its argv) in a thread of its own. Provider
+clients, the response cache and the rate limiters are process-wide, so
+every job shares the same warm connections and one throttling budget.
+``run_search_llm.py``, ``run_forecast_llm.py`` and ``llm_call.py`` forward
+to the worker when it is listening and run inline otherwise, or when
+their working directory or LLM settings in the environment differ from
+the worker's. A job's
+output, including what helper threads running in a copy of its context
+print (sample calls, retry notices), goes back to the client; threads
+started without the job's context print to the worker's own streams.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextvars
+import hashlib
+import importlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import traceback
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, TextIO
+
+DEFAULT_SOCKET = ".cache/llm_worker.sock"
+SCRIPTS = ("run_search_llm", "run_forecast_llm", "llm_call")
+# Environment the jobs read: provider keys and base URLs, cache, retry,
+# timeout, pool and rate-limit settings (LLM_RPM_*, ...), forecast retries.
+ENV_PREFIXES = ("OPENAI_", "ANTHROPIC_", "GEMINI_", "GOOGLE_", "LLM_", "FORECAST_")
+ENV_KEYS = ("DEFAULT_TEMPERATURE",)
+# Which socket to use is the client's choice, not a job setting.
+ENV_IGNORED = ("LLM_WORKER_SOCKET",)
+
+
+def socket_path() -> str:
+    """``LLM_WORKER_SOCKET``, default ``.cache/llm_worker.sock``; empty disables forwarding."""
+    return os.environ.get("LLM_WORKER_SOCKET", DEFAULT_SOCKET)
+
+
+def environment_hash() -> str:
+    """Hash of the environment settings a job reads, after ``.env`` is applied.
+
+    The worker reads its environment once, so a job is only forwarded when
+    the caller's settings hash the same; otherwise it runs inline.
+    """
+    from llm_utils import load_dotenv
+
+    load_dotenv()
+    settings = {
+        key: value
+        for key, value in os.environ.items()
+        if (key.startswith(ENV_PREFIXES) or key in ENV_KEYS) and key not in ENV_IGNORED
+    }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def request(path: str, message: Dict[str, object]) -> Optional[Dict[str, object]]:
+    """Send one message and return the reply, or None when nothing is listening."""
+    try:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    except (AttributeError, OSError):  # pragma: no cover - no Unix sockets on this platform
+        return None
+    try:
+        conn.connect(path)
+    except OSError:
+        conn.close()
+        return None
+    with conn, conn.makefile("rwb") as stream:
+        stream.write(json.dumps(message).encode("utf-8") + b"\n")
+        stream.flush()
+        line = stream.readline()
+    return json.loads(line) if line else None
+
+
+def forward(script: str, argv: Optional[List[str]] = None) -> Optional[int]:
+    """Run ``script`` with ``argv`` on the worker; None means run it inline.
+
+    The worker resolves relative paths against its own working directory
+    and runs with its own environment, so jobs are only forwarded from the
+    same directory and with the same LLM settings (``environment_hash``).
+    """
+    path = socket_path()
+    if not path or not os.path.exists(path):
+        return None
+    args = sys.argv[1:] if argv is None else list(argv)
+    message = {"op": "run", "script": script, "argv": args, "cwd": os.getcwd(), "env": environment_hash()}
+    reply = request(path, message)
+    if reply is None or reply.get("rejected"):
+        return None
+    sys.stdout.write(str(reply.get("stdout", "")))
+    sys.stderr.write(str(reply.get("stderr", "")))
+    return int(reply.get("code", 1))  # type: ignore[arg-type]
+
+
+class ThreadOutput(io.TextIOBase):
+    """``sys.stdout``/``sys.stderr`` stand-in that gives each job its own buffer.
+
+    The buffer is held in a context variable, so pool threads that run in a
+    copy of the job's context, as ``call_provider_samples`` and
+    ``batch_runner`` do to carry the telemetry binding, write to it too.
+    """
+
+    def __init__(self, fallback: TextIO, name: str) -> None:
+        self.fallback = fallback
+        self.buffer: contextvars.ContextVar[Optional[io.StringIO]] = contextvars.ContextVar(name, default=None)
+
+    @contextmanager
+    def capture(self, buffer: io.StringIO) -> Iterator[None]:
+        token = self.buffer.set(buffer)
+        try:
+            yield
+        finally:
+            self.buffer.reset(token)
+
+    def write(self, text: str) -> int:
+        target = self.buffer.get() or self.fallback
+        return target.write(text)
+
+    def flush(self) -> None:
+        self.fallback.flush()
+
+
+class WorkerServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str) -> None:
+        self.mains = {name: importlib.import_module(name).main for name in SCRIPTS}
+        self.cwd = os.getcwd()
+        self.env = environment_hash()
+        self.stdout = ThreadOutput(sys.stdout, "llm_worker_stdout")
+        self.stderr = ThreadOutput(sys.stderr, "llm_worker_stderr")
+        self.jobs = 0
+        self.lock = threading.Lock()
+        super().__init__(path, WorkerHandler)
+
+    def run_job(self, script: str, argv: List[str]) -> Dict[str, object]:
+        out, err = io.StringIO(), io.StringIO()
+        try:
+            with self.stdout.capture(out), self.stderr.capture(err):
+                code = self.mains[script](argv)
+        except SystemExit as exc:
+            if isinstance(exc.code, int) or exc.code is None:
+                code = exc.code or 0
+            else:
+                err.write(f"{exc.code}\n")
+                code = 1
+        except Exception:  # noqa: BLE001 - report the job's failure, keep serving
+            err.write(traceback.format_exc())
+            code = 1
+        with self.lock:
+            self.jobs += 1
+        return {"code": code, "stdout": out.getvalue(), "stderr": err.getvalue()}
+
+
+class WorkerHandler(socketserver.StreamRequestHandler):
+    server: WorkerServer
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError:
+            self.reply({"rejected": "request is not JSON"})
+            return
+        op = message.get("op")
+        if op == "ping":
+            self.reply({"pid": os.getpid(), "cwd": self.server.cwd, "jobs": self.server.jobs})
+        elif op == "stop":
+            self.reply({"stopping": True})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        elif op != "run" or message.get("script") not in self.server.mains:
+            self.reply({"rejected": f"unknown job {message.get('op')!r}/{message.get('script')!r}"})
+        elif message.get("cwd") != self.server.cwd:
+            self.reply({"rejected": f"worker runs in {self.server.cwd}"})
+        elif message.get("env") != self.server.env:
+            self.reply({"rejected": "environment differs from the worker's"})
+        else:
+            self.reply(self.server.run_job(message["script"], [str(item) for item in message.get("argv") or []]))
+
+    def reply(self, payload: Dict[str, object]) -> None:
+        self.wfile.write(json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+def serve(path: str) -> int:
+    from llm_utils import close_clients, load_dotenv
+
+    if os.path.exists(path):
+        if request(path, {"op": "ping"}) is not None:
+            raise SystemExit(f"A worker is already listening on {path}.")
+        os.unlink(path)  # stale socket from a worker that did not shut down cleanly
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    load_dotenv()
+    server = WorkerServer(path)
+    sys.stdout, sys.stderr = server.stdout, server.stderr  # type: ignore[assignment]
+    print(f"LLM worker {os.getpid()} listening on {path} (cwd {server.cwd})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        close_clients()
+        if os.path.exists(path):
+            os.unlink(path)
+        sys.stdout, sys.stderr = server.stdout.fallback, server.stderr.fallback
+    print(f"LLM worker stopped after {server.jobs} job(s).", file=sys.stderr)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Resident worker for run_search_llm / run_forecast_llm / llm_call.")
+    parser.add_argument("command", choices=["serve", "status", "stop"])
+    parser.add_argument("--socket", default=None, help=f"Socket path. Default: LLM_WORKER_SOCKET or {DEFAULT_SOCKET}.")
+    args = parser.parse_args(argv)
+
+    path = args.socket or socket_path() or DEFAULT_SOCKET
+    if args.command == "serve":
+        return serve(path)
+    reply = request(path, {"op": "ping" if args.command == "status" else "stop"})
+    if reply is None:
+        print(f"No worker listening on {path}.")
+        return 1
+    if args.command == "status":
+        print(f"Worker {reply['pid']} on {path}: cwd {reply['cwd']}, {reply['jobs']} job(s) served.")
+    else:
+        print(f"Stopping worker on {path}.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""Adaptive per-provider/model rate limiting and retry with backoff."""
+
+from __future__ import annotations
+
+import email.utils
+import os
+import random
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# Multiplicative decrease on throttle, additive increase on success.
+THROTTLE_FACTOR = 0.5
+RECOVER_STEP = 0.05
+MIN_SCALE = 0.05
+
+
+def _env_number(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+class TokenBucket:
+    """Refills ``rate_per_minute`` units per minute up to one minute of burst."""
+
+    def __init__(self, rate_per_minute: float) -> None:
+        self.rate_per_minute = rate_per_minute
+        self.capacity = rate_per_minute
+        self.tokens = rate_per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now: float, scale: float) -> None:
+        rate = self.rate_per_minute * scale / 60.0
+        self.tokens = min(self.capacity * scale, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, scale: float) -> float:
+        if self.tokens >= amount:
+            return 0.0
+        rate = self.rate_per_minute * scale / 60.0
+        return (amount - self.tokens) / rate if rate > 0 else 1.0
+
+
+class AdaptiveRateLimiter:
+    """Requests/min and tokens/min buckets for one provider and model.
+
+    A throttle response halves the effective rate and pauses new requests
+    until any Retry-After has passed; each success restores a little of the
+    rate until it is back at the configured limit. A limit of 0 disables
+    that bucket.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float) -> None:
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.scale = 1.0
+        self.cooldown_until = 0.0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, token_estimate: int = 0) -> float:
+        """Block until a request fits both buckets; return seconds waited."""
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = max(0.0, self.cooldown_until - now)
+                if wait == 0.0:
+                    for bucket, amount in ((self.requests, 1), (self.tokens, token_estimate)):
+                        if bucket is None:
+                            continue
+                        bucket.refill(now, self.scale)
+                        # A request larger than the whole bucket is let through once full.
+                        needed = min(amount, bucket.capacity * self.scale)
+                        wait = max(wait, bucket.wait_time(needed, self.scale))
+                if wait == 0.0:
+                    if self.requests is not None:
+                        self.requests.tokens -= 1
+                    if self.tokens is not None:
+                        self.tokens.tokens -= token_estimate
+                    return time.monotonic() - started
+            time.sleep(min(wait, 5.0))
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.scale = min(1.0, self.scale + RECOVER_STEP)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            self.throttled += 1
+            self.scale = max(MIN_SCALE, self.scale * THROTTLE_FACTOR)
+            if retry_after:
+                self.cooldown_until = max(self.cooldown_until, time.monotonic() + retry_after)
+
+
+_limiters: Dict[Tuple[str, str], AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str, model: str) -> AdaptiveRateLimiter:
+    """Process-wide limiter for ``(provider, model)``.
+
+    Limits come from ``LLM_RPM_<PROVIDER>`` / ``LLM_TPM_<PROVIDER>``, falling
+    back to ``LLM_RPM`` (default 60) and ``LLM_TPM`` (default 0, unlimited).
+    """
+    key = (provider.lower(), model)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            suffix = provider.upper()
+            rpm = _env_number(f"LLM_RPM_{suffix}", _env_number("LLM_RPM", 60))
+            tpm = _env_number(f"LLM_TPM_{suffix}", _env_number("LLM_TPM", 0))
+            limiter = AdaptiveRateLimiter(rpm, tpm)
+            _limiters[key] = limiter
+    return limiter
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def error_status(exc: BaseException) -> Optional[int]:
+    for attr in ("status_code", "code", "status"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, parsed.timestamp() - time.time())
+
+
+def is_retryable(exc: BaseException) -> bool:
+    status = error_status(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    name = type(exc).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def call_with_retries(
+    fn: Callable[[], T],
+    limiter: AdaptiveRateLimiter,
+    token_estimate: int = 0,
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    label: str = "",
+    stats: Optional[Dict[str, float]] = None,
+) -> T:
+    """Call ``fn`` through ``limiter``, retrying throttles and transient errors.
+
+    Waits honor Retry-After when the provider sends it and otherwise use
+    full-jitter exponential backoff. If ``stats`` is given it receives the
+    number of retries and the total seconds spent waiting on the limiter.
+    """
+    attempt = 0
+    if stats is not None:
+        stats.setdefault("retries", 0)
+        stats.setdefault("limiter_wait_s", 0.0)
+    while True:
+        waited = limiter.acquire(token_estimate)
+        if stats is not None:
+            stats["limiter_wait_s"] += waited
+        try:
+            result = fn()
+        except Exception as exc:
+            if attempt >= max_retries or not is_retryable(exc):
+                raise
+            retry_after = retry_after_seconds(exc)
+            if error_status(exc) in (429, 529):
+                limiter.on_throttle(retry_after)
+            delay = retry_after if retry_after is not None else random.uniform(
+                0, min(max_delay, base_delay * (2 ** attempt))
+            )
+            attempt += 1
+            if stats is not None:
+                stats["retries"] = attempt
+            print(
+                f"Retrying {label or 'call'} in {delay:.1f}s "
+                f"({attempt}/{max_retries}): {type(exc).__name__}: {exc}",
+                file=sys.stderr,
+            )
+            time.sleep(delay)
+            continue
+        limiter.on_success()
+        return result
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""Content-addressed on-disk cache for LLM responses."""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+EVICT_EVERY_PUTS = 100
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cache_key(
+    provider: str,
+    model: str,
+    prompt: str,
+    system: Optional[str],
+    temperature: float,
+    response_json: bool,
+    enable_search_tool: bool,
+    max_tokens: int,
+) -> str:
+    """Hash every request field that can change the response."""
+    payload = {
+        "provider": provider.lower(),
+        "model": model,
+        "prompt_sha256": sha256_text(prompt),
+        "system": system or "",
+        "temperature": float(temperature),
+        "response_json": bool(response_json),
+        "enable_search_tool": bool(enable_search_tool),
+        "max_tokens": int(max_tokens),
+    }
+    return sha256_text(json.dumps(payload, sort_keys=True))
+
+
+class ResponseCache:
+    """Sharded response store: ``{root}/{key[:2]}/{key[2:4]}/{key}.json``.
+
+    Entries older than ``max_age_seconds`` are treated as misses; ``evict``
+    drops expired entries and then the oldest ones until the store fits in
+    ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: Optional[int] = None,
+        max_age_seconds: Optional[float] = None,
+    ) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key[:2] / key[2:4] / f"{key}.json"
+
+    def _expired(self, mtime: float, now: float) -> bool:
+        return self.max_age_seconds is not None and now - mtime > self.max_age_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        path = self.path_for(key)
+        try:
+            if self._expired(path.stat().st_mtime, time.time()):
+                raise FileNotFoundError(path)
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            response = entry["response"]
+        except (OSError, ValueError, KeyError, TypeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return response
+
+    def put(self, key: str, response: str, meta: Optional[Dict[str, object]] = None) -> None:
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {"key": key, "created_at": time.time(), "meta": meta or {}, "response": response}
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(entry, handle, ensure_ascii=False)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        with self._lock:
+            self.writes += 1
+            due = self.writes % EVICT_EVERY_PUTS == 0
+        if due and (self.max_bytes is not None or self.max_age_seconds is not None):
+            self.evict()
+
+    def discard(self, key: str) -> None:
+        """Drop one entry, e.g. a replayed response that no longer validates."""
+        self.path_for(key).unlink(missing_ok=True)
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        entries: List[Tuple[float, int, Path]] = []
+        if not self.root.exists():
+            return entries
+        for path in self.root.glob("??/??/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self) -> int:
+        """Remove expired entries, then oldest-first until under max_bytes."""
+        now = time.time()
+        removed = 0
+        kept: List[Tuple[float, int, Path]] = []
+        for mtime, size, path in self._entries():
+            if self._expired(mtime, now):
+                path.unlink(missing_ok=True)
+                removed += 1
+            else:
+                kept.append((mtime, size, path))
+        if self.max_bytes is not None:
+            total = sum(size for _, size, _ in kept)
+            for mtime, size, path in sorted(kept):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        entries = self._entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+        }
+
+
+_caches: Dict[str, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def open_cache(
+    root: Path,
+    max_bytes: Optional[int] = None,
+    max_age_seconds: Optional[float] = None,
+) -> ResponseCache:
+    """Return the process-wide cache for ``root`` so hit/miss counters are shared."""
+    key = str(Path(root).resolve())
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = ResponseCache(Path(root), max_bytes=max_bytes, max_age_seconds=max_age_seconds)
+            _caches[key] = cache
+    return cache
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Response cache directory (opt-in). Default: LLM_CACHE_DIR if set.",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the response cache.")
+    parser.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        help="Ignore cached responses and overwrite them with fresh calls.",
+    )
+
+
+def cache_from_args(args: argparse.Namespace) -> Optional[ResponseCache]:
+    cache_dir = args.cache_dir or os.environ.get("LLM_CACHE_DIR")
+    if args.no_cache or not cache_dir:
+        return None
+    max_mb = os.environ.get("LLM_CACHE_MAX_MB")
+    max_days = os.environ.get("LLM_CACHE_MAX_AGE_DAYS")
+    return open_cache(
+        Path(cache_dir),
+        max_bytes=int(float(max_mb) * 1024 * 1024) if max_mb else None,
+        max_age_seconds=float(max_days) * 86400 if max_days else None,
+    )
+
+
+def cache_argv(args: argparse.Namespace) -> List[str]:
+    """Re-emit the cache flags for a nested script invocation."""
+    argv: List[str] = []
+    if args.cache_dir:
+        argv += ["--cache-dir", args.cache_dir]
+    if args.no_cache:
+        argv.append("--no-cache")
+    if args.refresh_cache:
+        argv.append("--refresh-cache")
+    return argv
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect or evict the LLM response cache.")
+    parser.add_argument("command", choices=["stats", "evict"])
+    parser.add_argument("--cache-dir", default=os.environ.get("LLM_CACHE_DIR", ".cache/llm"))
+    parser.add_argument("--max-mb", type=float, default=None)
+    parser.add_argument("--max-age-days", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    cache = ResponseCache(
+        Path(args.cache_dir),
+        max_bytes=int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None,
+        max_age_seconds=args.max_age_days * 86400 if args.max_age_days is not None else None,
+    )
+    if args.command == "evict":
+        print(f"Evicted: {cache.evict()}")
+    stats = cache.stats()
+    print(f"Entries: {stats['entries']}")
+    print(f"Bytes: {stats['bytes']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""SQLite catalog of the runs under a runs directory, so tools select runs without walking them."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from forecast_store import condition_from_filename
+from run_manifest import MANIFEST_NAME
+
+CATALOG_NAME = ".catalog.sqlite"
+CATALOG_VERSION = 1
+STATUSES = ("running", "completed", "failed", "unknown")
+
+# Output folder of each stage, and the forecast stage of each condition.
+SEARCH_STAGES = {"search": "search_logs", "search_social": "search_logs_social"}
+TRACKS = {"search": "news", "search_social": "social"}
+CONDITION_STAGES = {
+    "no_prior": "forecast_no_prior",
+    "with_prior": "forecast_with_prior",
+    "with_prior_social": "forecast_with_prior_social",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    updated_at TEXT NOT NULL,
+    node_count INTEGER,
+    first_week TEXT,
+    last_week TEXT,
+    stage_files TEXT NOT NULL,
+    stage_invalid TEXT NOT NULL,
+    prompt_hashes TEXT NOT NULL,
+    baseline_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_status_started ON runs (status, started_at);
+CREATE TABLE IF NOT EXISTS facets (
+    run_id TEXT NOT NULL,
+    facet TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (run_id, facet, value)
+);
+CREATE INDEX IF NOT EXISTS facets_value ON facets (facet, value);
+"""
+
+FACETS = ("model", "track", "condition", "week")
+
+
+def iso_mtime(path: Path) -> Optional[str]:
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return None
+    return datetime.fromtimestamp(mtime, timezone.utc).isoformat(timespec="seconds")
+
+
+def read_manifest(run_dir: Path) -> Dict[str, object]:
+    try:
+        data = json.loads((run_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def scan_outputs(run_dir: Path) -> Tuple[Dict[str, int], Set[str], Set[str]]:
+    """({stage: files}, models, weeks) from the output folders of a run without a manifest."""
+    files: Dict[str, int] = {}
+    models: Set[str] = set()
+    weeks: Set[str] = set()
+    for stage, folder in SEARCH_STAGES.items():
+        for path in (run_dir / folder).glob("*/*.json"):
+            files[stage] = files.get(stage, 0) + 1
+            models.add(path.parent.name)
+            weeks.add(path.stem)
+    for path in (run_dir / "forecasts").glob("*/*.json"):
+        condition, week = condition_from_filename(path.name)
+        if condition is None or week is None:
+            continue
+        stage = CONDITION_STAGES[condition]
+        files[stage] = files.get(stage, 0) + 1
+        models.add(path.parent.name)
+        weeks.add(week)
+    return files, models, weeks
+
+
+def describe_run(run_dir: Path, manifest: Optional[Dict[str, object]] = None) -> Dict[str, object]:
+    """The catalog entry of a run, from its manifest when it has one.
+
+    A manifest's ``run`` block gives the status, times and plan; its nodes
+    give per-stage file counts and prompt-template hashes. Runs without a
+    manifest (or written by other tools) are described from their output
+    folders and have status ``unknown``.
+    """
+    run_dir = Path(run_dir)
+    manifest = read_manifest(run_dir) if manifest is None else manifest
+    run = manifest.get("run") if isinstance(manifest.get("run"), dict) else {}
+    nodes = manifest.get("nodes") if isinstance(manifest.get("nodes"), dict) else {}
+    stage_files: Dict[str, int] = {}
+    stage_invalid: Dict[str, int] = {}
+    prompt_hashes: Dict[str, Set[str]] = {}
+    baseline_hashes: Set[str] = set()
+    models: Set[str] = set(run.get("models") or [])  # type: ignore[union-attr]
+    weeks: Set[str] = set(run.get("weeks") or [])  # type: ignore[union-attr]
+    completed: List[str] = []
+    if nodes:
+        for key, entry in nodes.items():  # type: ignore[union-attr]
+            stage, _, rest = str(key).partition(":")
+            model, _, week = rest.rpartition(":")
+            models.add(model)
+            weeks.add(week)
+            stage_files[stage] = stage_files.get(stage, 0) + 1
+            if not entry.get("valid"):
+                stage_invalid[stage] = stage_invalid.get(stage, 0) + 1
+            inputs = entry.get("inputs") or {}
+            if inputs.get("prompt_template"):
+                prompt_hashes.setdefault(stage, set()).add(str(inputs["prompt_template"]))
+            if inputs.get("baseline"):
+                baseline_hashes.add(str(inputs["baseline"]))
+            if entry.get("completed_at"):
+                completed.append(str(entry["completed_at"]))
+    else:
+        stage_files, scanned_models, scanned_weeks = scan_outputs(run_dir)
+        models |= scanned_models
+        weeks |= scanned_weeks
+    stages = set(stage_files)
+    tracks = {TRACKS[stage] for stage in stages if stage in TRACKS}
+    if run.get("models"):  # planned runs always search news; social only with --social
+        tracks.add("news")
+    if run.get("social"):
+        tracks.add("social")
+    conditions = {condition for condition, stage in CONDITION_STAGES.items() if stage in stages}
+    ordered_weeks = sorted(week for week in weeks if week)
+    return {
+        "run_id": run_dir.name,
+        "status": run.get("status") or "unknown",
+        "started_at": run.get("started_at") or (min(completed) if completed else iso_mtime(run_dir)),
+        "finished_at": run.get("finished_at") or (max(completed) if completed and not run else None),
+        "node_count": run.get("node_count") or sum(stage_files.values()),
+        "first_week": ordered_weeks[0] if ordered_weeks else None,
+        "last_week": ordered_weeks[-1] if ordered_weeks else None,
+        "stage_files": dict(sorted(stage_files.items())),
+        "stage_invalid": dict(sorted(stage_invalid.items())),
+        "prompt_hashes": {stage: sorted(hashes) for stage, hashes in sorted(prompt_hashes.items())},
+        "baseline_hash": sorted(baseline_hashes)[-1] if baseline_hashes else None,
+        "model": sorted(model for model in models if model),
+        "track": sorted(tracks),
+        "condition": sorted(conditions),
+        "week": ordered_weeks,
+    }
+
+
+class RunCatalog:
+    """``{runs_dir}/.catalog.sqlite``: one row per run, plus its models, tracks, conditions and weeks.
+
+    Runs written by ``run_pipeline.py`` or ``batch_runner.py`` are updated
+    from their manifest on every node they complete. ``sync`` lists the
+    runs directory (without entering any run) to add runs the catalog has
+    not seen and drop ones that were deleted.
+    """
+
+    def __init__(self, runs_dir: Path) -> None:
+        self.runs_dir = Path(runs_dir)
+        self.path = self.runs_dir / CATALOG_NAME
+        self.runs_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        version = self._version()
+        if version is not None and version != CATALOG_VERSION:
+            self.conn.executescript("DROP TABLE IF EXISTS runs; DROP TABLE IF EXISTS facets;")
+        self.conn.executescript(SCHEMA)
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(CATALOG_VERSION),))
+        self.conn.commit()
+
+    def _version(self) -> Optional[int]:
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return int(row[0]) if row else None
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def put(self, entry: Dict[str, object]) -> None:
+        run_id = entry["run_id"]
+        with self._lock:
+            self.conn.execute("DELETE FROM facets WHERE run_id = ?", (run_id,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run_id,
+                    entry["status"],
+                    entry["started_at"],
+                    entry["finished_at"],
+                    datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    entry["node_count"],
+                    entry["first_week"],
+                    entry["last_week"],
+                    json.dumps(entry["stage_files"]),
+                    json.dumps(entry["stage_invalid"]),
+                    json.dumps(entry["prompt_hashes"]),
+                    entry["baseline_hash"],
+                ),
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO facets VALUES (?, ?, ?)",
+                [(run_id, facet, value) for facet in FACETS for value in entry[facet]],  # type: ignore[attr-defined]
+            )
+            self.conn.commit()
+
+    def record(self, run_dir: Path, manifest: Optional[Dict[str, object]] = None) -> None:
+        """Re-describe one run; pass the manifest payload to skip reading it back."""
+        self.put(describe_run(run_dir, manifest))
+
+    def remove(self, run_ids: Iterable[str]) -> None:
+        with self._lock:
+            for run_id in run_ids:
+                self.conn.execute("DELETE FROM facets WHERE run_id = ?", (run_id,))
+                self.conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+            self.conn.commit()
+
+    def run_ids(self) -> Set[str]:
+        with self._lock:
+            return {row[0] for row in self.conn.execute("SELECT run_id FROM runs")}
+
+    def sync(self, rescan: bool = False) -> Tuple[int, int]:
+        """Catalog new run directories and drop vanished ones; return (added, dropped).
+
+        With ``rescan`` every run is described again, e.g. after runs were
+        copied in or edited by hand.
+        """
+        listed = {
+            entry.name
+            for entry in os.scandir(self.runs_dir)
+            if entry.is_dir() and not entry.name.startswith(".")
+        }
+        known = self.run_ids()
+        added = listed if rescan else listed - known
+        for run_id in sorted(added):
+            self.record(self.runs_dir / run_id)
+        dropped = known - listed
+        self.remove(dropped)
+        return len(added), len(dropped)
+
+    def select(
+        self,
+        status: Optional[Sequence[str]] = None,
+        models: Sequence[str] = (),
+        tracks: Sequence[str] = (),
+        conditions: Sequence[str] = (),
+        weeks: Sequence[str] = (),
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> List[Dict[str, object]]:
+        """Runs matching every filter, oldest first.
+
+        ``models`` are glob patterns (``gemini*``); a run matches when it has
+        at least one model matching each pattern, and every given track,
+        condition and week. ``since``/``until`` bound ``started_at``
+        (ISO dates or timestamps, UTC).
+        """
+        where: List[str] = []
+        params: List[object] = []
+        if status:
+            where.append(f"status IN ({','.join('?' * len(status))})")
+            params.extend(status)
+        if since:
+            where.append("started_at >= ?")
+            params.append(since)
+        if until:
+            where.append("started_at < ?")
+            params.append(until)
+        for facet, values, op in (
+            ("model", models, "GLOB"),
+            ("track", tracks, "="),
+            ("condition", conditions, "="),
+            ("week", weeks, "="),
+        ):
+            for value in values:
+                where.append(f"run_id IN (SELECT run_id FROM facets WHERE facet = ? AND value {op} ?)")
+                params.extend([facet, value])
+        query = "SELECT * FROM runs" + (f" WHERE {' AND '.join(where)}" if where else "")
+        query += " ORDER BY started_at, run_id"
+        with self._lock:
+            cursor = self.conn.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor]
+            for row in rows:
+                for key in ("stage_files", "stage_invalid", "prompt_hashes"):
+                    row[key] = json.loads(row[key])
+                for facet in FACETS:
+                    row[facet] = [
+                        value
+                        for (value,) in self.conn.execute(
+                            "SELECT value FROM facets WHERE run_id = ? AND facet = ? ORDER BY value",
+                            (row["run_id"], facet),
+                        )
+                    ]
+        return rows
+
+
+_catalogs: Dict[str, RunCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def open_catalog(runs_dir: Path) -> RunCatalog:
+    """Return the process-wide catalog for ``runs_dir`` so writers share one connection."""
+    key = str(Path(runs_dir).resolve())
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = RunCatalog(Path(runs_dir))
+            _catalogs[key] = catalog
+    return catalog
+
+
+def catalog_listener(run_dir: Path) -> Callable[[Path, Dict[str, object]], None]:
+    """``RunManifest(on_change=...)`` callback that keeps the run's catalog entry current."""
+    return open_catalog(Path(run_dir).parent).record
+
+
+def add_filter_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--status", action="append", choices=STATUSES, help="Run status (repeatable).")
+    parser.add_argument("--with-model", action="append", default=[], help="Model glob, e.g. 'gemini*' (repeatable).")
+    parser.add_argument("--track", action="append", default=[], choices=sorted(TRACKS.values()))
+    parser.add_argument("--condition", action="append", default=[], choices=sorted(CONDITION_STAGES))
+    parser.add_argument("--week", action="append", default=[], help="Week start the run covers (repeatable).")
+    parser.add_argument("--since", default=None, help="Runs started on or after this date (UTC).")
+    parser.add_argument("--until", default=None, help="Runs started before this date (UTC).")
+
+
+def filters_from_args(args: argparse.Namespace) -> Dict[str, object]:
+    return {
+        "status": args.status,
+        "models": args.with_model,
+        "tracks": args.track,
+        "conditions": args.condition,
+        "weeks": args.week,
+        "since": args.since,
+        "until": args.until,
+    }
+
+
+def select_runs(runs_dir: Path, **filters: object) -> List[Path]:
+    """Run directories under ``runs_dir`` matching ``filters`` (see ``RunCatalog.select``)."""
+    if not Path(runs_dir).is_dir():
+        return []
+    catalog = open_catalog(runs_dir)
+    catalog.sync()
+    return [Path(runs_dir) / str(row["run_id"]) for row in catalog.select(**filters)]  # type: ignore[arg-type]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=f"Catalog the runs of a runs directory in {{runs_dir}}/{CATALOG_NAME}.")
+    parser.add_argument("command", choices=["list", "update"], help="update: re-describe every run; list: filter runs.")
+    parser.add_argument("--runs-dir", default="data/runs", help="Root directory of runs.")
+    parser.add_argument("--json", action="store_true", help="list: print one JSON object per run.")
+    add_filter_arguments(parser)
+    args = parser.parse_args(argv)
+
+    runs_dir = Path(args.runs_dir)
+    if not runs_dir.is_dir():
+        raise SystemExit(f"Runs directory not found: {runs_dir}")
+    catalog = open_catalog(runs_dir)
+    if args.command == "update":
+        added, dropped = catalog.sync(rescan=True)
+        print(f"Cataloged {added} run(s) in {catalog.path} (dropped: {dropped})")
+        return 0
+    catalog.sync()
+    for row in catalog.select(**filters_from_args(args)):  # type: ignore[arg-type]
+        if args.json:
+            print(json.dumps(row, ensure_ascii=False))
+            continue
+        files = ", ".join(f"{stage} {count}" for stage, count in row["stage_files"].items())  # type: ignore[attr-defined]
+        print(
+            f"{row['run_id']:<28} {row['status']:<9} {row['started_at'] or '-':<25} "
+            f"{row['first_week'] or '-'}..{row['last_week'] or '-'}  {','.join(row['model'])}  [{files}]"  # type: ignore[arg-type]
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,9 +3,28 @@
 
 import argparse
 import json
+import sys
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
 
-from llm_utils import call_provider, env_float, env_int, load_dotenv, render_template
+from compact_evidence import DEFAULT_TOKEN_BUDGET, compact_prior, compact_search_log
+from forecast_repair import RepairError, repair_response
+from forecast_samples import DEFAULT_INTERVAL, aggregate_samples, parse_samples
+from json_stream import StreamAborted, add_stream_arguments, stream_from_args
+from llm_utils import (
+    NATIVE_SAMPLERS,
+    atomic_write_text,
+    call_provider,
+    call_provider_samples,
+    env_float,
+    env_int,
+    format_usage,
+    load_dotenv,
+    render_template,
+)
+from llm_worker import forward
+from response_cache import add_cache_arguments, cache_from_args
+from telemetry import add_telemetry_arguments, bind, ledger_from_args
 
 
 def load_text(path: Path) -> str:
@@ -16,7 +35,7 @@ def load_json(path: Path) -> dict:
     return json.loads(path.read_text(encoding="utf-8"))
 
 
-def main() -> int:
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Run weekly forecast prompt via LLM.")
     parser.add_argument("--provider", required=True, choices=["openai", "anthropic", "gemini"])
     parser.add_argument("--model", required=True)
@@ -34,17 +53,54 @@ def main() -> int:
     parser.add_argument("--temperature", type=float, default=0.0)
     parser.add_argument("--max-tokens", type=int, default=2048)
     parser.add_argument("--timeout", type=int, default=60)
+    add_cache_arguments(parser)
+    add_stream_arguments(parser)
+    add_telemetry_arguments(parser)
+    parser.add_argument(
+        "--compact-evidence",
+        action="store_true",
+        help="Dedupe/trim the search log to --evidence-token-budget and reduce the prior to its seat maps.",
+    )
+    parser.add_argument("--evidence-token-budget", type=int, default=DEFAULT_TOKEN_BUDGET)
     parser.add_argument("--allow-non-json", action="store_true")
-    args = parser.parse_args()
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=1,
+        help="Completions to sample and aggregate into a median forecast (use with --temperature > 0).",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=DEFAULT_INTERVAL,
+        help="Width of the per-party intervals stored with --samples, e.g. 0.8 for the 10th-90th percentile.",
+    )
+    parser.add_argument(
+        "--max-llm-retries",
+        type=int,
+        default=None,
+        help="Fresh LLM calls allowed when an answer cannot be repaired locally. Default: env FORECAST_MAX_LLM_RETRIES or 1.",
+    )
+    return parser.parse_args(argv)
 
-    load_dotenv()
 
+def build_request(args: argparse.Namespace) -> Dict[str, object]:
+    """Render the prompt and return the call_provider arguments for it."""
     search_log = load_json(Path(args.search_log))
+    if args.compact_evidence:
+        search_log, stats = compact_search_log(search_log, args.evidence_token_budget)
+        print(
+            f"Evidence tokens: {stats['input_tokens']} -> {stats['output_tokens']} "
+            f"(sources {stats['sources_in']} -> {stats['sources_out']})",
+            file=sys.stderr,
+        )
 
     if args.condition == "with_prior":
         if not args.prior:
             raise SystemExit("--prior is required for with_prior.")
         prior_json = load_json(Path(args.prior))
+        if args.compact_evidence:
+            prior_json = compact_prior(prior_json)
         prompt_path = Path(args.prompt_with_prior)
         variables = {
             "week_start": args.week_start,
@@ -74,30 +130,150 @@ def main() -> int:
     if args.timeout == 60:
         args.timeout = env_int("LLM_TIMEOUT", args.timeout)
 
-    response = call_provider(
-        args.provider,
-        rendered,
-        args.model,
-        response_json=args.response_json,
-        temperature=args.temperature,
-        max_tokens=args.max_tokens,
-        timeout=args.timeout,
+    return {
+        "provider": args.provider,
+        "prompt": rendered,
+        "model": args.model,
+        "system": None,
+        "response_json": args.response_json,
+        "enable_search_tool": False,
+        "temperature": args.temperature,
+        "max_tokens": args.max_tokens,
+        "timeout": args.timeout,
+    }
+
+
+def prior_total(args: argparse.Namespace) -> Optional[Dict[str, int]]:
+    """The prior's seat totals, used to recompute ``delta_from_prior_total``."""
+    if args.condition != "with_prior" or not args.prior:
+        return None
+    try:
+        total = load_json(Path(args.prior)).get("forecast_total")
+    except (OSError, json.JSONDecodeError, AttributeError):
+        return None
+    if not isinstance(total, dict) or not all(isinstance(seats, int) for seats in total.values()):
+        return None
+    return total
+
+
+def parse_samples_response(args: argparse.Namespace, texts: List[str]) -> Tuple[Dict[str, object], List[str]]:
+    """The median forecast of the sampled ``texts``, with the samples stored alongside it."""
+    prior = prior_total(args)
+    samples, rejected = parse_samples(texts, prior, (args.week_start, args.week_end))
+    needed = (len(texts) + 1) // 2
+    if len(samples) < needed:
+        raise RepairError(f"only {len(samples)} of {len(texts)} samples are usable, need {needed}")
+    data = aggregate_samples(samples, prior, args.interval)
+    data["sampling"].update(  # type: ignore[union-attr]
+        samples_requested=len(texts),
+        method="native" if args.provider in NATIVE_SAMPLERS else "concurrent",
+        rejected=rejected,
     )
+    data["samples"] = samples
+    return data, [f"Rejected {reason}" for reason in rejected]
 
+
+def parse_response(args: argparse.Namespace, response: Union[str, List[str]]) -> Tuple[Dict[str, object], List[str]]:
+    """The forecast in ``response``, repaired locally if needed, and notes on what was done.
+
+    A list of responses comes from ``--samples`` and is aggregated. Raises
+    ``RepairError`` when the answer is unusable.
+    """
+    if isinstance(response, list):
+        return parse_samples_response(args, response)
+    data, repairs = repair_response(response, prior_total(args), (args.week_start, args.week_end))
+    return data, [f"Repaired: {repair}" for repair in repairs]
+
+
+def write_response(args: argparse.Namespace, response: Union[str, List[str]]) -> int:
     out_path = Path(args.out)
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
     try:
-        data = json.loads(response)
-    except json.JSONDecodeError:
+        data, notes = parse_response(args, response)
+    except RepairError as exc:
         if not args.allow_non_json:
-            raise SystemExit("Model response is not valid JSON. Re-run or pass --allow-non-json.")
-        out_path.write_text(response, encoding="utf-8")
+            raise SystemExit(f"Model response is not a usable forecast ({exc}). Re-run or pass --allow-non-json.")
+        raw = response if isinstance(response, str) else json.dumps(response, indent=2, ensure_ascii=False) + "\n"
+        atomic_write_text(out_path, raw)
         return 0
 
-    out_path.write_text(json.dumps(data, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    for note in notes:
+        print(note, file=sys.stderr)
+    atomic_write_text(out_path, json.dumps(data, indent=2, ensure_ascii=False) + "\n")
     return 0
 
 
+def main(argv: Optional[List[str]] = None) -> int:
+    if argv is None:
+        forwarded = forward("run_forecast_llm")
+        if forwarded is not None:
+            return forwarded
+    args = parse_args(argv)
+    load_dotenv()
+    request = build_request(args)
+
+    cache = cache_from_args(args)
+    usage: Dict[str, int] = {}
+    stream = stream_from_args(args, "forecast")
+    if args.samples < 1 or not 0 < args.interval < 1:
+        raise SystemExit("--samples must be at least 1 and --interval between 0 and 1.")
+    if args.samples > 1:
+        if stream is not None:
+            raise SystemExit("--stream cannot be combined with --samples.")
+        if not request["temperature"]:
+            print("Warning: --samples at temperature 0 will give near-identical samples.", file=sys.stderr)
+    refresh_cache = args.refresh_cache
+    if args.max_llm_retries is None:
+        args.max_llm_retries = env_int("FORECAST_MAX_LLM_RETRIES", 1)
+    retries = max(0, args.max_llm_retries)
+    # Answers that repair_response can fix are kept; only unusable ones cost
+    # another call, at most ``retries`` times.
+    for attempt in range(retries + 1):
+        last = attempt == retries
+        try:
+            with bind(ledger=ledger_from_args(args), stage=f"forecast_{args.condition}", week_start=args.week_start, condition=args.condition):
+                if args.samples > 1:
+                    response = call_provider_samples(
+                        **request,
+                        samples=args.samples,
+                        cache=cache,
+                        refresh_cache=refresh_cache,
+                        usage=usage,
+                    )
+                else:
+                    response = call_provider(
+                        **request,
+                        cache=cache,
+                        refresh_cache=refresh_cache,
+                        usage=usage,
+                        stream=stream,
+                    )
+        except StreamAborted as exc:
+            if last:
+                raise SystemExit(f"Aborted streamed response after {len(exc.text)} chars: {exc.reason}")
+            print(f"Aborted streamed response ({exc.reason}); retrying ({attempt + 1}/{retries}).", file=sys.stderr)
+            refresh_cache = True
+            continue
+        if last or args.allow_non_json:
+            break
+        try:
+            parse_response(args, response)
+        except RepairError as exc:
+            print(f"Unrepairable response ({exc}); retrying ({attempt + 1}/{retries}).", file=sys.stderr)
+            # A cached bad answer would come straight back, so bypass the cache.
+            refresh_cache = True
+            continue
+        break
+    if stream is not None and stream.first_token_at is not None:
+        print(stream.summary(), file=sys.stderr)
+    if usage:
+        print(format_usage(usage), file=sys.stderr)
+    if cache is not None:
+        print(f"Response cache totals: {cache.hits} hit(s), {cache.misses} miss(es)", file=sys.stderr)
+
+    return write_response(args, response)
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
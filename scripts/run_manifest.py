@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Per-run manifest of completed stages, used to resume runs incrementally."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from llm_utils import atomic_write_text
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def sha256_file(path: Path) -> Optional[str]:
+    try:
+        with path.open("rb") as handle:
+            return hashlib.sha256(handle.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def sha256_json(value: object) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class RunManifest:
+    """``data/runs/{run_id}/manifest.json``: one entry per completed node.
+
+    Each entry records the hashes of the node's inputs (parameters, prompt
+    template, search log, prior, baseline), the hash of the output it wrote
+    and whether that output validated. A node is fresh when all of these
+    still match what is on disk.
+
+    The ``run`` block describes the run as a whole: when it started and
+    finished, its status and the models, weeks and tracks it was planned
+    with. ``on_change(run_dir, payload)`` is called after every save.
+    """
+
+    def __init__(self, run_dir: Path, on_change: Optional[Callable[[Path, Dict[str, object]], None]] = None) -> None:
+        self.run_dir = Path(run_dir)
+        self.path = self.run_dir / MANIFEST_NAME
+        self.on_change = on_change
+        self._lock = threading.Lock()
+        self.nodes: Dict[str, Dict[str, object]] = {}
+        self.run: Dict[str, object] = {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                self.nodes = dict(data.get("nodes", {}))
+                self.run = dict(data.get("run", {}))
+            except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
+                self.nodes, self.run = {}, {}
+
+    def get(self, node_id: str) -> Optional[Dict[str, object]]:
+        with self._lock:
+            entry = self.nodes.get(node_id)
+            return dict(entry) if entry else None
+
+    def record(
+        self,
+        node_id: str,
+        stage: str,
+        out: Path,
+        inputs: Dict[str, Optional[str]],
+        valid: bool,
+        errors: Optional[List[str]] = None,
+    ) -> Dict[str, object]:
+        entry: Dict[str, object] = {
+            "stage": stage,
+            "out": str(out),
+            "inputs": inputs,
+            "output_sha256": sha256_file(out),
+            "valid": valid,
+            "errors": errors or [],
+            "completed_at": now_iso(),
+        }
+        with self._lock:
+            self.nodes[node_id] = entry
+            self._save()
+        return entry
+
+    def start(self, models: List[str], weeks: List[str], social: bool, node_count: int) -> None:
+        """Mark the run as running; a resumed run keeps its first ``started_at``."""
+        with self._lock:
+            self.run.update(
+                {
+                    "status": "running",
+                    "started_at": self.run.get("started_at") or now_iso(),
+                    "finished_at": None,
+                    "models": sorted(models),
+                    "weeks": sorted(weeks),
+                    "social": social,
+                    "node_count": node_count,
+                }
+            )
+            self._save()
+
+    def finish(self, status: str) -> None:
+        with self._lock:
+            self.run.update({"status": status, "finished_at": now_iso()})
+            self._save()
+
+    def is_fresh(self, node_id: str, out: Path, inputs: Dict[str, Optional[str]]) -> bool:
+        entry = self.get(node_id)
+        if not entry or not entry.get("valid"):
+            return False
+        if entry.get("inputs") != inputs:
+            return False
+        return entry.get("output_sha256") is not None and sha256_file(out) == entry["output_sha256"]
+
+    def _payload(self) -> Dict[str, object]:
+        payload: Dict[str, object] = {"version": MANIFEST_VERSION, "nodes": dict(self.nodes)}
+        if self.run:
+            payload["run"] = dict(self.run)
+        return payload
+
+    def _save(self) -> None:
+        payload = self._payload()
+        atomic_write_text(self.path, json.dumps(payload, indent=2, sort_keys=True, ensure_ascii=False) + "\n")
+        if self.on_change is not None:
+            self.on_change(self.run_dir, payload)
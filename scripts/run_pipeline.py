@@ -0,0 +1,590 @@
+#!/usr/bin/env python3
+"""Run search and forecast stages for every week and model as a dependency graph."""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import analyze_search_logs
+import run_forecast_llm
+import run_search_llm
+from forecast_store import add_store_arguments, require_engine, upsert_forecast
+from llm_utils import close_clients, configure_client_pool, load_dotenv
+from response_cache import add_cache_arguments, cache_argv, cache_from_args
+from run_catalog import catalog_listener
+from run_manifest import RunManifest, sha256_file, sha256_json
+from schema_validator import validate_path
+from source_index import DEFAULT_INDEX, SourceIndex, update_index
+from summarize_telemetry import total_cost
+from telemetry import LEDGER_NAME, TelemetryLedger, bind, open_ledger, read_ledger
+
+# Mirrors the model -> provider/search-tool table that run.sh used.
+MODEL_PROVIDERS: Dict[str, Tuple[str, bool]] = {
+    "gpt-5.2": ("openai", True),
+    "gemini-3-pro-preview": ("gemini", True),
+    "claude-opus-4.5": ("anthropic", False),
+    "gpt-5-mini": ("openai", False),
+}
+
+DEFAULT_MODELS = ["gpt-5.2", "gemini-3-pro-preview"]
+
+SEARCH_PROMPT = Path("prompts/search_prompt.md")
+SEARCH_PROMPT_SOCIAL = Path("prompts/search_prompt_social.md")
+FORECAST_PROMPTS = {
+    "with_prior": Path("prompts/forecast_prompt_with_prior.md"),
+    "no_prior": Path("prompts/forecast_prompt_no_prior.md"),
+}
+BASELINE = Path("data/priors/seed_2023_reference.json")
+
+STAGE_ORDER = {
+    "search": 0,
+    "search_social": 1,
+    "forecast_with_prior": 2,
+    "forecast_with_prior_social": 3,
+    "forecast_no_prior": 4,
+}
+
+SCRIPT_MAINS: Dict[str, Callable[[Optional[List[str]]], int]] = {
+    "run_search_llm": run_search_llm.main,
+    "run_forecast_llm": run_forecast_llm.main,
+}
+
+_print_lock = threading.Lock()
+
+
+@dataclass
+class Node:
+    node_id: str
+    stage: str
+    model: str
+    provider: str
+    week_index: int
+    week_start: str
+    week_end: str
+    script: str
+    argv: List[str]
+    out: Path
+    deps: List[str] = field(default_factory=list)
+    prior_candidates: List[Path] = field(default_factory=list)
+    inputs: Dict[str, Path] = field(default_factory=dict)
+    passthrough: List[str] = field(default_factory=list)
+    ready_at: float = 0.0
+
+    def priority(self) -> Tuple[int, int, str]:
+        return (self.week_index, STAGE_ORDER.get(self.stage, 9), self.model)
+
+    def label(self) -> str:
+        return f"{self.stage} {self.model} {self.week_start}"
+
+
+def log(message: str) -> None:
+    with _print_lock:
+        print(message, flush=True)
+
+
+def read_weeks(path: Path) -> List[Tuple[int, str, str]]:
+    with path.open("r", encoding="utf-8") as handle:
+        reader = csv.DictReader(handle)
+        return [
+            (int(row["week_index"]), row["week_start"], row["week_end"])
+            for row in reader
+            if row.get("week_start")
+        ]
+
+
+def node_id(stage: str, model: str, week_start: str) -> str:
+    return f"{stage}:{model}:{week_start}"
+
+
+def build_graph(
+    run_dir: Path,
+    weeks: List[Tuple[int, str, str]],
+    models: List[str],
+    enable_social_search: bool = False,
+    extra_argv: Optional[List[str]] = None,
+    forecast_argv: Optional[List[str]] = None,
+) -> Dict[str, Node]:
+    """Build the search -> forecast graph for every week and model.
+
+    Searches and no_prior forecasts only depend on their own week, so they
+    can all run at once; with_prior forecasts chain on the previous week's
+    forecast for the same model.
+    """
+    nodes: Dict[str, Node] = {}
+
+    def add(node: Node) -> None:
+        nodes[node.node_id] = node
+
+    for model in models:
+        provider, search_tool = MODEL_PROVIDERS[model]
+        search_flag = ["--enable-search-tool"] if search_tool else []
+        prev_week: Optional[str] = None
+
+        for week_index, week_start, week_end in weeks:
+            common = [
+                "--provider", provider,
+                "--model", model,
+                "--week-start", week_start,
+                "--week-end", week_end,
+            ]
+
+            def make(
+                stage: str,
+                script: str,
+                extra: List[str],
+                out: Path,
+                inputs: Dict[str, Path],
+                deps: Optional[List[str]] = None,
+                prior_candidates: Optional[List[Tuple[str, Path]]] = None,
+            ) -> None:
+                if script == "run_forecast_llm":
+                    extra = extra + list(forecast_argv or [])
+                candidates = prior_candidates or []
+                dep_ids = list(deps or [])
+                # Depend on the first candidate prior this graph will produce;
+                # the concrete file is picked when the node runs.
+                for candidate_id, _ in candidates:
+                    if candidate_id in nodes:
+                        dep_ids.append(candidate_id)
+                        break
+                add(Node(
+                    node_id=node_id(stage, model, week_start),
+                    stage=stage,
+                    model=model,
+                    provider=provider,
+                    week_index=week_index,
+                    week_start=week_start,
+                    week_end=week_end,
+                    script=script,
+                    argv=common + extra + ["--out", str(out), "--response-json"],
+                    out=out,
+                    deps=dep_ids,
+                    prior_candidates=[path for _, path in candidates],
+                    inputs=inputs,
+                    passthrough=list(extra_argv or []),
+                ))
+
+            search_log = run_dir / "search_logs" / model / f"{week_start}.json"
+            make("search", "run_search_llm", search_flag, search_log, {"prompt_template": SEARCH_PROMPT})
+
+            search_log_social = run_dir / "search_logs_social" / model / f"{week_start}.json"
+            if enable_social_search:
+                make(
+                    "search_social",
+                    "run_search_llm",
+                    ["--prompt-file", str(SEARCH_PROMPT_SOCIAL)] + search_flag,
+                    search_log_social,
+                    {"prompt_template": SEARCH_PROMPT_SOCIAL},
+                )
+
+            forecast_dir = run_dir / "forecasts" / model
+            make(
+                "forecast_no_prior",
+                "run_forecast_llm",
+                ["--condition", "no_prior", "--search-log", str(search_log)],
+                forecast_dir / f"{week_start}.no_prior.json",
+                {
+                    "prompt_template": FORECAST_PROMPTS["no_prior"],
+                    "search_log": search_log,
+                    "baseline": BASELINE,
+                },
+                deps=[node_id("search", model, week_start)],
+            )
+
+            if prev_week is not None:
+                prior_with = (
+                    node_id("forecast_with_prior", model, prev_week),
+                    forecast_dir / f"{prev_week}.json",
+                )
+                prior_no = (
+                    node_id("forecast_no_prior", model, prev_week),
+                    forecast_dir / f"{prev_week}.no_prior.json",
+                )
+                make(
+                    "forecast_with_prior",
+                    "run_forecast_llm",
+                    ["--condition", "with_prior", "--search-log", str(search_log)],
+                    forecast_dir / f"{week_start}.json",
+                    {"prompt_template": FORECAST_PROMPTS["with_prior"], "search_log": search_log},
+                    deps=[node_id("search", model, week_start)],
+                    prior_candidates=[prior_with, prior_no],
+                )
+
+                if enable_social_search:
+                    prior_social = (
+                        node_id("forecast_with_prior_social", model, prev_week),
+                        forecast_dir / f"{prev_week}.with_prior_social.json",
+                    )
+                    make(
+                        "forecast_with_prior_social",
+                        "run_forecast_llm",
+                        ["--condition", "with_prior", "--search-log", str(search_log_social)],
+                        forecast_dir / f"{week_start}.with_prior_social.json",
+                        {"prompt_template": FORECAST_PROMPTS["with_prior"], "search_log": search_log_social},
+                        deps=[node_id("search_social", model, week_start)],
+                        prior_candidates=[prior_social, prior_with, prior_no],
+                    )
+
+            prev_week = week_start
+
+    return nodes
+
+
+def pick_prior(node: Node) -> Optional[Path]:
+    return next((path for path in node.prior_candidates if path.exists()), None)
+
+
+def node_argv(node: Node) -> Optional[List[str]]:
+    argv = list(node.argv)
+    if node.prior_candidates:
+        prior = pick_prior(node)
+        if prior is None:
+            return None
+        argv += ["--prior", str(prior)]
+    return argv + node.passthrough
+
+
+def node_input_hashes(node: Node) -> Dict[str, Optional[str]]:
+    """Hash everything a node reads; a change in any of these makes it stale."""
+    hashes: Dict[str, Optional[str]] = {"params": sha256_json(node.argv)}
+    for name, path in sorted(node.inputs.items()):
+        hashes[name] = sha256_file(path)
+    if node.prior_candidates:
+        prior = pick_prior(node)
+        hashes["prior"] = sha256_file(prior) if prior else None
+        hashes["prior_path"] = str(prior) if prior else None
+    return hashes
+
+
+def validate_output(node: Node) -> List[str]:
+    if not node.out.exists():
+        return ["Output file was not written."]
+    kind = "forecast" if node.script == "run_forecast_llm" else "search_log"
+    return list(validate_path(node.out, kind)["errors"])  # type: ignore[arg-type]
+
+
+def run_node(node: Node) -> bool:
+    argv = node_argv(node)
+    if argv is None:
+        log(f"  Skipped {node.label()}: no prior file.")
+        return False
+    started = time.monotonic()
+    try:
+        code = SCRIPT_MAINS[node.script](argv)
+    except SystemExit as exc:
+        code = exc.code if isinstance(exc.code, int) else 1
+        if exc.code and not isinstance(exc.code, int):
+            log(f"  Failed {node.label()}: {exc.code}")
+    except Exception as exc:  # noqa: BLE001 - one failed call must not stop the graph
+        log(f"  Failed {node.label()}: {type(exc).__name__}: {exc}")
+        code = 1
+    elapsed = time.monotonic() - started
+    if code == 0:
+        log(f"  Done {node.label()} ({elapsed:.1f}s) -> {node.out}")
+    return code == 0
+
+
+def make_executor(
+    manifest: RunManifest,
+    resume: bool,
+    ledger: Optional[TelemetryLedger] = None,
+    store_dir: Optional[Path] = None,
+) -> Callable[[Node], bool]:
+    """Wrap run_node with manifest bookkeeping.
+
+    With ``resume`` a node is skipped when its input hashes match the
+    manifest and its output still has the recorded, validated hash. Input
+    hashes are taken when the node becomes ready, so a re-run upstream
+    changes the hashes of everything downstream of it. An output that
+    fails validation is recorded as invalid and the node counts as failed,
+    so nothing downstream runs on it. LLM calls made by
+    the node are recorded in ``ledger`` under its node id and stage. With
+    ``store_dir`` every written forecast is also upserted into that run's
+    forecast table.
+    """
+
+    def execute(node: Node) -> bool:
+        inputs = node_input_hashes(node)
+        if resume and manifest.is_fresh(node.node_id, node.out, inputs):
+            log(f"  Up to date {node.label()}")
+            return True
+        scheduler_wait = time.monotonic() - node.ready_at if node.ready_at else 0.0
+        with bind(
+            ledger=ledger,
+            node_id=node.node_id,
+            stage=node.stage,
+            week_start=node.week_start,
+            scheduler_wait_seconds=round(scheduler_wait, 3),
+        ):
+            ok = run_node(node)
+        if not ok:
+            return False
+        errors = validate_output(node)
+        manifest.record(node.node_id, node.stage, node.out, inputs, valid=not errors, errors=errors)
+        if errors:
+            log(f"  Failed {node.label()}: invalid output {node.out}: {'; '.join(errors)}")
+            return False
+        if store_dir is not None and node.script == "run_forecast_llm":
+            try:
+                upsert_forecast(store_dir, node.out)
+            except Exception as exc:  # noqa: BLE001 - the JSON file is already written
+                log(f"  Forecast store not updated for {node.label()}: {type(exc).__name__}: {exc}")
+        return True
+
+    return execute
+
+
+def run_graph(
+    nodes: Dict[str, Node],
+    provider_limits: Dict[str, int],
+    default_limit: int,
+    execute: Callable[[Node], bool] = run_node,
+) -> Dict[str, str]:
+    """Run nodes as their dependencies finish, capped per provider.
+
+    Returns the final status of every node: done, failed or skipped.
+    """
+    status: Dict[str, str] = {key: "pending" for key in nodes}
+    remaining = {key: len(node.deps) for key, node in nodes.items()}
+    dependents: Dict[str, List[str]] = defaultdict(list)
+    for key, node in nodes.items():
+        for dep in node.deps:
+            dependents[dep].append(key)
+
+    def limit_for(provider: str) -> int:
+        return max(1, provider_limits.get(provider, default_limit))
+
+    providers = {node.provider for node in nodes.values()}
+    max_workers = max(1, sum(limit_for(provider) for provider in providers))
+
+    def skip_dependents(key: str) -> None:
+        stack = list(dependents[key])
+        while stack:
+            child = stack.pop()
+            if status[child] != "pending":
+                continue
+            status[child] = "skipped"
+            log(f"  Skipped {nodes[child].label()}: upstream {nodes[key].label()} did not complete.")
+            stack.extend(dependents[child])
+
+    ready = [key for key, count in remaining.items() if count == 0]
+    ready_at = time.monotonic()
+    for key in ready:
+        nodes[key].ready_at = ready_at
+    in_flight: Counter = Counter()
+    futures: Dict[Future, str] = {}
+    finished = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while ready or futures:
+            ready.sort(key=lambda key: nodes[key].priority())
+            deferred: List[str] = []
+            for key in ready:
+                node = nodes[key]
+                if status[key] != "pending":
+                    continue
+                if in_flight[node.provider] >= limit_for(node.provider):
+                    deferred.append(key)
+                    continue
+                in_flight[node.provider] += 1
+                status[key] = "running"
+                futures[pool.submit(execute, node)] = key
+            ready = deferred
+
+            if not futures:
+                break
+            done, _ = wait(list(futures), return_when=FIRST_COMPLETED)
+            for future in done:
+                key = futures.pop(future)
+                node = nodes[key]
+                in_flight[node.provider] -= 1
+                finished += 1
+                try:
+                    ok = future.result()
+                except Exception as exc:  # noqa: BLE001
+                    log(f"  Failed {node.label()}: {type(exc).__name__}: {exc}")
+                    ok = False
+                status[key] = "done" if ok else "failed"
+                log(f"Progress: {finished}/{len(nodes)}")
+                if not ok:
+                    skip_dependents(key)
+                    continue
+                for child in dependents[key]:
+                    remaining[child] -= 1
+                    if remaining[child] == 0 and status[child] == "pending":
+                        nodes[child].ready_at = time.monotonic()
+                        ready.append(child)
+
+    return status
+
+
+def parse_limits(items: Optional[List[str]]) -> Dict[str, int]:
+    limits: Dict[str, int] = {}
+    for item in items or []:
+        if "=" not in item:
+            raise SystemExit(f"Invalid --provider-concurrency '{item}', expected provider=N.")
+        provider, value = item.split("=", 1)
+        try:
+            limits[provider.strip().lower()] = int(value)
+        except ValueError:
+            raise SystemExit(f"Invalid --provider-concurrency '{item}', expected provider=N.")
+    return limits
+
+
+def compaction_argv(token_budget: Optional[int]) -> List[str]:
+    if not token_budget:
+        return []
+    return ["--compact-evidence", "--evidence-token-budget", str(token_budget)]
+
+
+def run_analysis(run_dir: Path, enable_social_search: bool, source_index: Optional[Path] = None) -> None:
+    news = run_dir / "search_logs"
+    social = run_dir / "search_logs_social"
+    jobs = [[str(news), "--out-dir", str(run_dir / "analysis" / "news")]]
+    if enable_social_search:
+        jobs.append([str(social), "--out-dir", str(run_dir / "analysis" / "social")])
+        jobs.append([str(news), str(social), "--out-dir", str(run_dir / "analysis" / "combined")])
+    for argv in jobs:
+        if Path(argv[0]).exists():
+            analyze_search_logs.main(argv + ["--incremental"])
+    if source_index is not None:
+        with SourceIndex(source_index) as index:
+            changed, _ = update_index(index, run_dir.parent, [run_dir.name])
+        print(f"Source index: {changed} log(s) re-read into {source_index}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the weekly search/forecast graph concurrently.")
+    parser.add_argument("--weeks-csv", default="data/weeks.csv")
+    parser.add_argument("--run-id", default=None, help="Run id. Default: timestamp + pid.")
+    parser.add_argument("--run-dir", default=None, help="Run directory. Default: data/runs/{run_id}.")
+    parser.add_argument(
+        "--model",
+        action="append",
+        choices=sorted(MODEL_PROVIDERS),
+        help=f"Model to run (repeatable). Default: {', '.join(DEFAULT_MODELS)}.",
+    )
+    parser.add_argument("--social", action="store_true", help="Also run the social search track.")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="Default in-flight calls per provider.")
+    parser.add_argument(
+        "--provider-concurrency",
+        action="append",
+        help="Per-provider in-flight limit, e.g. openai=8 (repeatable).",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=None,
+        help="Pooled HTTP connections per provider client. Default: LLM_POOL_SIZE or 16.",
+    )
+    add_cache_arguments(parser)
+    parser.add_argument(
+        "--evidence-token-budget",
+        type=int,
+        default=None,
+        help="Compact search logs/priors for forecast prompts to this token budget.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip nodes whose inputs are unchanged and whose outputs still validate.",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream completions and abort any whose JSON goes invalid mid-generation.",
+    )
+    add_store_arguments(parser)
+    parser.add_argument("--skip-analysis", action="store_true")
+    parser.add_argument(
+        "--source-index",
+        default=DEFAULT_INDEX,
+        help=f"Cross-run source index to add this run's search logs to ('' to skip). Default: {DEFAULT_INDEX}.",
+    )
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+
+    if args.forecast_store:
+        try:
+            require_engine()
+        except RuntimeError as exc:
+            raise SystemExit(str(exc))
+
+    if args.pool_size:
+        configure_client_pool(args.pool_size)
+
+    if args.resume and not (args.run_id or args.run_dir):
+        raise SystemExit("--resume needs --run-id or --run-dir of the run to continue.")
+
+    run_id = args.run_id or f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+    run_dir = Path(args.run_dir or f"data/runs/{run_id}")
+    run_dir.mkdir(parents=True, exist_ok=True)
+    print(f"Run dir: {run_dir}")
+
+    weeks = read_weeks(Path(args.weeks_csv))
+    models = args.model or DEFAULT_MODELS
+    nodes = build_graph(
+        run_dir,
+        weeks,
+        models,
+        enable_social_search=args.social,
+        extra_argv=cache_argv(args) + (["--stream"] if args.stream else []),
+        forecast_argv=compaction_argv(args.evidence_token_budget),
+    )
+    print(f"Nodes: {len(nodes)} ({len(weeks)} weeks x {len(models)} models)")
+
+    manifest = RunManifest(run_dir, on_change=catalog_listener(run_dir))
+    manifest.start(models, [week_start for _, week_start, _ in weeks], args.social, len(nodes))
+    started = time.monotonic()
+    counts: Counter = Counter()
+    try:
+        status = run_graph(
+            nodes,
+            parse_limits(args.provider_concurrency),
+            args.max_concurrency,
+            execute=make_executor(
+                manifest,
+                args.resume,
+                open_ledger(run_dir / LEDGER_NAME),
+                store_dir=run_dir if args.forecast_store else None,
+            ),
+        )
+        counts = Counter(status.values())
+    finally:
+        close_clients()
+        manifest.finish("completed" if counts["done"] == len(nodes) else "failed")
+    elapsed = time.monotonic() - started
+
+    print(
+        f"Finished in {elapsed:.1f}s: {counts['done']} done, "
+        f"{counts['failed']} failed, {counts['skipped']} skipped."
+    )
+    cache = cache_from_args(args)
+    if cache is not None:
+        print(f"Response cache: {cache.hits} hit(s), {cache.misses} miss(es), {cache.writes} write(s)")
+    records = read_ledger(run_dir / LEDGER_NAME)
+    if records:
+        print(
+            f"Telemetry: {len(records)} call(s), est. ${total_cost(records):.2f} "
+            f"(./scripts/summarize_telemetry.py {run_dir})"
+        )
+
+    if not args.skip_analysis:
+        run_analysis(run_dir, args.social, Path(args.source_index) if args.source_index else None)
+
+    return 0 if counts["failed"] == 0 and counts["skipped"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,16 +3,30 @@
 
 import argparse
 import json
+import sys
 from pathlib import Path
+from typing import Dict, List, Optional
 
-from llm_utils import call_provider, env_float, env_int, load_dotenv, render_template
+from json_stream import StreamAborted, add_stream_arguments, stream_from_args
+from llm_utils import (
+    atomic_write_text,
+    call_provider,
+    env_float,
+    env_int,
+    format_usage,
+    load_dotenv,
+    render_template,
+)
+from llm_worker import forward
+from response_cache import add_cache_arguments, cache_from_args
+from telemetry import add_telemetry_arguments, bind, ledger_from_args
 
 
 def load_text(path: Path) -> str:
     return path.read_text(encoding="utf-8")
 
 
-def main() -> int:
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Run weekly search prompt via LLM.")
     parser.add_argument("--provider", required=True, choices=["openai", "anthropic", "gemini"])
     parser.add_argument("--model", required=True)
@@ -26,11 +40,15 @@ def main() -> int:
     parser.add_argument("--temperature", type=float, default=0.0)
     parser.add_argument("--max-tokens", type=int, default=2048)
     parser.add_argument("--timeout", type=int, default=60)
+    add_cache_arguments(parser)
+    add_stream_arguments(parser)
+    add_telemetry_arguments(parser)
     parser.add_argument("--allow-non-json", action="store_true")
-    args = parser.parse_args()
+    return parser.parse_args(argv)
 
-    load_dotenv()
 
+def build_request(args: argparse.Namespace) -> Dict[str, object]:
+    """Render the prompt and return the call_provider arguments for it."""
     template = load_text(Path(args.prompt_file))
     rendered = render_template(template, {
         "week_start": args.week_start,
@@ -44,17 +62,20 @@ def main() -> int:
     if args.timeout == 60:
         args.timeout = env_int("LLM_TIMEOUT", args.timeout)
 
-    response = call_provider(
-        args.provider,
-        rendered,
-        args.model,
-        response_json=args.response_json,
-        enable_search_tool=args.enable_search_tool,
-        temperature=args.temperature,
-        max_tokens=args.max_tokens,
-        timeout=args.timeout,
-    )
+    return {
+        "provider": args.provider,
+        "prompt": rendered,
+        "model": args.model,
+        "system": None,
+        "response_json": args.response_json,
+        "enable_search_tool": args.enable_search_tool,
+        "temperature": args.temperature,
+        "max_tokens": args.max_tokens,
+        "timeout": args.timeout,
+    }
+
 
+def write_response(args: argparse.Namespace, response: str) -> int:
     out_path = Path(args.out)
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
@@ -63,12 +84,45 @@ def main() -> int:
     except json.JSONDecodeError:
         if not args.allow_non_json:
             raise SystemExit("Model response is not valid JSON. Re-run or pass --allow-non-json.")
-        out_path.write_text(response, encoding="utf-8")
+        atomic_write_text(out_path, response)
         return 0
 
-    out_path.write_text(json.dumps(data, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    atomic_write_text(out_path, json.dumps(data, indent=2, ensure_ascii=False) + "\n")
     return 0
 
 
+def main(argv: Optional[List[str]] = None) -> int:
+    if argv is None:
+        forwarded = forward("run_search_llm")
+        if forwarded is not None:
+            return forwarded
+    args = parse_args(argv)
+    load_dotenv()
+    request = build_request(args)
+
+    cache = cache_from_args(args)
+    usage: Dict[str, int] = {}
+    stream = stream_from_args(args, "search")
+    try:
+        with bind(ledger=ledger_from_args(args), stage="search", week_start=args.week_start):
+            response = call_provider(
+                **request,
+                cache=cache,
+                refresh_cache=args.refresh_cache,
+                usage=usage,
+                stream=stream,
+            )
+    except StreamAborted as exc:
+        raise SystemExit(f"Aborted streamed response after {len(exc.text)} chars: {exc.reason}")
+    if stream is not None and stream.first_token_at is not None:
+        print(stream.summary(), file=sys.stderr)
+    if usage:
+        print(format_usage(usage), file=sys.stderr)
+    if cache is not None:
+        print(f"Response cache totals: {cache.hits} hit(s), {cache.misses} miss(es)", file=sys.stderr)
+
+    return write_response(args, response)
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
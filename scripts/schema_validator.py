@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""Validate forecasts and search logs against schema/*.json plus the study's seat and source rules."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timezone
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from seats import DISTRICT_SEATS, PARTY_LIST_SEATS, TOTAL_SEATS
+
+SCHEMA_DIR = Path(__file__).resolve().parent.parent / "schema"
+SCHEMA_FILES = {
+    "forecast": "forecast_schema.json",
+    "search_log": "search_log_schema.json",
+}
+SEAT_SECTIONS = ("forecast_party_list", "forecast_district", "forecast_total")
+DEFAULT_SEAT_TOTALS = (PARTY_LIST_SEATS, DISTRICT_SEATS, TOTAL_SEATS)
+
+# From docs/study_protocol.md; the 15-source minimum is in the schema itself.
+MIN_DISTINCT_PUBLISHERS = 3
+
+# Files per worker task; validating one file is too little work to ship alone.
+CHUNK_SIZE = 32
+
+# A compiled check appends "path: message" strings for every violation.
+Check = Callable[[object, str, List[str]], None]
+SeatTotals = Tuple[int, int, int]
+
+TYPES: Dict[str, Callable[[object], bool]] = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "null": lambda value: value is None,
+}
+
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def _is_date(value: str) -> bool:
+    if not _DATE.match(value):
+        return False
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+FORMATS: Dict[str, Callable[[str], bool]] = {"date": _is_date}
+
+# Annotations that do not constrain anything.
+ANNOTATIONS = {"$schema", "$id", "$comment", "title", "description", "definitions", "$defs", "default", "examples"}
+KEYWORDS = ANNOTATIONS | {
+    "$ref",
+    "type",
+    "enum",
+    "format",
+    "required",
+    "properties",
+    "additionalProperties",
+    "items",
+    "minItems",
+    "maxItems",
+    "minimum",
+    "maximum",
+}
+
+
+def _accept(value: object, path: str, errors: List[str]) -> None:
+    return None
+
+
+class SchemaCompiler:
+    """Turn a JSON schema into nested closures once, so checking a file is
+    plain function calls with no schema walking.
+
+    Supports the subset of draft 2020-12 that ``schema/`` uses; any other
+    keyword is rejected at compile time rather than silently ignored.
+    """
+
+    def __init__(self, root: Mapping[str, object]) -> None:
+        self.root = root
+        self._refs: Dict[str, Check] = {}
+
+    def compile(self, schema: Mapping[str, object]) -> Check:
+        unknown = sorted(set(schema) - KEYWORDS)
+        if unknown:
+            raise ValueError(f"Unsupported schema keyword(s): {', '.join(unknown)}")
+
+        checks: List[Check] = []
+        if "$ref" in schema:
+            checks.append(self._ref(str(schema["$ref"])))
+        if "enum" in schema:
+            checks.append(self._enum(list(schema["enum"])))  # type: ignore[arg-type]
+        if "format" in schema and schema["format"] in FORMATS:
+            checks.append(self._format(str(schema["format"])))
+        if "required" in schema:
+            checks.append(self._required(list(schema["required"])))  # type: ignore[arg-type]
+        if "properties" in schema or "additionalProperties" in schema:
+            checks.append(self._properties(schema))
+        if "items" in schema:
+            checks.append(self._items(self.compile(schema["items"])))  # type: ignore[arg-type]
+        if "minItems" in schema or "maxItems" in schema:
+            checks.append(self._length(schema.get("minItems"), schema.get("maxItems")))  # type: ignore[arg-type]
+        if "minimum" in schema or "maximum" in schema:
+            checks.append(self._range(schema.get("minimum"), schema.get("maximum")))  # type: ignore[arg-type]
+
+        body = _chain(checks)
+        if "type" not in schema:
+            return body
+        type_name = str(schema["type"])
+        is_type = TYPES[type_name]
+
+        if body is _accept:
+
+            def check_type(value: object, path: str, errors: List[str]) -> None:
+                if not is_type(value):
+                    errors.append(f"{path}: expected {type_name}, got {_type_of(value)}")
+
+            return check_type
+
+        # A type mismatch stops the checks below it; they would only repeat it.
+        def check(value: object, path: str, errors: List[str]) -> None:
+            if not is_type(value):
+                errors.append(f"{path}: expected {type_name}, got {_type_of(value)}")
+                return
+            body(value, path, errors)
+
+        return check
+
+    def _ref(self, ref: str) -> Check:
+        if ref not in self._refs:
+            if not ref.startswith("#/"):
+                raise ValueError(f"Only local $ref is supported: {ref}")
+            # Registered before compiling the target, so recursive refs resolve.
+            target: List[Check] = []
+            self._refs[ref] = lambda value, path, errors: target[0](value, path, errors)
+            node: object = self.root
+            for part in ref[2:].split("/"):
+                node = node[part]  # type: ignore[index]
+            target.append(self.compile(node))  # type: ignore[arg-type]
+        return self._refs[ref]
+
+    @staticmethod
+    def _enum(allowed: List[object]) -> Check:
+        def check(value: object, path: str, errors: List[str]) -> None:
+            if value not in allowed:
+                errors.append(f"{path}: {value!r} is not one of {allowed}")
+
+        return check
+
+    @staticmethod
+    def _format(name: str) -> Check:
+        test = FORMATS[name]
+
+        def check(value: object, path: str, errors: List[str]) -> None:
+            if isinstance(value, str) and not test(value):
+                errors.append(f"{path}: {value!r} is not a valid {name}")
+
+        return check
+
+    @staticmethod
+    def _required(keys: List[str]) -> Check:
+        def check(value: object, path: str, errors: List[str]) -> None:
+            if isinstance(value, dict):
+                for key in keys:
+                    if key not in value:
+                        errors.append(f"{path}: missing '{key}'")
+
+        return check
+
+    def _properties(self, schema: Mapping[str, object]) -> Check:
+        declared = dict(schema.get("properties") or {})  # type: ignore[call-overload]
+        # Properties that only declare a type are tested inline: most of a
+        # search log is sources made of plain strings.
+        plain = {key: (str(sub["type"]), TYPES[str(sub["type"])]) for key, sub in declared.items() if set(sub) == {"type"}}
+        properties = {key: self.compile(sub) for key, sub in declared.items() if key not in plain}
+        extra = schema.get("additionalProperties", True)
+        extra_check: Optional[Check] = self.compile(extra) if isinstance(extra, dict) else None
+
+        def check(value: object, path: str, errors: List[str]) -> None:
+            if not isinstance(value, dict):
+                return
+            for key, item in value.items():
+                leaf = plain.get(key)
+                if leaf is not None:
+                    if not leaf[1](item):
+                        errors.append(f"{path}.{key}: expected {leaf[0]}, got {_type_of(item)}")
+                    continue
+                sub = properties.get(key)
+                if sub is not None:
+                    sub(item, f"{path}.{key}", errors)
+                elif extra is False:
+                    errors.append(f"{path}: unexpected property '{key}'")
+                elif extra_check is not None:
+                    extra_check(item, f"{path}.{key}", errors)
+
+        return check
+
+    @staticmethod
+    def _items(item_check: Check) -> Check:
+        def check(value: object, path: str, errors: List[str]) -> None:
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    item_check(item, f"{path}[{index}]", errors)
+
+        return check
+
+    @staticmethod
+    def _length(low: Optional[int], high: Optional[int]) -> Check:
+        def check(value: object, path: str, errors: List[str]) -> None:
+            if not isinstance(value, list):
+                return
+            if low is not None and len(value) < low:
+                errors.append(f"{path}: expected at least {low} items, got {len(value)}")
+            if high is not None and len(value) > high:
+                errors.append(f"{path}: expected at most {high} items, got {len(value)}")
+
+        return check
+
+    @staticmethod
+    def _range(low: Optional[float], high: Optional[float]) -> Check:
+        def check(value: object, path: str, errors: List[str]) -> None:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return
+            if low is not None and value < low:
+                errors.append(f"{path}: {value} is below the minimum {low}")
+            if high is not None and value > high:
+                errors.append(f"{path}: {value} is above the maximum {high}")
+
+        return check
+
+
+def _chain(checks: List[Check]) -> Check:
+    if not checks:
+        return _accept
+    if len(checks) == 1:
+        return checks[0]
+
+    def check(value: object, path: str, errors: List[str]) -> None:
+        for item in checks:
+            item(value, path, errors)
+
+    return check
+
+
+def _type_of(value: object) -> str:
+    for name in ("null", "boolean", "integer", "number", "string", "array", "object"):
+        if TYPES[name](value):
+            return name
+    return type(value).__name__
+
+
+@lru_cache(maxsize=None)
+def compiled_schema(kind: str) -> Check:
+    """The compiled check for ``kind``; compiled once per process."""
+    schema = json.loads((SCHEMA_DIR / SCHEMA_FILES[kind]).read_text(encoding="utf-8"))
+    return SchemaCompiler(schema).compile(schema)
+
+
+def seat_errors(data: Mapping[str, object], totals: SeatTotals = DEFAULT_SEAT_TOTALS) -> List[str]:
+    """Seat sums and party-list + district = total; assumes the seat maps are int maps."""
+    party_list_total, district_total, total_seats = totals
+    party_list, district, total = (data[key] for key in SEAT_SECTIONS)
+    errors: List[str] = []
+    for name, section, expected in (
+        ("Party-list", party_list, party_list_total),
+        ("District", district, district_total),
+        ("Total", total, total_seats),
+    ):
+        seats = sum(section.values())  # type: ignore[attr-defined]
+        if seats != expected:
+            errors.append(f"{name} sum {seats} != {expected}.")
+    for party in total:  # type: ignore[attr-defined]
+        if party_list.get(party, 0) + district.get(party, 0) != total[party]:  # type: ignore[attr-defined,index]
+            errors.append(f"Total mismatch for {party}.")
+    return errors
+
+
+def publisher_errors(data: Mapping[str, object]) -> List[str]:
+    sources = data.get("sources")
+    if not isinstance(sources, list):
+        return []
+    publishers = {
+        " ".join(str(source.get("publisher", "")).split())
+        for source in sources
+        if isinstance(source, dict) and source.get("publisher")
+    }
+    if len(publishers) < MIN_DISTINCT_PUBLISHERS:
+        return [f"$.sources: expected at least {MIN_DISTINCT_PUBLISHERS} distinct publishers, got {len(publishers)}"]
+    return []
+
+
+def validate_data(data: object, kind: str, totals: SeatTotals = DEFAULT_SEAT_TOTALS) -> List[str]:
+    """Schema errors first, then the study rules the schema cannot express."""
+    errors: List[str] = []
+    compiled_schema(kind)(data, "$", errors)
+    if not isinstance(data, dict):
+        return errors
+    if kind == "forecast":
+        # Sums only mean something once every seat map is a valid int map.
+        if not any(error.startswith(tuple(f"$.{key}" for key in SEAT_SECTIONS)) for error in errors) and all(
+            isinstance(data.get(key), dict) for key in SEAT_SECTIONS
+        ):
+            errors.extend(seat_errors(data, totals))
+    elif kind == "search_log":
+        errors.extend(publisher_errors(data))
+    return errors
+
+
+def kind_from_path(path: Path) -> Optional[str]:
+    parts = set(path.parts)
+    if "forecasts" in parts:
+        return "forecast"
+    if any(part.startswith("search_logs") for part in parts):
+        return "search_log"
+    return None
+
+
+def kind_from_data(data: object) -> Optional[str]:
+    if isinstance(data, dict):
+        if "forecast_total" in data:
+            return "forecast"
+        if "sources" in data:
+            return "search_log"
+    return None
+
+
+def validate_path(
+    path: Path,
+    kind: Optional[str] = None,
+    totals: SeatTotals = DEFAULT_SEAT_TOTALS,
+) -> Dict[str, object]:
+    """Report entry for one file: path, kind, valid, errors."""
+    kind = kind or kind_from_path(Path(path))
+    result: Dict[str, object] = {"path": str(path), "kind": kind, "valid": False, "errors": []}
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        result["errors"] = ["Missing file."]
+        return result
+    except (OSError, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        result["errors"] = [f"Invalid JSON: {exc}"]
+        return result
+    kind = kind or kind_from_data(data)
+    result["kind"] = kind
+    if kind is None:
+        result["errors"] = ["Cannot tell whether this is a forecast or a search log."]
+        return result
+    errors = validate_data(data, kind, totals)
+    result["valid"] = not errors
+    result["errors"] = errors
+    return result
+
+
+def validate_paths(
+    paths: Sequence[Path],
+    kind: Optional[str] = None,
+    jobs: int = 1,
+    totals: SeatTotals = DEFAULT_SEAT_TOTALS,
+) -> List[Dict[str, object]]:
+    """Validate files across ``jobs`` processes (``jobs=1``: in this process), in input order."""
+    check = partial(validate_path, kind=kind, totals=totals)
+    if jobs <= 1 or len(paths) <= CHUNK_SIZE:
+        return [check(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(check, paths, chunksize=CHUNK_SIZE))
+
+
+def expand_paths(paths: Sequence[str]) -> List[Path]:
+    expanded: List[Path] = []
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            expanded.extend(sorted(path.rglob("*.json")))
+        else:
+            expanded.append(path)
+    return list(dict.fromkeys(expanded))
+
+
+def build_report(results: List[Dict[str, object]]) -> Dict[str, object]:
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "files": len(results),
+        "invalid": sum(1 for result in results if not result["valid"]),
+        "results": results,
+    }
+
+
+def print_errors(results: List[Dict[str, object]]) -> None:
+    for result in results:
+        if result["valid"]:
+            continue
+        print(f"{result['path']}:")
+        for error in result["errors"]:  # type: ignore[union-attr]
+            print(f"  - {error}")
+
+
+def add_validation_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Validation processes. Default: CPU count.",
+    )
+    parser.add_argument("--report", default=None, help="Write a JSON report of every file here ('-' for stdout).")
+
+
+def write_report(target: Optional[str], results: List[Dict[str, object]]) -> None:
+    if not target:
+        return
+    text = json.dumps(build_report(results), indent=2, ensure_ascii=False)
+    if target == "-":
+        print(text)
+    else:
+        Path(target).parent.mkdir(parents=True, exist_ok=True)
+        Path(target).write_text(text + "\n", encoding="utf-8")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Validate forecast and search log JSON files.")
+    parser.add_argument("paths", nargs="+", help="JSON files or directories (e.g. a run's forecasts/ and search_logs/).")
+    parser.add_argument(
+        "--kind",
+        choices=["auto", *sorted(SCHEMA_FILES)],
+        default="auto",
+        help="auto: from the directory (forecasts/, search_logs*/) or the file's keys.",
+    )
+    add_validation_arguments(parser)
+    args = parser.parse_args(argv)
+
+    paths = expand_paths(args.paths)
+    results = validate_paths(paths, None if args.kind == "auto" else args.kind, args.jobs)
+    # Other JSON found inside directories (manifest.json, batch state, ...) is not ours to judge.
+    named = {str(Path(raw)) for raw in args.paths}
+    results = [result for result in results if result["kind"] is not None or result["path"] in named]
+    if args.report != "-":
+        print_errors(results)
+    write_report(args.report, results)
+    invalid = sum(1 for result in results if not result["valid"])
+    print(f"Validated {len(results)} file(s): {invalid} invalid.", file=sys.stderr)
+    return 1 if invalid else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
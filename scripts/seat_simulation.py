@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""Monte Carlo seat simulation: intervals and coalition majority odds from each week's forecasts."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from forecast_store import SECTIONS, condition_from_filename, forecast_files, load_tables
+from seats import DISTRICT_SEATS, PARTIES, PARTY_LIST_SEATS, TOTAL_SEATS
+
+MAJORITY = TOTAL_SEATS // 2 + 1
+DEFAULT_DRAWS = 1_000_000
+DEFAULT_BATCH = 250_000
+# Dirichlet concentration around each forecast's seat shares: larger is tighter.
+DEFAULT_CONCENTRATION = 200.0
+# Pseudo-seats added to every party's Dirichlet weight, so a party a forecast
+# gives 0 seats can still win a few in a draw.
+DEFAULT_SMOOTHING = 0.5
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+SECTION_SEATS = {"party_list": PARTY_LIST_SEATS, "district": DISTRICT_SEATS}
+
+
+@dataclass
+class WeekForecasts:
+    """The forecasts a week's distribution is built from: one row per forecast, seats in party order."""
+
+    week: str
+    party_list: np.ndarray
+    district: np.ndarray
+    labels: List[str] = field(default_factory=list)
+
+
+@dataclass
+class SimulationResult:
+    """Seat histograms per section and party, and coalition majority counts, over ``draws`` draws."""
+
+    week: str
+    draws: int
+    components: int
+    histograms: Dict[str, np.ndarray]
+    coalition_hits: Dict[str, int]
+    coalition_histograms: Dict[str, np.ndarray]
+    seconds: float = 0.0
+
+
+def coalition_name(parties: Sequence[str]) -> str:
+    return " + ".join(parties)
+
+
+def parse_coalition(value: str) -> Tuple[str, ...]:
+    """``"People's Party+Pheu Thai Party"`` -> the parties; raises ``ValueError`` on unknown names."""
+    parties = tuple(part.strip() for part in value.split("+") if part.strip())
+    unknown = [party for party in parties if party not in PARTIES]
+    if not parties or unknown:
+        raise ValueError(f"Unknown parties in coalition {value!r}: {', '.join(unknown) or 'none given'}")
+    return parties
+
+
+def default_coalitions() -> List[Tuple[str, ...]]:
+    """Every party alone and every pair of parties."""
+    return [(party,) for party in PARTIES] + list(combinations(PARTIES, 2))
+
+
+def sample_rows(run_dirs: Iterable[Path]) -> List[Dict[str, object]]:
+    """One row per stored sample of every ``--samples`` forecast in ``run_dirs``."""
+    rows: List[Dict[str, object]] = []
+    for run_dir in run_dirs:
+        for path in forecast_files(Path(run_dir)):
+            condition, week = condition_from_filename(path.name)
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                continue
+            samples = data.get("samples") if isinstance(data, dict) else None
+            if not condition or not isinstance(samples, list):
+                continue
+            for index, sample in enumerate(samples):
+                if not isinstance(sample, dict):
+                    continue
+                rows.append(
+                    {
+                        "run": Path(run_dir).name,
+                        "model": path.parent.name,
+                        "condition": condition,
+                        "week": week,
+                        "sample": index,
+                        **{
+                            section: [int((sample.get(SECTIONS[section]) or {}).get(party) or 0) for party in PARTIES]
+                            for section in SECTION_SEATS
+                        },
+                    }
+                )
+    return rows
+
+
+def week_forecasts(
+    table: pd.DataFrame,
+    samples: Sequence[Dict[str, object]] = (),
+    models: Sequence[str] = (),
+    conditions: Sequence[str] = (),
+) -> List[WeekForecasts]:
+    """Group the point forecasts of ``table`` (and any ``samples``) by week.
+
+    Each (run, model, condition) forecast is one mixture component; when it
+    was sampled, its samples replace it, each weighted 1/K so every
+    forecast still counts once.
+    """
+    table = table[table["party"].isin(PARTIES)].astype({section: float for section in SECTION_SEATS})
+    if models:
+        table = table[table["model"].isin(models)]
+    if conditions:
+        table = table[table["condition"].isin(conditions)]
+    wide = {
+        section: table.pivot_table(
+            index=["week", "run", "model", "condition"], columns="party", values=section, aggfunc="first"
+        )
+        .reindex(columns=PARTIES)
+        .fillna(0)
+        .astype(float)
+        for section in SECTION_SEATS
+    }
+    sampled: Dict[Tuple[str, str, str, str], List[Dict[str, object]]] = {}
+    for row in samples:
+        if models and row["model"] not in models or conditions and row["condition"] not in conditions:
+            continue
+        sampled.setdefault((row["week"], row["run"], row["model"], row["condition"]), []).append(row)  # type: ignore[arg-type]
+
+    weeks: List[WeekForecasts] = []
+    for week in sorted(wide["party_list"].index.get_level_values("week").unique()):
+        party_list: List[np.ndarray] = []
+        district: List[np.ndarray] = []
+        labels: List[str] = []
+        for key in wide["party_list"].loc[[week]].index:
+            label = "/".join(key[1:])
+            rows = sampled.get(key)
+            if rows:
+                party_list.extend(np.asarray(row["party_list"], dtype=float) for row in rows)
+                district.extend(np.asarray(row["district"], dtype=float) for row in rows)
+                labels.extend(f"{label}#{row['sample']}" for row in rows)
+            else:
+                party_list.append(wide["party_list"].loc[key].to_numpy())
+                district.append(wide["district"].loc[key].to_numpy())
+                labels.append(label)
+        party_list_seats, district_seats = np.vstack(party_list), np.vstack(district)
+        # A forecast with no seats in a section has no shares to centre on.
+        keep = (party_list_seats.sum(axis=1) > 0) & (district_seats.sum(axis=1) > 0)
+        if keep.any():
+            weeks.append(
+                WeekForecasts(
+                    str(week),
+                    party_list_seats[keep],
+                    district_seats[keep],
+                    [label for label, kept in zip(labels, keep) if kept],
+                )
+            )
+    return weeks
+
+
+def component_weights(labels: Sequence[str]) -> np.ndarray:
+    """Equal weight per forecast; a sampled forecast's weight is split across its samples."""
+    forecasts = [label.split("#", 1)[0] for label in labels]
+    counts = Counter(forecasts)
+    weights = np.array([1.0 / counts[name] for name in forecasts])
+    return weights / weights.sum()
+
+
+def draw_seats(
+    rng: np.random.Generator,
+    seats: np.ndarray,
+    total: int,
+    components: np.ndarray,
+    concentration: float,
+    smoothing: float,
+) -> np.ndarray:
+    """Dirichlet-multinomial seat draws: ``[draw, party]`` integers summing to ``total``.
+
+    Each draw picks the component forecast in ``components``, draws party
+    shares from a Dirichlet centred on that forecast's shares, then deals
+    ``total`` seats from a multinomial with those shares.
+    """
+    shares = seats / seats.sum(axis=1, keepdims=True)
+    alpha = concentration * shares[components] + smoothing
+    gamma = rng.standard_gamma(alpha)
+    return rng.multinomial(total, gamma / gamma.sum(axis=1, keepdims=True))
+
+
+def simulate_week(
+    forecasts: WeekForecasts,
+    draws: int = DEFAULT_DRAWS,
+    coalitions: Sequence[Tuple[str, ...]] = (),
+    concentration: float = DEFAULT_CONCENTRATION,
+    smoothing: float = DEFAULT_SMOOTHING,
+    batch_size: int = DEFAULT_BATCH,
+    rng: Optional[np.random.Generator] = None,
+) -> SimulationResult:
+    """Draw ``draws`` constrained seat allocations for one week, in batches.
+
+    Party-list and district seats are drawn independently per component,
+    so each draw sums to 100, 400 and 500 exactly. Only histograms are
+    kept, so memory stays at one batch whatever ``draws`` is.
+    """
+    rng = rng or np.random.default_rng()
+    started = time.perf_counter()
+    weights = component_weights(forecasts.labels)
+    party_count = len(PARTIES)
+    histograms = {
+        "party_list": np.zeros((party_count, PARTY_LIST_SEATS + 1), dtype=np.int64),
+        "district": np.zeros((party_count, DISTRICT_SEATS + 1), dtype=np.int64),
+        "total": np.zeros((party_count, TOTAL_SEATS + 1), dtype=np.int64),
+    }
+    members = {coalition_name(parties): [PARTIES.index(party) for party in parties] for parties in coalitions}
+    hits = dict.fromkeys(members, 0)
+    coalition_histograms = {name: np.zeros(TOTAL_SEATS + 1, dtype=np.int64) for name in members}
+    offsets = {
+        section: np.arange(party_count)[None, :] * (seats + 1) for section, seats in
+        (("party_list", PARTY_LIST_SEATS), ("district", DISTRICT_SEATS), ("total", TOTAL_SEATS))
+    }
+
+    done = 0
+    while done < draws:
+        size = min(batch_size, draws - done)
+        components = rng.choice(len(weights), size=size, p=weights)
+        drawn = {
+            section: draw_seats(
+                rng, getattr(forecasts, section), seats, components, concentration, smoothing
+            )
+            for section, seats in SECTION_SEATS.items()
+        }
+        drawn["total"] = drawn["party_list"] + drawn["district"]
+        for section, seats in drawn.items():
+            # One bincount over (party, seats) cells instead of one per party.
+            histograms[section] += np.bincount(
+                (seats + offsets[section]).ravel(), minlength=histograms[section].size
+            ).reshape(histograms[section].shape)
+        for name, columns in members.items():
+            coalition = drawn["total"][:, columns].sum(axis=1)
+            hits[name] += int((coalition >= MAJORITY).sum())
+            coalition_histograms[name] += np.bincount(coalition, minlength=TOTAL_SEATS + 1)
+        done += size
+
+    return SimulationResult(
+        forecasts.week,
+        draws,
+        len(weights),
+        histograms,
+        hits,
+        coalition_histograms,
+        time.perf_counter() - started,
+    )
+
+
+def histogram_quantiles(histogram: np.ndarray, quantiles: Sequence[float]) -> np.ndarray:
+    """Quantiles of integer seat counts from their histogram(s) along the last axis."""
+    cdf = np.cumsum(histogram, axis=-1) / np.maximum(histogram.sum(axis=-1, keepdims=True), 1)
+    return np.stack([(cdf < q).sum(axis=-1) for q in quantiles], axis=-1)
+
+
+def interval_table(results: Sequence[SimulationResult], quantiles: Sequence[float] = DEFAULT_QUANTILES) -> pd.DataFrame:
+    """week, section, party, mean and one column per quantile (``q05``, ``q50``, ...)."""
+    rows = []
+    for result in results:
+        for section, histogram in result.histograms.items():
+            seats = np.arange(histogram.shape[1])
+            means = histogram @ seats / result.draws
+            values = histogram_quantiles(histogram, quantiles)
+            for index, party in enumerate(PARTIES):
+                row: Dict[str, object] = {"week": result.week, "section": section, "party": party}
+                row["mean"] = round(float(means[index]), 2)
+                row.update({f"q{round(q * 100):02d}": int(value) for q, value in zip(quantiles, values[index])})
+                rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def coalition_table(results: Sequence[SimulationResult]) -> pd.DataFrame:
+    """week, coalition, P(seats >= majority) and the coalition's median seats."""
+    rows = []
+    for result in results:
+        for name, hits in result.coalition_hits.items():
+            median = histogram_quantiles(result.coalition_histograms[name], [0.5])[0]
+            rows.append(
+                {
+                    "week": result.week,
+                    "coalition": name,
+                    "p_majority": hits / result.draws,
+                    "median_seats": int(median),
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from run_catalog import add_filter_arguments, filters_from_args, select_runs
+
+    parser = argparse.ArgumentParser(description="Simulate seat distributions and coalition majority odds per week.")
+    parser.add_argument("--runs-dir", default="data/runs", help="Root directory of runs.")
+    parser.add_argument("--run-id", action="append", help="Run id (repeatable). Default: every run matching the filters.")
+    parser.add_argument("--model", action="append", default=[], help="Only use this model's forecasts (repeatable).")
+    parser.add_argument("--use-condition", action="append", default=[], help="Only use this condition (repeatable).")
+    parser.add_argument("--use-samples", action="store_true", help="Use the samples stored by --samples forecasts.")
+    parser.add_argument("--week-start", action="append", default=[], help="Only simulate this week (repeatable).")
+    parser.add_argument("--draws", type=int, default=DEFAULT_DRAWS, help="Draws per week.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH)
+    parser.add_argument("--concentration", type=float, default=DEFAULT_CONCENTRATION)
+    parser.add_argument("--smoothing", type=float, default=DEFAULT_SMOOTHING)
+    parser.add_argument(
+        "--coalition",
+        action="append",
+        default=[],
+        help="Parties joined by '+', e.g. \"People's Party+Pheu Thai Party\" (repeatable). "
+        "Default: every party and every pair.",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out-dir", default="data/analysis/simulation", help="Output directory for CSVs.")
+    add_filter_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.draws < 1 or args.batch_size < 1 or args.concentration <= 0 or args.smoothing < 0:
+        raise SystemExit("--draws and --batch-size must be positive, --concentration > 0, --smoothing >= 0.")
+    try:
+        coalitions = [parse_coalition(value) for value in args.coalition] or default_coalitions()
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+
+    runs_dir = Path(args.runs_dir)
+    if args.run_id:
+        run_dirs = [runs_dir / run_id for run_id in args.run_id]
+    else:
+        run_dirs = select_runs(runs_dir, **filters_from_args(args))
+    if not run_dirs:
+        print("No runs found.")
+        return 0
+
+    table = load_tables(run_dirs)
+    if args.week_start:
+        table = table[table["week"].isin(args.week_start)]
+    samples = sample_rows(run_dirs) if args.use_samples else []
+    weeks = week_forecasts(table, samples, args.model, args.use_condition)
+    if not weeks:
+        print("No forecasts match.")
+        return 0
+
+    rng = np.random.default_rng(args.seed)
+    results = []
+    for forecasts in weeks:
+        result = simulate_week(
+            forecasts,
+            args.draws,
+            coalitions,
+            args.concentration,
+            args.smoothing,
+            args.batch_size,
+            rng,
+        )
+        results.append(result)
+        best = max(result.coalition_hits.items(), key=lambda item: item[1])
+        print(
+            f"{result.week}: {result.draws:,} draws from {result.components} forecast(s) in {result.seconds:.1f}s; "
+            f"most likely majority: {best[0]} ({best[1] / result.draws:.1%})"
+        )
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    outputs = {"seat_intervals.csv": interval_table(results), "coalition_probabilities.csv": coalition_table(results)}
+    for name, frame in outputs.items():
+        frame.to_csv(out_dir / name, index=False)
+        print(f"Wrote: {out_dir / name}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Study parties, seat totals and seat allocation helpers."""
+
+from typing import Dict, Mapping
+
+PARTIES = [
+    "People's Party",
+    "Bhumjaithai Party",
+    "Pheu Thai Party",
+    "Democrat Party (Thailand)",
+    "Kla Tham Party",
+    "Other",
+]
+
+PARTY_LIST_SEATS = 100
+DISTRICT_SEATS = 400
+TOTAL_SEATS = PARTY_LIST_SEATS + DISTRICT_SEATS
+
+
+def largest_remainder(weights: Mapping[str, float], total: int) -> Dict[str, int]:
+    """Allocate ``total`` integer seats proportionally to ``weights``.
+
+    Each party gets the floor of its quota; the seats left over go to the
+    largest fractional remainders (ties broken by party order).
+    """
+    keys = list(weights)
+    clean = {key: max(0.0, float(weights[key] or 0)) for key in keys}
+    weight_sum = sum(clean.values())
+    if weight_sum <= 0:
+        clean = {key: 1.0 for key in keys}
+        weight_sum = float(len(keys))
+    quotas = {key: clean[key] * total / weight_sum for key in keys}
+    seats = {key: int(quotas[key]) for key in keys}
+    leftover = total - sum(seats.values())
+    order = sorted(keys, key=lambda key: (-(quotas[key] - seats[key]), keys.index(key)))
+    for key in order[:leftover]:
+        seats[key] += 1
+    return seats
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""Cross-run SQLite index of every source cited in the search logs."""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from analyze_search_logs import load_json, normalize_publisher
+
+DEFAULT_INDEX = "data/source_index.sqlite"
+INDEX_VERSION = 1
+TRACKS = {"search_logs": "news", "search_logs_social": "social"}
+KINDS = {"sources": "source", "excluded_sources": "excluded"}
+
+# Query parameters that identify a campaign or click, not the page.
+TRACKING_PARAMS = {"fbclid", "gclid", "igshid", "mc_cid", "mc_eid", "ref", "ref_src", "si", "yclid"}
+TRACKING_PREFIXES = ("utm_",)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    run TEXT NOT NULL,
+    track TEXT NOT NULL,
+    model TEXT NOT NULL,
+    week_start TEXT,
+    week_end TEXT,
+    query_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS logs_week ON logs (week_start, model);
+CREATE INDEX IF NOT EXISTS logs_run ON logs (run, track);
+CREATE TABLE IF NOT EXISTS sources (
+    log_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    run TEXT NOT NULL,
+    track TEXT NOT NULL,
+    model TEXT NOT NULL,
+    week_start TEXT,
+    week_end TEXT,
+    url TEXT,
+    canonical_url TEXT,
+    domain TEXT,
+    title TEXT,
+    date TEXT,
+    publisher TEXT,
+    publisher_norm TEXT,
+    reason TEXT,
+    PRIMARY KEY (log_id, kind, pos)
+);
+CREATE INDEX IF NOT EXISTS sources_week_url ON sources (week_start, canonical_url);
+CREATE INDEX IF NOT EXISTS sources_publisher_week ON sources (publisher_norm, week_start);
+CREATE INDEX IF NOT EXISTS sources_model_week ON sources (model, week_start);
+CREATE INDEX IF NOT EXISTS sources_run ON sources (run, track);
+CREATE INDEX IF NOT EXISTS sources_domain ON sources (domain);
+"""
+
+SourceRow = Tuple[object, ...]
+
+
+@lru_cache(maxsize=65536)
+def canonical_url(url: Optional[str]) -> Optional[str]:
+    """``url`` with the differences that do not change the page removed.
+
+    The scheme and host are lowercased, ``http`` becomes ``https``, ``www.``
+    and default ports are dropped, tracking parameters (``utm_*``,
+    ``fbclid``, ...) and the fragment are removed, the remaining query is
+    sorted and a trailing slash is stripped. Anything that is not an
+    http(s) URL is returned trimmed but otherwise unchanged.
+    """
+    if not url or not url.strip():
+        return None
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        return url
+    host = parts.hostname.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    path = parts.path.rstrip("/")
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def url_domain(canonical: Optional[str]) -> Optional[str]:
+    """Host of a canonical http(s) URL, without ``www.`` or the port."""
+    if not canonical or not canonical.startswith("https://"):
+        return None
+    return canonical[len("https://") :].split("/", 1)[0].split("?", 1)[0].split(":", 1)[0] or None
+
+
+def describe_log(path: Path) -> Optional[Tuple[str, str, str]]:
+    """(run, track, model) for ``{run}/{search_logs|search_logs_social}/{model}/{week}.json``."""
+    model_dir = path.parent
+    track = TRACKS.get(model_dir.parent.name)
+    if track is None:
+        return None
+    return model_dir.parent.parent.name, track, model_dir.name
+
+
+def iter_run_logs(runs_dir: Path, run_ids: Optional[Sequence[str]] = None) -> Iterator[Path]:
+    """Every search log under ``runs_dir``, or under the given runs only."""
+    run_dirs = [runs_dir / run_id for run_id in run_ids] if run_ids else sorted(runs_dir.iterdir())
+    for run_dir in run_dirs:
+        for folder in TRACKS:
+            track_dir = run_dir / folder
+            if track_dir.is_dir():
+                yield from sorted(track_dir.glob("*/*.json"))
+
+
+def source_rows(path: Path, run: str, track: str, model: str) -> Tuple[Dict[str, object], List[SourceRow]]:
+    """(the log's ``logs`` fields, its rows) for one log; rows follow the ``sources`` table after ``log_id``."""
+    data = load_json(path)
+    if not isinstance(data, dict):
+        return {"model": model, "week_start": path.stem, "week_end": None, "query_count": 0}, []
+    model = str(data.get("model") or model)
+    week_start = data.get("week_start") or path.stem
+    week_end = data.get("week_end")
+    rows: List[SourceRow] = []
+    for key, kind in KINDS.items():
+        for pos, source in enumerate(data.get(key) or []):
+            if not isinstance(source, dict):
+                continue
+            url = source.get("url") or None
+            canonical = canonical_url(url)
+            publisher = source.get("publisher") or None
+            rows.append(
+                (
+                    kind,
+                    pos,
+                    run,
+                    track,
+                    model,
+                    week_start,
+                    week_end,
+                    url,
+                    canonical,
+                    url_domain(canonical),
+                    source.get("title"),
+                    source.get("date"),
+                    publisher,
+                    normalize_publisher(publisher) or None if publisher else None,
+                    source.get("reason"),
+                )
+            )
+    log = {
+        "model": model,
+        "week_start": week_start,
+        "week_end": week_end,
+        "query_count": len(data.get("queries") or []),
+    }
+    return log, rows
+
+
+class SourceIndex:
+    """``data/source_index.sqlite``: one row per source entry of every search log.
+
+    Logs are keyed by path and fingerprinted by size, mtime and content
+    hash like ``AnalysisState``, so ``update`` only re-reads logs that are
+    new or changed and drops those that disappeared. ``canonical_url`` and
+    ``publisher_norm`` are the columns to group by across models and runs.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA cache_size=-65536")
+        version = self._version()
+        if version is not None and version != INDEX_VERSION:
+            self.conn.executescript("DROP TABLE IF EXISTS logs; DROP TABLE IF EXISTS sources;")
+        self.conn.executescript(SCHEMA)
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(INDEX_VERSION),))
+        self.conn.commit()
+
+    def _version(self) -> Optional[int]:
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return int(row[0]) if row else None
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "SourceIndex":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def fingerprints(self, runs: Optional[Sequence[str]] = None) -> Dict[str, Tuple[int, int, str]]:
+        """{path: (size, mtime_ns, sha256)} for every indexed log, or those of ``runs``."""
+        query = "SELECT path, size, mtime_ns, sha256 FROM logs"
+        params: Tuple[str, ...] = ()
+        if runs:
+            query += f" WHERE run IN ({','.join('?' * len(runs))})"
+            params = tuple(runs)
+        return {row[0]: tuple(row[1:]) for row in self.conn.execute(query, params)}  # type: ignore[misc]
+
+    def touch(self, path: str, size: int, mtime_ns: int) -> None:
+        self.conn.execute("UPDATE logs SET size = ?, mtime_ns = ? WHERE path = ?", (size, mtime_ns, path))
+
+    def put(
+        self,
+        path: str,
+        size: int,
+        mtime_ns: int,
+        sha256: str,
+        run: str,
+        track: str,
+        log: Dict[str, object],
+        rows: List[SourceRow],
+    ) -> None:
+        previous = self.conn.execute("SELECT id FROM logs WHERE path = ?", (path,)).fetchone()
+        if previous:
+            self.conn.execute("DELETE FROM sources WHERE log_id = ?", previous)
+            self.conn.execute("DELETE FROM logs WHERE id = ?", previous)
+        log_id = self.conn.execute(
+            "INSERT INTO logs (path, size, mtime_ns, sha256, run, track, model, week_start, week_end, query_count) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                path,
+                size,
+                mtime_ns,
+                sha256,
+                run,
+                track,
+                log["model"],
+                log["week_start"],
+                log["week_end"],
+                log["query_count"],
+            ),
+        ).lastrowid
+        self.conn.executemany(
+            f"INSERT INTO sources VALUES ({','.join('?' * 16)})", [(log_id, *row) for row in rows]
+        )
+
+    def prune(self, keep: Iterable[str], runs: Optional[Sequence[str]] = None) -> int:
+        """Drop logs not in ``keep`` (within ``runs``, if given); return how many."""
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS listed (path TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM listed")
+        self.conn.executemany("INSERT OR IGNORE INTO listed VALUES (?)", [(path,) for path in keep])
+        scope = ""
+        params: Tuple[str, ...] = ()
+        if runs:
+            scope = f" AND run IN ({','.join('?' * len(runs))})"
+            params = tuple(runs)
+        gone = self.conn.execute(
+            f"SELECT id FROM logs WHERE path NOT IN (SELECT path FROM listed){scope}", params
+        ).fetchall()
+        self.conn.executemany("DELETE FROM sources WHERE log_id = ?", gone)
+        self.conn.executemany("DELETE FROM logs WHERE id = ?", gone)
+        return len(gone)
+
+    def commit(self) -> None:
+        self.conn.commit()
+
+    def totals(self) -> Tuple[int, int]:
+        logs = self.conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+        sources = self.conn.execute("SELECT COUNT(*) FROM sources").fetchone()[0]
+        return int(logs), int(sources)
+
+    def query(self, sql: str, params: Sequence[object] = ()) -> "sqlite3.Cursor":
+        return self.conn.execute(sql, tuple(params))
+
+    def shared_urls(
+        self,
+        week_start: str,
+        track: Optional[str] = None,
+        run: Optional[str] = None,
+    ) -> List[Tuple[str, str, int]]:
+        """(canonical_url, first title, runs) for URLs every model cited in a week.
+
+        "Every model" means every model with a log for that week (and track
+        or run, if given), counted across all runs in the index.
+        """
+        scope = "week_start = ?"
+        params: List[object] = [week_start]
+        if track:
+            scope += " AND track = ?"
+            params.append(track)
+        if run:
+            scope += " AND run = ?"
+            params.append(run)
+        rows = self.conn.execute(
+            "SELECT canonical_url, MIN(title), COUNT(DISTINCT run) FROM sources "
+            f"WHERE kind = 'source' AND canonical_url IS NOT NULL AND {scope} "
+            "GROUP BY canonical_url "
+            f"HAVING COUNT(DISTINCT model) = (SELECT COUNT(DISTINCT model) FROM logs WHERE {scope}) "
+            "ORDER BY canonical_url",
+            params + params,
+        )
+        return [(str(url), str(title or ""), int(runs)) for url, title, runs in rows]
+
+    def publisher_share(
+        self,
+        publisher: Optional[str] = None,
+        track: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> List[Tuple[str, str, int, float]]:
+        """(week_start, publisher_norm, sources, share of the week's sources) per week."""
+        scope = "kind = 'source'"
+        params: List[object] = []
+        if track:
+            scope += " AND track = ?"
+            params.append(track)
+        if model:
+            scope += " AND model = ?"
+            params.append(model)
+        having = ""
+        if publisher:
+            having = " HAVING publisher_norm = ?"
+        rows = self.conn.execute(
+            "WITH cited AS (SELECT week_start, COALESCE(publisher_norm, 'Unknown') AS publisher_norm "
+            f"FROM sources WHERE {scope}), "
+            "weekly AS (SELECT week_start, COUNT(*) AS n FROM cited GROUP BY week_start) "
+            "SELECT c.week_start, c.publisher_norm, COUNT(*), CAST(COUNT(*) AS REAL) / w.n "
+            "FROM cited c JOIN weekly w ON w.week_start IS c.week_start "
+            f"GROUP BY c.week_start, c.publisher_norm{having} "
+            "ORDER BY c.week_start, COUNT(*) DESC, c.publisher_norm",
+            params + ([normalize_publisher(publisher)] if publisher else []),
+        )
+        return [(str(week), str(name), int(count), float(share)) for week, name, count, share in rows]
+
+
+def update_index(index: SourceIndex, runs_dir: Path, run_ids: Optional[Sequence[str]] = None) -> Tuple[int, int]:
+    """Re-read only new or changed logs and drop vanished ones; return (re-read, dropped).
+
+    With ``run_ids`` only those runs are listed and pruned, so a run that
+    just finished can be indexed without walking the rest of ``runs_dir``.
+    """
+    known = index.fingerprints(run_ids)
+    keys: List[str] = []
+    changed = 0
+    if runs_dir.is_dir():
+        for path in iter_run_logs(runs_dir, run_ids):
+            described = describe_log(path)
+            if described is None:
+                continue
+            key = os.path.abspath(path)
+            keys.append(key)
+            stat = path.stat()
+            previous = known.get(key)
+            if previous and previous[:2] == (stat.st_size, stat.st_mtime_ns):
+                continue
+            digest = hashlib.sha256(path.read_bytes()).hexdigest()
+            if previous and previous[2] == digest:
+                index.touch(key, stat.st_size, stat.st_mtime_ns)
+                continue
+            run, track, model = described
+            log, rows = source_rows(Path(key), run, track, model)
+            index.put(key, stat.st_size, stat.st_mtime_ns, digest, run, track, log, rows)
+            changed += 1
+    dropped = index.prune(keys, run_ids)
+    index.commit()
+    return changed, dropped
+
+
+def write_table(rows: Iterable[Sequence[object]], header: Sequence[str]) -> None:
+    print("\t".join(header))
+    for row in rows:
+        print("\t".join("" if value is None else str(value) for value in row))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Index and query the sources cited in every run's search logs.")
+    parser.add_argument("--index", default=DEFAULT_INDEX, help=f"SQLite index path. Default: {DEFAULT_INDEX}.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    update = commands.add_parser("update", help="Index new or changed search logs and drop vanished ones.")
+    update.add_argument("--runs-dir", default="data/runs", help="Root directory of runs.")
+    update.add_argument("--run-id", action="append", help="Only (re)index this run (repeatable).")
+
+    shared = commands.add_parser("shared-urls", help="URLs every model cited in a week, across runs.")
+    shared.add_argument("week_start")
+    shared.add_argument("--track", choices=sorted(TRACKS.values()))
+    shared.add_argument("--run-id", default=None)
+
+    share = commands.add_parser("publisher-share", help="Weekly share of cited sources per publisher.")
+    share.add_argument("--publisher", default=None)
+    share.add_argument("--track", choices=sorted(TRACKS.values()))
+    share.add_argument("--model", default=None)
+
+    sql = commands.add_parser("sql", help="Run a read-only SQL query against the index.")
+    sql.add_argument("query")
+    args = parser.parse_args(argv)
+
+    with SourceIndex(Path(args.index)) as index:
+        if args.command == "update":
+            changed, dropped = update_index(index, Path(args.runs_dir), args.run_id)
+            logs, sources = index.totals()
+            print(f"Logs re-read: {changed} (dropped: {dropped}); index holds {logs} log(s), {sources} source(s)")
+        elif args.command == "shared-urls":
+            write_table(index.shared_urls(args.week_start, args.track, args.run_id), ["canonical_url", "title", "runs"])
+        elif args.command == "publisher-share":
+            rows = index.publisher_share(args.publisher, args.track, args.model)
+            write_table(
+                ((week, name, count, f"{share:.4f}") for week, name, count, share in rows),
+                ["week_start", "publisher", "sources", "share"],
+            )
+        else:
+            index.conn.execute("PRAGMA query_only = ON")
+            try:
+                cursor = index.query(args.query)
+            except sqlite3.Error as exc:
+                print(f"Query failed: {exc}", file=sys.stderr)
+                return 1
+            write_table(cursor, [column[0] for column in cursor.description or []])
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Summarize a run's telemetry ledger: latency percentiles and spend per model and stage."""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import math
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from telemetry import read_ledger
+
+COLUMNS = [
+    "model",
+    "stage",
+    "calls",
+    "cache_hits",
+    "errors",
+    "retries",
+    "p50_s",
+    "p95_s",
+    "p99_s",
+    "mean_queue_s",
+    "input_tokens",
+    "cached_input_tokens",
+    "output_tokens",
+    "cost_usd",
+]
+
+
+def percentile(values: Sequence[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile; None for an empty sample."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(records: List[Dict[str, object]], by: Tuple[str, ...] = ("model", "stage")) -> List[Dict[str, object]]:
+    """One row per group plus a total row per model.
+
+    Latency percentiles use calls that reached the provider (cache hits
+    are excluded); costs of unpriced models count as zero.
+    """
+    groups: Dict[Tuple[str, ...], List[Dict[str, object]]] = defaultdict(list)
+    for record in records:
+        key = tuple(str(record.get(field) or "-") for field in by)
+        groups[key].append(record)
+        if len(by) > 1:
+            groups[(key[0],) + ("(all)",) * (len(by) - 1)].append(record)
+
+    rows: List[Dict[str, object]] = []
+    for key in sorted(groups):
+        items = groups[key]
+        live = [item for item in items if not item.get("cache_hit")]
+        latencies = [float(item.get("wall_s") or 0.0) for item in live]
+        queues = [float(item.get("queue_s") or 0.0) for item in live]
+        row: Dict[str, object] = dict(zip(by, key))
+        row.update({
+            "calls": len(items),
+            "cache_hits": len(items) - len(live),
+            "errors": sum(1 for item in items if item.get("error")),
+            "retries": sum(int(item.get("retries") or 0) for item in items),
+            "p50_s": percentile(latencies, 50),
+            "p95_s": percentile(latencies, 95),
+            "p99_s": percentile(latencies, 99),
+            "mean_queue_s": sum(queues) / len(queues) if queues else None,
+            "input_tokens": sum(int(item.get("input_tokens") or 0) for item in items),
+            "cached_input_tokens": sum(int(item.get("cached_input_tokens") or 0) for item in items),
+            "output_tokens": sum(int(item.get("output_tokens") or 0) for item in items),
+            "cost_usd": round(sum(float(item.get("cost_usd") or 0.0) for item in items), 4),
+        })
+        rows.append(row)
+    return rows
+
+
+def format_cell(value: object) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+def format_table(rows: List[Dict[str, object]], columns: List[str]) -> str:
+    cells = [[format_cell(row.get(column)) for column in columns] for row in rows]
+    widths = [max([len(column)] + [len(line[idx]) for line in cells]) for idx, column in enumerate(columns)]
+    lines = ["  ".join(column.ljust(widths[idx]) for idx, column in enumerate(columns))]
+    for line in cells:
+        lines.append("  ".join(cell.ljust(widths[idx]) for idx, cell in enumerate(line)))
+    return "\n".join(lines)
+
+
+def total_cost(records: List[Dict[str, object]]) -> float:
+    return round(sum(float(record.get("cost_usd") or 0.0) for record in records), 4)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Summarize LLM call telemetry.")
+    parser.add_argument("ledger", help="telemetry.jsonl or a run directory containing it.")
+    parser.add_argument("--by", default="model,stage", help="Comma-separated grouping fields.")
+    parser.add_argument("--csv", dest="csv_path", help="Also write the summary as CSV.")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table.")
+    args = parser.parse_args(argv)
+
+    records = read_ledger(Path(args.ledger))
+    if not records:
+        print(f"No telemetry records in {args.ledger}", file=sys.stderr)
+        return 1
+    by = tuple(field.strip() for field in args.by.split(",") if field.strip())
+    rows = summarize(records, by)
+    columns = list(by) + COLUMNS[2:]
+
+    if args.json:
+        print(json.dumps(rows, indent=2, ensure_ascii=False))
+    else:
+        print(format_table(rows, columns))
+        print(f"\nCalls: {len(records)}  Total cost: ${total_cost(records):.4f}")
+    if args.csv_path:
+        with open(args.csv_path, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.DictWriter(handle, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
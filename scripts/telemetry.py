@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Per-call latency, token and cost ledger for LLM calls."""
+
+from __future__ import annotations
+
+import argparse
+import contextvars
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+LEDGER_NAME = "telemetry.jsonl"
+PRICES_PATH = Path(__file__).resolve().parent.parent / "config" / "model_prices.json"
+# Share of the list price charged for batch API calls (OpenAI Batch and
+# Anthropic Message Batches both bill half); a model's "batch_factor" overrides it.
+BATCH_PRICE_FACTOR = 0.5
+
+_context: contextvars.ContextVar[Dict[str, object]] = contextvars.ContextVar("telemetry_context", default={})
+
+
+class TelemetryLedger:
+    """Append-only JSONL file; one line per call, safe to share across threads."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def append(self, record: Dict[str, object]) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as handle:
+                handle.write(line)
+
+
+_ledgers: Dict[str, TelemetryLedger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def open_ledger(path: Path) -> TelemetryLedger:
+    """Return the process-wide ledger for ``path`` so appends share one lock."""
+    key = str(Path(path).resolve())
+    with _ledgers_lock:
+        ledger = _ledgers.get(key)
+        if ledger is None:
+            ledger = TelemetryLedger(Path(path))
+            _ledgers[key] = ledger
+    return ledger
+
+
+@contextmanager
+def bind(**fields: object) -> Iterator[None]:
+    """Attach fields (ledger, stage, week_start, ...) to calls made in this scope.
+
+    Fields already bound by an outer scope win, so the orchestrator's node
+    id and stage are kept when a script binds its own defaults. ``None``
+    values are ignored.
+    """
+    current = _context.get()
+    merged = {key: value for key, value in fields.items() if value is not None}
+    merged.update(current)
+    token = _context.set(merged)
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def current_context() -> Dict[str, object]:
+    return dict(_context.get())
+
+
+_prices: Optional[Dict[str, Dict[str, float]]] = None
+
+
+def load_prices(path: Path = PRICES_PATH) -> Dict[str, Dict[str, float]]:
+    global _prices
+    if _prices is None:
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            data = {}
+        _prices = {key: value for key, value in data.items() if isinstance(value, dict)}
+    return _prices
+
+
+def estimate_cost(model: str, usage: Dict[str, int], batch: bool = False) -> Optional[float]:
+    """USD cost of one call from the price table, or None for unpriced models.
+
+    ``batch`` calls are charged the batch share of the list price.
+    """
+    price = load_prices().get(model)
+    if price is None:
+        return None
+    input_tokens = usage.get("input_tokens", 0)
+    cached = usage.get("cached_input_tokens", 0)
+    cache_write = usage.get("cache_creation_input_tokens", 0)
+    uncached = max(0, input_tokens - cached - cache_write)
+    cost = (
+        uncached * price.get("input", 0.0)
+        + cached * price.get("cached_input", price.get("input", 0.0))
+        + cache_write * price.get("cache_write", price.get("input", 0.0))
+        + usage.get("output_tokens", 0) * price.get("output", 0.0)
+    )
+    if batch:
+        cost *= price.get("batch_factor", BATCH_PRICE_FACTOR)
+    return round(cost / 1_000_000, 6)
+
+
+def record_call(
+    provider: str,
+    model: str,
+    wall_seconds: float,
+    limiter_wait_seconds: float = 0.0,
+    usage: Optional[Dict[str, int]] = None,
+    retries: int = 0,
+    cache_hit: bool = False,
+    ttft_seconds: Optional[float] = None,
+    error: Optional[str] = None,
+    batch: bool = False,
+) -> None:
+    """Append one call to the ledger bound in the current context, if any.
+
+    ``batch`` marks a request answered through a provider batch API; its
+    wall time runs from submission to results.
+    """
+    context = current_context()
+    ledger = context.pop("ledger", None)
+    if not isinstance(ledger, TelemetryLedger):
+        return
+    usage = usage or {}
+    scheduler_wait = float(context.pop("scheduler_wait_seconds", 0.0) or 0.0)
+    record: Dict[str, object] = {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "provider": provider,
+        "model": model,
+        "stage": context.pop("stage", None),
+        "week_start": context.pop("week_start", None),
+        "condition": context.pop("condition", None),
+        "wall_s": round(wall_seconds, 3),
+        "queue_s": round(scheduler_wait + limiter_wait_seconds, 3),
+        "limiter_wait_s": round(limiter_wait_seconds, 3),
+        "ttft_s": round(ttft_seconds, 3) if ttft_seconds is not None else None,
+        "input_tokens": usage.get("input_tokens", 0),
+        "cached_input_tokens": usage.get("cached_input_tokens", 0),
+        "cache_creation_input_tokens": usage.get("cache_creation_input_tokens", 0),
+        "output_tokens": usage.get("output_tokens", 0),
+        "retries": retries,
+        "cache_hit": cache_hit,
+        "cost_usd": 0.0 if cache_hit else estimate_cost(model, usage, batch),
+        "error": error,
+        "batch": batch,
+    }
+    record.update(context)
+    ledger.append(record)
+
+
+def read_ledger(path: Path) -> List[Dict[str, object]]:
+    path = Path(path)
+    if path.is_dir():
+        path = path / LEDGER_NAME
+    records: List[Dict[str, object]] = []
+    if not path.exists():
+        return records
+    with path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
+
+
+def add_telemetry_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--telemetry",
+        default=None,
+        help=f"Append a per-call record to this JSONL ledger (run_pipeline uses {{run_dir}}/{LEDGER_NAME}).",
+    )
+
+
+def ledger_from_args(args: argparse.Namespace) -> Optional[TelemetryLedger]:
+    if not getattr(args, "telemetry", None):
+        return None
+    return open_ledger(Path(args.telemetry))
@@ -5,13 +5,23 @@ from __future__ import annotations
 
 import argparse
 import csv
+import hashlib
+import inspect
 import json
+import os
 from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Tuple
 
+import forecast_metrics
+from forecast_store import load_table
+from run_catalog import add_filter_arguments, filters_from_args, select_runs
+
 import matplotlib
+import pandas as pd
 
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
@@ -67,39 +77,19 @@ def safe_int(value: object) -> int:
         return 0
 
 
-def condition_from_filename(name: str) -> Tuple[Optional[str], Optional[str]]:
-    if name.endswith(".no_prior.json"):
-        return "no_prior", name[: -len(".no_prior.json")]
-    if name.endswith(".with_prior_social.json"):
-        return "with_prior_social", name[: -len(".with_prior_social.json")]
-    if name.endswith(".json"):
-        return "with_prior", name[: -len(".json")]
-    return None, None
+def load_forecasts(run_dir: Path) -> Dict[str, Dict[str, Dict[str, Dict[str, int]]]]:
+    return nest_forecasts(load_table(run_dir))
 
 
-def load_forecasts(run_dir: Path) -> Dict[str, Dict[str, Dict[str, Dict[str, int]]]]:
+def nest_forecasts(table: pd.DataFrame) -> Dict[str, Dict[str, Dict[str, Dict[str, int]]]]:
     forecasts: Dict[str, Dict[str, Dict[str, Dict[str, int]]]] = defaultdict(
         lambda: defaultdict(dict)
     )
-    forecast_root = run_dir / "forecasts"
-    if not forecast_root.exists():
-        return forecasts
-
-    for model_dir in sorted(forecast_root.iterdir()):
-        if not model_dir.is_dir():
-            continue
-        model = model_dir.name
-        for path in sorted(model_dir.glob("*.json")):
-            condition, week_start = condition_from_filename(path.name)
-            if not condition or not week_start:
-                continue
-            try:
-                data = json.loads(path.read_text(encoding="utf-8"))
-            except json.JSONDecodeError:
-                continue
-            totals = data.get("forecast_total", {})
-            normalized = {party: safe_int(totals.get(party)) for party in PARTIES}
-            forecasts[model][condition][week_start] = normalized
+    columns = (table[name].tolist() for name in ("model", "condition", "week", "party", "total"))
+    for model, condition, week_start, party, seats in zip(*columns):
+        normalized = forecasts[model][condition].setdefault(week_start, dict.fromkeys(PARTIES, 0))
+        if party in normalized:
+            normalized[party] = safe_int(seats)
     return forecasts
 
 
@@ -132,30 +122,9 @@ def plot_forecast_totals(
 def plot_forecast_divergence(
     out_path: Path,
     model: str,
-    condition_pairs: List[Tuple[str, str]],
-    conditions: Dict[str, Dict[str, Dict[str, int]]],
+    lines: Dict[str, Tuple[List[str], List[float]]],
 ) -> None:
-    lines: Dict[str, Tuple[List[str], List[int]]] = {}
-
-    for left, right in condition_pairs:
-        if left not in conditions or right not in conditions:
-            continue
-        weeks = sorted_weeks(
-            set(conditions[left].keys()) & set(conditions[right].keys())
-        )
-        if not weeks:
-            continue
-        distances: List[int] = []
-        for week in weeks:
-            total = 0
-            for party in PARTIES:
-                a = conditions[left][week].get(party, 0)
-                b = conditions[right][week].get(party, 0)
-                total += abs(a - b)
-            distances.append(total)
-        label = f"{CONDITION_LABELS.get(left, left)} vs {CONDITION_LABELS.get(right, right)}"
-        lines[label] = (weeks, distances)
-
+    """``lines``: {label: (weeks, L1 distances)} from ``forecast_metrics.condition_divergence``."""
     if not lines:
         return
 
@@ -179,26 +148,15 @@ def plot_forecast_volatility(
     out_path: Path,
     model: str,
     condition: str,
-    week_order: List[str],
-    totals_by_week: Dict[str, Dict[str, int]],
+    changes: Dict[str, float],
 ) -> None:
-    if len(week_order) < 2:
+    """``changes``: {party: sum of |week-to-week change|} from ``forecast_metrics.volatility``."""
+    if not changes:
         return
 
-    changes = {party: 0 for party in PARTIES}
-    for idx in range(1, len(week_order)):
-        prev_week = week_order[idx - 1]
-        curr_week = week_order[idx]
-        prev = totals_by_week.get(prev_week)
-        curr = totals_by_week.get(curr_week)
-        if not prev or not curr:
-            continue
-        for party in PARTIES:
-            changes[party] += abs(curr.get(party, 0) - prev.get(party, 0))
-
     fig, ax = plt.subplots(figsize=(10, 5))
     x = list(range(len(PARTIES)))
-    values = [changes[party] for party in PARTIES]
+    values = [changes.get(party, 0) for party in PARTIES]
     ax.bar(x, values, color="#4c78a8")
     ax.set_title(f"Total volatility by party - {model} - {CONDITION_LABELS.get(condition, condition)}")
     ax.set_xlabel("Party")
@@ -287,7 +245,21 @@ def plot_top_publishers(
     plt.close(fig)
 
 
-def visualize_run(run_dir: Path, top_publishers: int) -> None:
+ChartJob = Tuple[str, Path, tuple]
+
+PLOTTERS = {
+    "forecast_totals": plot_forecast_totals,
+    "forecast_volatility": plot_forecast_volatility,
+    "forecast_divergence": plot_forecast_divergence,
+    "search_summary": plot_search_summary,
+    "top_publishers": plot_top_publishers,
+}
+
+HASHES_NAME = ".chart_hashes.json"
+
+
+def plan_run(run_dir: Path, top_publishers: int) -> List[ChartJob]:
+    """Every chart for one run as (plotter, output path, plotter arguments)."""
     run_label = run_dir.name
     out_dir = run_dir / "visualizations"
     forecast_out = out_dir / "forecasts"
@@ -295,20 +267,49 @@ def visualize_run(run_dir: Path, top_publishers: int) -> None:
     forecast_out.mkdir(parents=True, exist_ok=True)
     search_out.mkdir(parents=True, exist_ok=True)
 
-    forecasts = load_forecasts(run_dir)
+    jobs: List[ChartJob] = []
+    table = load_table(run_dir)
+    forecasts = nest_forecasts(table)
+    cube = forecast_metrics.ForecastCube.from_table(table)
+    volatility = {
+        (row.model, row.condition, row.party): float(row.total_abs_change)
+        for row in forecast_metrics.volatility(cube).itertuples(index=False)
+        if row.weeks >= 2
+    }
+    divergence = forecast_metrics.condition_divergence(cube, CONDITION_PAIRS)
     for model, conditions in forecasts.items():
         for condition, totals_by_week in conditions.items():
             weeks = sorted_weeks(totals_by_week.keys())
             if not weeks:
                 continue
-            totals_path = forecast_out / f"forecast_totals_{model}_{condition}.png"
-            plot_forecast_totals(totals_path, model, condition, weeks, totals_by_week)
-
-            vol_path = forecast_out / f"forecast_volatility_{model}_{condition}.png"
-            plot_forecast_volatility(vol_path, model, condition, weeks, totals_by_week)
-
-        divergence_path = forecast_out / f"forecast_divergence_{model}.png"
-        plot_forecast_divergence(divergence_path, model, CONDITION_PAIRS, conditions)
+            totals = dict(totals_by_week)
+            jobs.append((
+                "forecast_totals",
+                forecast_out / f"forecast_totals_{model}_{condition}.png",
+                (model, condition, weeks, totals),
+            ))
+            changes = {
+                party: volatility[(model, condition, party)]
+                for party in PARTIES
+                if (model, condition, party) in volatility
+            }
+            jobs.append((
+                "forecast_volatility",
+                forecast_out / f"forecast_volatility_{model}_{condition}.png",
+                (model, condition, changes),
+            ))
+
+        lines: Dict[str, Tuple[List[str], List[float]]] = {}
+        for (left, right), rows in divergence[divergence["model"] == model].groupby(["left", "right"], sort=False):
+            weeks = sorted_weeks(rows["week"])
+            by_week = dict(zip(rows["week"], rows["l1"]))
+            label = f"{CONDITION_LABELS.get(left, left)} vs {CONDITION_LABELS.get(right, right)}"
+            lines[label] = (weeks, [float(by_week[week]) for week in weeks])
+        jobs.append((
+            "forecast_divergence",
+            forecast_out / f"forecast_divergence_{model}.png",
+            (model, lines),
+        ))
 
     analysis_dir = run_dir / "analysis"
     for track in ("news", "social", "combined"):
@@ -318,27 +319,109 @@ def visualize_run(run_dir: Path, top_publishers: int) -> None:
 
         summary_path = track_dir / "search_summary.csv"
         if summary_path.exists():
-            summary_rows = read_csv_rows(summary_path)
-            plot_search_summary(
+            jobs.append((
+                "search_summary",
                 search_out / f"search_summary_{track}.png",
-                run_label,
-                track,
-                summary_rows,
-            )
+                (run_label, track, read_csv_rows(summary_path)),
+            ))
 
         publisher_path = track_dir / "publisher_counts.csv"
         if publisher_path.exists():
-            publisher_rows = read_csv_rows(publisher_path)
-            plot_top_publishers(
+            jobs.append((
+                "top_publishers",
                 search_out / f"top_publishers_{track}.png",
-                run_label,
-                track,
-                publisher_rows,
-                top_publishers,
-            )
+                (run_label, track, read_csv_rows(publisher_path), top_publishers),
+            ))
+    return jobs
+
+
+@lru_cache(maxsize=None)
+def plotter_source_hash(name: str) -> str:
+    return hashlib.sha256(inspect.getsource(PLOTTERS[name]).encode("utf-8")).hexdigest()
+
+
+def chart_hash(job: ChartJob) -> str:
+    """Hash of a chart's input data, plot arguments and plotting code."""
+    name, _, args = job
+    payload = json.dumps(
+        {"plotter": name, "code": plotter_source_hash(name), "args": args},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_hashes(run_dir: Path) -> Dict[str, Dict[str, object]]:
+    path = run_dir / "visualizations" / HASHES_NAME
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_hashes(run_dir: Path, hashes: Dict[str, Dict[str, object]]) -> None:
+    path = run_dir / "visualizations" / HASHES_NAME
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(hashes, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def render_chart(job: ChartJob) -> bool:
+    """Draw one chart; return whether a file was written (plotters skip empty data)."""
+    name, out_path, args = job
+    PLOTTERS[name](out_path, *args)
+    return out_path.exists()
+
+
+def is_current(entry: Optional[Dict[str, object]], digest: str, out_path: Path) -> bool:
+    if not entry or entry.get("hash") != digest:
+        return False
+    return bool(entry.get("written")) == out_path.exists()
+
+
+def visualize_runs(run_dirs: List[Path], top_publishers: int, jobs: int = 1, force: bool = False) -> Counter:
+    """Render the charts of every run, skipping those whose hash is unchanged.
+
+    Charts from all runs share one process pool (matplotlib/Agg is
+    CPU-bound and safe to use from separate processes); ``jobs=1``
+    renders in this process.
+    """
+    counts: Counter = Counter()
+    pending: List[Tuple[Path, str, str, ChartJob]] = []
+    hashes_by_run: Dict[Path, Dict[str, Dict[str, object]]] = {}
+    for run_dir in run_dirs:
+        hashes = load_hashes(run_dir)
+        hashes_by_run[run_dir] = hashes
+        for job in plan_run(run_dir, top_publishers):
+            key = job[1].relative_to(run_dir / "visualizations").as_posix()
+            digest = chart_hash(job)
+            if not force and is_current(hashes.get(key), digest, job[1]):
+                counts["unchanged"] += 1
+                continue
+            pending.append((run_dir, key, digest, job))
 
+    if jobs <= 1 or len(pending) <= 1:
+        results = [render_chart(job) for _, _, _, job in pending]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(render_chart, [job for _, _, _, job in pending], chunksize=1))
 
-def iter_runs(runs_dir: Path, run_ids: Optional[List[str]]) -> Iterable[Path]:
+    for (run_dir, key, digest, _), written in zip(pending, results):
+        hashes_by_run[run_dir][key] = {"hash": digest, "written": written}
+        counts["rendered" if written else "empty"] += 1
+    for run_dir, hashes in hashes_by_run.items():
+        save_hashes(run_dir, hashes)
+    return counts
+
+
+def visualize_run(run_dir: Path, top_publishers: int, jobs: int = 1, force: bool = False) -> Counter:
+    return visualize_runs([run_dir], top_publishers, jobs=jobs, force=force)
+
+
+def iter_runs(runs_dir: Path, run_ids: Optional[List[str]], **filters: object) -> Iterable[Path]:
+    """The given runs, or every run in the catalog matching ``filters`` (see ``RunCatalog.select``)."""
     if run_ids:
         for run_id in run_ids:
             path = runs_dir / run_id
@@ -347,11 +430,7 @@ def iter_runs(runs_dir: Path, run_ids: Optional[List[str]]) -> Iterable[Path]:
             else:
                 print(f"Missing run: {path}")
         return
-    if not runs_dir.exists():
-        return
-    for path in sorted(runs_dir.iterdir()):
-        if path.is_dir():
-            yield path
+    yield from select_runs(runs_dir, **filters)
 
 
 def main() -> int:
@@ -359,17 +438,25 @@ def main() -> int:
     parser.add_argument("--runs-dir", default="data/runs", help="Root directory of runs.")
     parser.add_argument("--run-id", action="append", help="Specific run id to visualize.")
     parser.add_argument("--top-publishers", type=int, default=12, help="Top publishers to chart.")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Chart rendering processes. Default: CPU count.",
+    )
+    parser.add_argument("--force", action="store_true", help="Redraw charts even if their inputs are unchanged.")
+    add_filter_arguments(parser)
     args = parser.parse_args()
 
     runs_dir = Path(args.runs_dir)
-    ran_any = False
-    for run_dir in iter_runs(runs_dir, args.run_id):
-        ran_any = True
-        print(f"Visualizing: {run_dir}")
-        visualize_run(run_dir, args.top_publishers)
-
-    if not ran_any:
+    run_dirs = list(iter_runs(runs_dir, args.run_id, **filters_from_args(args)))
+    if not run_dirs:
         print("No runs found to visualize.")
+        return 0
+    for run_dir in run_dirs:
+        print(f"Visualizing: {run_dir}")
+    counts = visualize_runs(run_dirs, args.top_publishers, jobs=args.jobs, force=args.force)
+    print(f"Charts: {counts['rendered']} rendered, {counts['unchanged']} unchanged, {counts['empty']} without data")
     return 0
 
 
@@ -0,0 +1,165 @@
+import json
+
+import pytest
+
+from forecast_repair import RepairError, extract_json, max_drift, repair_forecast, repair_response, rescale
+from schema_validator import validate_data
+from seats import DISTRICT_SEATS, PARTIES, PARTY_LIST_SEATS
+
+PARTY_LIST = dict(zip(PARTIES, [29, 15, 27, 6, 1, 22]))
+DISTRICT = dict(zip(PARTIES, [116, 60, 110, 24, 5, 85]))
+
+
+def forecast(**overrides):
+    data = {
+        "week_start": "2025-12-12",
+        "week_end": "2025-12-18",
+        "model": "gpt-5.2",
+        "condition": "no_prior",
+        "forecast_party_list": dict(PARTY_LIST),
+        "forecast_district": dict(DISTRICT),
+    }
+    data.update(overrides)
+    return data
+
+
+def off_by(seats, party, change):
+    return {**seats, party: seats[party] + change}
+
+
+def test_extract_json_bare():
+    assert extract_json('{"a": 1}') == ({"a": 1}, None)
+
+
+@pytest.mark.parametrize("fence", ["```json", "```JSON", "```"])
+def test_extract_json_fenced(fence):
+    value, note = extract_json(f'Here it is:\n{fence}\n{{"a": 1}}\n```\n')
+    assert value == {"a": 1}
+    assert note == "extracted JSON from a fenced code block"
+
+
+def test_extract_json_prose_wrapped():
+    value, note = extract_json('My forecast: {"a": {"b": 2}} -- hope that helps {not json')
+    assert value == {"a": {"b": 2}}
+    assert note == "extracted JSON object from surrounding text"
+
+
+def test_extract_json_skips_braces_before_the_object():
+    value, _ = extract_json('Seats {approx}: {"a": 1}')
+    assert value == {"a": 1}
+
+
+def test_extract_json_without_object():
+    with pytest.raises(RepairError):
+        extract_json("I cannot forecast this week.")
+
+
+def test_rescale_leaves_exact_sum():
+    repairs = []
+    assert rescale("forecast_party_list", dict(PARTY_LIST), PARTY_LIST_SEATS, repairs) == PARTY_LIST
+    assert repairs == []
+
+
+@pytest.mark.parametrize(
+    "key, seats, expected",
+    [("forecast_party_list", PARTY_LIST, PARTY_LIST_SEATS), ("forecast_district", DISTRICT, DISTRICT_SEATS)],
+)
+@pytest.mark.parametrize("sign", [1, -1])
+def test_rescale_just_inside_limit(key, seats, expected, sign):
+    repairs = []
+    drifted = off_by(seats, "Other", sign * max_drift(expected))
+    fixed = rescale(key, drifted, expected, repairs)
+    assert sum(fixed.values()) == expected
+    assert all(isinstance(value, int) for value in fixed.values())
+    assert len(repairs) == 1 and repairs[0].startswith(f"{key}: rescaled sum")
+
+
+@pytest.mark.parametrize(
+    "key, seats, expected",
+    [("forecast_party_list", PARTY_LIST, PARTY_LIST_SEATS), ("forecast_district", DISTRICT, DISTRICT_SEATS)],
+)
+@pytest.mark.parametrize("sign", [1, -1])
+def test_rescale_just_outside_limit(key, seats, expected, sign):
+    drifted = off_by(seats, "Other", sign * (max_drift(expected) + 1))
+    with pytest.raises(RepairError, match="more than"):
+        rescale(key, drifted, expected, [])
+
+
+def test_repair_forecast_adds_derived_fields():
+    data = forecast()
+    repairs = repair_forecast(data)
+    assert data["forecast_total"] == {party: PARTY_LIST[party] + DISTRICT[party] for party in PARTIES}
+    assert data["checks"] == {"party_list_sum": 100, "district_sum": 400, "total_sum": 500}
+    assert repairs == ["forecast_total: added", "checks: added"]
+    assert validate_data(data, "forecast") == []
+
+
+def test_repair_forecast_is_a_no_op_on_valid_forecast():
+    data = forecast()
+    repair_forecast(data)
+    assert repair_forecast(data) == []
+
+
+def test_repair_forecast_replaces_float_seats():
+    data = forecast(
+        forecast_party_list={party: float(seats) for party, seats in PARTY_LIST.items()},
+        forecast_district={party: float(seats) for party, seats in DISTRICT.items()},
+    )
+    repair_forecast(data)
+    for key in ("forecast_party_list", "forecast_district", "forecast_total"):
+        assert all(type(value) is int for value in data[key].values()), key
+    assert all(type(value) is int for value in data["checks"].values())
+    assert validate_data(data, "forecast") == []
+
+
+def test_repair_forecast_replaces_float_derived_fields():
+    data = forecast()
+    repair_forecast(data)
+    data["forecast_total"] = {party: float(seats) for party, seats in data["forecast_total"].items()}
+    assert repair_forecast(data) == ["forecast_total: recomputed"]
+    assert all(type(value) is int for value in data["forecast_total"].values())
+
+
+def test_repair_forecast_rejects_fractional_seats():
+    with pytest.raises(RepairError, match="not a non-negative integer"):
+        repair_forecast(forecast(forecast_party_list=off_by(PARTY_LIST, "Other", 0.5)))
+
+
+@pytest.mark.parametrize("missing", ["forecast_party_list", "forecast_district"])
+def test_repair_forecast_requires_input_sections(missing):
+    data = forecast()
+    del data[missing]
+    with pytest.raises(RepairError, match=missing):
+        repair_forecast(data)
+
+
+def test_repair_forecast_recomputes_delta_from_prior():
+    prior = {party: 80 for party in PARTIES}
+    data = forecast(delta_from_prior_total={party: 0 for party in PARTIES})
+    repairs = repair_forecast(data, prior)
+    assert data["delta_from_prior_total"] == {
+        party: PARTY_LIST[party] + DISTRICT[party] - 80 for party in PARTIES
+    }
+    assert "delta_from_prior_total: recomputed" in repairs
+
+
+def test_repair_forecast_sets_week():
+    data = forecast(week_start="YYYY-MM-DD")
+    del data["week_end"]
+    repairs = repair_forecast(data, week=("2025-12-12", "2025-12-18"))
+    assert (data["week_start"], data["week_end"]) == ("2025-12-12", "2025-12-18")
+    assert repairs[:2] == ["week_start: 'YYYY-MM-DD' -> 2025-12-12", "week_end: added"]
+
+
+def test_repair_response_fenced_and_drifted():
+    text = "```json\n" + json.dumps(forecast(forecast_party_list=off_by(PARTY_LIST, "Other", 3))) + "\n```"
+    data, repairs = repair_response(text)
+    assert repairs[0] == "extracted JSON from a fenced code block"
+    assert sum(data["forecast_party_list"].values()) == PARTY_LIST_SEATS
+    assert data["repairs"] == repairs
+    assert validate_data(data, "forecast") == []
+
+
+def test_repair_response_rejects_non_object():
+    with pytest.raises(RepairError, match="not an object"):
+        repair_response("[1, 2, 3]")